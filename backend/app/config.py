@@ -12,5 +12,47 @@ class Settings(BaseSettings):
     minio_bucket: str = os.getenv("MINIO_BUCKET", "sign-dataset")
     access_token_secret: str = os.getenv("ACCESS_TOKEN_SECRET", "your-access-token-secret")
     refresh_token_secret: str = os.getenv("REFRESH_TOKEN_SECRET", "your-refresh-token-secret")
+    # resumable video uploads (/upload/video/init): suggested part size and upper bound per video
+    upload_part_bytes: int = int(os.getenv("UPLOAD_PART_BYTES", str(8 * 1024 * 1024)))
+    max_upload_bytes: int = int(os.getenv("MAX_UPLOAD_BYTES", str(2 * 1024 * 1024 * 1024)))
+    # seconds before the broker redelivers an unacknowledged (late-ack) job; keep above the longest job
+    visibility_timeout: int = int(os.getenv("CELERY_VISIBILITY_TIMEOUT", str(6 * 3600)))
+    # uploads up to this size are queued ahead of larger videos
+    small_video_bytes: int = int(os.getenv("SMALL_VIDEO_BYTES", str(20 * 1024 * 1024)))
+    # a job not finished this long after enqueue is dropped (queued) or stopped (running)
+    job_deadline_seconds: int = int(os.getenv("JOB_DEADLINE_SECONDS", str(2 * 3600)))
+    # retried uploads of the same video + label/dialect attach to the in-flight job
+    job_dedup: bool = os.getenv("JOB_DEDUP", "true").lower() in ("1", "true", "yes")
+    # upload admission control (app/core/admission.py): 429 + Retry-After when over budget
+    admission_enabled: bool = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    admission_queue: str = os.getenv("ADMISSION_QUEUE", "video")
+    admission_queue_per_slot: int = int(os.getenv("ADMISSION_QUEUE_PER_SLOT", "20"))
+    admission_worker_slots: int = int(os.getenv("ADMISSION_WORKER_SLOTS", "0"))  # 0 = ask the workers
+    admission_default_job_seconds: float = float(os.getenv("ADMISSION_DEFAULT_JOB_SECONDS", "30"))
+    admission_max_retry_after: int = int(os.getenv("ADMISSION_MAX_RETRY_AFTER", "300"))
+    admission_disk_path: str = os.getenv("ADMISSION_DISK_PATH", "dataset")
+    admission_min_free_bytes: int = int(os.getenv("ADMISSION_MIN_FREE_BYTES", str(2 * 1024 * 1024 * 1024)))
+    user_max_active_jobs: int = int(os.getenv("USER_MAX_ACTIVE_JOBS", "3"))
+    camera_max_inflight: int = int(os.getenv("CAMERA_MAX_INFLIGHT", "8"))
+    # feature layout written by both ingest paths (app/processing/layouts.py)
+    feature_layout: str = os.getenv("FEATURE_LAYOUT", "pose_hands_v2")
+    # video pipeline: frames buffered between the decode thread and keypoint extraction (0 = decode inline)
+    decode_prefetch: int = int(os.getenv("DECODE_PREFETCH", "4"))
+    # longest frame side fed to MediaPipe (0 = full resolution) and optional crop to the signer
+    max_frame_side: int = int(os.getenv("MAX_FRAME_SIDE", "960"))
+    roi_crop: bool = os.getenv("ROI_CROP", "false").lower() in ("1", "true", "yes")
+    # skip sampled frames with less than this fraction of changed pixels before MediaPipe (0 = off)
+    motion_gate: float = float(os.getenv("MOTION_GATE", "0"))
+    # long videos are split into overlapping chunks extracted by a process pool (<= 1 = sequential)
+    extract_processes: int = int(os.getenv("EXTRACT_PROCESSES", "0"))
+    parallel_min_seconds: float = float(os.getenv("PARALLEL_MIN_SECONDS", "60"))
+    chunk_seconds: float = float(os.getenv("CHUNK_SECONDS", "20"))
+    chunk_overlap_seconds: float = float(os.getenv("CHUNK_OVERLAP_SECONDS", "2"))
+    # frame-level (Stage A) variants extracted in the same decode pass, e.g. "flipped,bright,noisy" ("" = off)
+    frame_augmentations: str = os.getenv("FRAME_AUGMENTATIONS", "")
+    # raw keypoint sequences cached under dataset/cache/keypoints by video hash + extractor config
+    keypoint_cache: bool = os.getenv("KEYPOINT_CACHE", "true").lower() in ("1", "true", "yes")
+    # sequential extraction checkpoints every N frames, so a redelivered job resumes there (0 = off; needs the cache)
+    keypoint_checkpoint_frames: int = int(os.getenv("KEYPOINT_CHECKPOINT_FRAMES", "300"))
 
 settings = Settings()
@@ -0,0 +1,171 @@
+# app/core/admission.py
+"""
+Admission control for uploads.
+
+Video jobs are admitted while the Celery queue holds less than `queue_per_slot` jobs
+per worker slot, the uploader has fewer than `user_max_active_jobs` jobs in flight and
+the dataset disk keeps `min_free` bytes free. Otherwise the request gets 429 with a
+Retry-After computed from the backlog and the measured job duration, so clients back
+off instead of piling more work on Redis and the disk.
+
+Camera uploads are small and saved synchronously: they use their own lane (disk check
++ a per-process in-flight limit) and never wait behind the video queue.
+"""
+import math
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+import redis
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+JOB_SECONDS_KEY = "admission:job_seconds"
+USER_KEY = "admission:active:{}"
+USER_KEY_TTL = 6 * 3600  # a crashed worker must not pin a user's slots forever
+
+_redis = None
+_slots = (0.0, 0)  # (checked_at, worker slots)
+_camera_inflight = 0
+
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.broker_url, socket_timeout=1.0)
+    return _redis
+
+
+def too_busy(detail: str, retry_after: float):
+    retry_after = int(min(settings.admission_max_retry_after, max(1, math.ceil(retry_after))))
+    return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=detail,
+                         headers={"Retry-After": str(retry_after)})
+
+
+PRIORITY_SEP = "\x06\x16"  # kombu redis transport: priority p > 0 lives in "<queue>\x06\x16<p>"
+
+
+def queue_depth(queue: str = None) -> int:
+    """Jobs waiting in `queue`, summed over its priority sub-lists."""
+    queue = queue or settings.admission_queue
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.llen(queue)
+    for pri in range(1, 10):
+        pipe.llen(f"{queue}{PRIORITY_SEP}{pri}")
+    return int(sum(pipe.execute()))
+
+
+def worker_slots() -> int:
+    """Total pool processes of the workers consuming jobs (asked via broadcast, cached)."""
+    global _slots
+    if settings.admission_worker_slots > 0:
+        return settings.admission_worker_slots
+    checked_at, slots = _slots
+    if time.monotonic() - checked_at > 30:
+        from app.worker import celery_app
+        try:
+            stats = celery_app.control.inspect(timeout=0.5).stats() or {}
+            slots = sum(int(s.get("pool", {}).get("max-concurrency", 1)) for s in stats.values())
+        except Exception:
+            pass  # keep the last known value
+        _slots = (time.monotonic(), slots)
+    return max(1, slots)
+
+
+def job_seconds() -> float:
+    value = get_redis().get(JOB_SECONDS_KEY)
+    return float(value) if value else settings.admission_default_job_seconds
+
+
+def record_job_seconds(seconds: float, alpha: float = 0.2):
+    """Exponential moving average of job wall time, written by the worker after each job."""
+    r = get_redis()
+    prev = r.get(JOB_SECONDS_KEY)
+    avg = seconds if prev is None else (1 - alpha) * float(prev) + alpha * seconds
+    r.set(JOB_SECONDS_KEY, f"{avg:.3f}")
+
+
+def disk_free() -> int:
+    path = settings.admission_disk_path
+    return shutil.disk_usage(path if os.path.exists(path) else ".").free
+
+
+def check_disk(incoming_bytes: int = 0):
+    free = disk_free()
+    if free - incoming_bytes < settings.admission_min_free_bytes:
+        raise too_busy("Not enough free storage, try again later", settings.admission_max_retry_after)
+
+
+def admit_video(user_key: str, incoming_bytes: int = 0, reserve: bool = True):
+    """
+    Raise 429 if a new video job must not be accepted now; otherwise take one of the
+    user's slots (given back by release_video when the job finishes). reserve=False
+    only checks (e.g. before a resumable upload starts sending bytes).
+    """
+    if not settings.admission_enabled:
+        return
+    check_disk(incoming_bytes)
+    try:
+        slots = worker_slots()
+        depth = queue_depth()
+        budget = slots * settings.admission_queue_per_slot
+        if depth >= budget:
+            # time until the backlog drains back under budget at the current throughput
+            raise too_busy("Processing queue is full, try again later",
+                           (depth - budget + 1) * job_seconds() / slots)
+        r = get_redis()
+        key = USER_KEY.format(user_key)
+        if not reserve:
+            if int(r.get(key) or 0) >= settings.user_max_active_jobs:
+                raise too_busy("Too many videos in progress for this user", job_seconds())
+            return
+        active = r.incr(key)
+        r.expire(key, USER_KEY_TTL)
+        if active > settings.user_max_active_jobs:
+            r.decr(key)
+            raise too_busy("Too many videos in progress for this user", job_seconds())
+    except redis.RedisError:
+        # broker unreachable: the enqueue itself will fail and report it
+        return
+
+
+def release_video(user_key: str):
+    if not user_key:
+        return
+    r = get_redis()
+    key = USER_KEY.format(user_key)
+    if r.decr(key) <= 0:
+        r.delete(key)
+
+
+@contextmanager
+def camera_lane():
+    """Priority lane for camera uploads: bounded per process, independent of the video queue."""
+    global _camera_inflight
+    if settings.admission_enabled:
+        check_disk()
+        if _camera_inflight >= settings.camera_max_inflight:
+            raise too_busy("Too many camera uploads in progress", 1)
+    _camera_inflight += 1
+    try:
+        yield
+    finally:
+        _camera_inflight -= 1
+
+
+def snapshot():
+    """Current admission state (for clients and dashboards)."""
+    state = {"enabled": settings.admission_enabled, "camera_inflight": _camera_inflight,
+             "camera_max_inflight": settings.camera_max_inflight,
+             "disk_free_bytes": disk_free()}
+    try:
+        slots = worker_slots()
+        depth = queue_depth()
+        budget = slots * settings.admission_queue_per_slot
+        state.update({"queue": settings.admission_queue, "queue_depth": depth, "worker_slots": slots,
+                      "queue_budget": budget, "job_seconds": job_seconds(), "accepting_video": depth < budget})
+    except redis.RedisError as e:
+        state.update({"queue_error": str(e)})
+    return state
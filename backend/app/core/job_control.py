@@ -0,0 +1,82 @@
+# app/core/job_control.py
+"""
+Duplicate coalescing, cancellation and deadlines for video jobs.
+
+- A video job is keyed by the video's sha256 plus the parameters that shape its
+  samples (user, label, dialect). The first upload claims the key (SET NX) for its job;
+  a retried upload of the same file finds the key and attaches to that job instead of
+  queueing a second one. The key is released when the job ends.
+- Cancelling revokes the job (a queued job is dropped when a worker receives it) and
+  sets a flag that a running job polls through JobProgress, so it stops at the next
+  stage boundary or frame.
+- Every job gets a deadline: a job still queued then expires, a running one stops like
+  a cancelled one.
+"""
+import hashlib
+import time
+
+from app.config import settings
+from app.core.admission import get_redis
+
+DEDUP_KEY = "job:dedup:{}"
+JOB_DEDUP_KEY = "job:dedup_of:{}"  # job id -> its dedup key, to release it by job id
+CANCEL_KEY = "job:cancel:{}"
+
+
+def dedup_key(video_sha256: str, user: str, label: str, dialect: str) -> str:
+    params = hashlib.sha256("\x1f".join((user or "", label or "", dialect or "")).encode("utf-8")).hexdigest()[:16]
+    return f"{video_sha256}:{params}"
+
+
+def claim(key: str, job_id: str) -> str:
+    """Claim `key` for `job_id`; returns the id of the job already holding it, or None."""
+    r = get_redis()
+    ttl = settings.job_deadline_seconds + 60
+    if r.set(DEDUP_KEY.format(key), job_id, nx=True, ex=ttl):
+        r.set(JOB_DEDUP_KEY.format(job_id), key, ex=ttl)
+        return None
+    holder = r.get(DEDUP_KEY.format(key))
+    return holder.decode() if holder else None
+
+
+def release(job_id: str):
+    """Free the dedup key held by `job_id` (if a later job has claimed it since, leave it)."""
+    r = get_redis()
+    key = r.get(JOB_DEDUP_KEY.format(job_id))
+    if key is None:
+        return
+    name = DEDUP_KEY.format(key.decode())
+    holder = r.get(name)
+    if holder is not None and holder.decode() == job_id:
+        r.delete(name)
+    r.delete(JOB_DEDUP_KEY.format(job_id))
+
+
+def deadline(seconds: float = None) -> float:
+    return time.time() + (seconds or settings.job_deadline_seconds)
+
+
+def cancel(job_id: str):
+    from app.worker import celery_app
+    get_redis().set(CANCEL_KEY.format(job_id), "1", ex=settings.job_deadline_seconds + 60)
+    celery_app.control.revoke(job_id)
+    # new uploads of the same video must not attach to a cancelled job
+    release(job_id)
+
+
+def is_cancelled(job_id: str) -> bool:
+    return bool(get_redis().exists(CANCEL_KEY.format(job_id)))
+
+
+def stop_check(job_id: str, deadline_at: float = 0.0):
+    """JobProgress `should_stop` callable for a job: the reason to stop, or None."""
+    def should_stop():
+        if deadline_at and time.time() > deadline_at:
+            return "deadline exceeded"
+        try:
+            if is_cancelled(job_id):
+                return "cancelled"
+        except Exception:
+            pass  # Redis hiccup: keep working
+        return None
+    return should_stop
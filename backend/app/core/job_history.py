@@ -0,0 +1,131 @@
+# app/core/job_history.py
+"""
+Persistent job history in the `jobs` table (app/db.py).
+
+Rows are written when a job is enqueued (API side) and when it starts and finishes
+(worker side, through Celery signals in worker.py), so history outlives the Celery
+result backend (result_expires). Writes are best effort: a database problem is logged
+and never fails an upload or a job.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import and_, func, select, tuple_
+
+from app.db import engine, jobs
+
+logger = logging.getLogger(__name__)
+
+# task name -> job kind
+KINDS = {
+    "app.tasks.enqueue_process_video": "video",
+    "app.tasks.process_video_batch": "video_batch",
+    "app.tasks.export_dataset": "export",
+    "app.tasks.validate_dataset": "validation",
+    "app.tasks.cleanup_stale_uploads": "maintenance",
+}
+
+
+def _upsert(job_id: str, values: dict, insert_defaults: dict):
+    with engine.begin() as conn:
+        updated = conn.execute(jobs.update().where(jobs.c.id == job_id).values(**values)).rowcount
+        if not updated:
+            conn.execute(jobs.insert().values(id=job_id, **insert_defaults, **values))
+
+
+def record_enqueued(job_id: str, kind: str, queue: str = None, user: str = None, label: str = None,
+                    session_id: str = None):
+    try:
+        # the worker may already have started (and inserted) the job
+        _upsert(job_id, {"queue": queue, "user": user, "label": label, "session_id": session_id},
+                {"kind": kind, "status": "QUEUED"})
+    except Exception:
+        logger.exception("job history: enqueue of %s not recorded", job_id)
+
+
+def record_started(job_id: str, task_name: str, kwargs: dict = None, queue: str = None):
+    kwargs = kwargs or {}
+    try:
+        _upsert(job_id, {"status": "STARTED", "started_at": func.now()},
+                {"kind": KINDS.get(task_name, task_name), "queue": queue, "user": kwargs.get("user"),
+                 "label": kwargs.get("label"), "session_id": kwargs.get("session_id")})
+    except Exception:
+        logger.exception("job history: start of %s not recorded", job_id)
+
+
+def record_finished(job_id: str, task_name: str, retval=None, state: str = None, duration_s: float = None):
+    """
+    Tasks report pipeline errors as {"status": "error"} results: those count as FAILURE,
+    and {"status": "cancelled"} (cancelled or past the deadline) as REVOKED.
+    """
+    status, error, telemetry = "SUCCESS", None, None
+    if state and state != "SUCCESS":
+        status, error = "FAILURE", str(retval) if retval is not None else state
+    elif isinstance(retval, dict):
+        telemetry = retval.get("telemetry")
+        if retval.get("status") == "cancelled":
+            status, error = "REVOKED", retval.get("reason")
+        elif retval.get("status") in ("error", "partial"):
+            status, error = "FAILURE", retval.get("error") or f"{retval.get('failed', 0)} videos failed"
+    try:
+        _upsert(job_id, {"status": status, "error": error, "telemetry": telemetry, "finished_at": func.now(),
+                         "duration_s": duration_s},
+                {"kind": KINDS.get(task_name, task_name)})
+    except Exception:
+        logger.exception("job history: finish of %s not recorded", job_id)
+
+
+def _row(r):
+    d = dict(r._mapping)
+    for k in ("created_at", "started_at", "finished_at"):
+        if d.get(k) is not None:
+            d[k] = d[k].isoformat()
+    return d
+
+
+def encode_cursor(row: dict) -> str:
+    return f"{row['created_at']}|{row['id']}"
+
+
+def list_jobs(limit: int = 50, cursor: str = None, user: str = None, status: str = None, kind: str = None,
+              since=None, until=None):
+    """
+    Newest first, keyset-paginated on (created_at, id): pass the returned next_cursor
+    to get the following page; cost does not grow with the page number.
+    """
+    conds = []
+    if user is not None:
+        conds.append(jobs.c.user == user)
+    if status:
+        conds.append(jobs.c.status == status)
+    if kind:
+        conds.append(jobs.c.kind == kind)
+    if since is not None:
+        conds.append(jobs.c.created_at >= since)
+    if until is not None:
+        conds.append(jobs.c.created_at < until)
+    if cursor:
+        ts, _, last_id = cursor.partition("|")
+        ts = datetime.fromisoformat(ts)
+        # row-value comparison keeps the (created_at, id) index usable
+        conds.append(tuple_(jobs.c.created_at, jobs.c.id) < tuple_(ts, last_id))
+    q = select(jobs).where(and_(*conds)).order_by(jobs.c.created_at.desc(), jobs.c.id.desc()).limit(limit + 1)
+    with engine.connect() as conn:
+        rows = [_row(r) for r in conn.execute(q)]
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {"items": rows[:limit], "next_cursor": next_cursor}
+
+
+def daily_stats(since=None, kind: str = None):
+    """Jobs per day and status, with mean duration: throughput and failure rate over time."""
+    day = func.date(jobs.c.created_at).label("day")
+    q = select(day, jobs.c.status, func.count().label("jobs"), func.avg(jobs.c.duration_s).label("avg_duration_s"))
+    if since is not None:
+        q = q.where(jobs.c.created_at >= since)
+    if kind:
+        q = q.where(jobs.c.kind == kind)
+    q = q.group_by(day, jobs.c.status).order_by(day)
+    with engine.connect() as conn:
+        return [{"day": str(r.day), "status": r.status, "jobs": r.jobs,
+                 "avg_duration_s": float(r.avg_duration_s) if r.avg_duration_s is not None else None}
+                for r in conn.execute(q)]
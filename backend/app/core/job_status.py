@@ -0,0 +1,105 @@
+# app/core/job_status.py
+"""
+Job state read straight from the Celery Redis result backend.
+
+`AsyncResult` costs one Redis round-trip per job. Here the task meta keys
+(celery-task-meta-<id>) of many jobs are fetched with a single MGET, both for the
+bulk status endpoint and for the server-sent event stream, which re-reads the keys
+of the jobs it watches once per tick and pushes only what changed.
+"""
+import asyncio
+import json
+
+import redis
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.worker import celery_app
+
+READY_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+_UNSEEN = object()
+
+_redis = None
+_aioredis = None
+
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.result_backend, socket_timeout=2.0)
+    return _redis
+
+
+def get_aioredis():
+    global _aioredis
+    if _aioredis is None:
+        _aioredis = aioredis.Redis.from_url(settings.result_backend, socket_timeout=2.0)
+    return _aioredis
+
+
+def meta_keys(job_ids):
+    return [celery_app.backend.get_key_for_task(job_id) for job_id in job_ids]
+
+
+def job_state(job_id: str, raw) -> dict:
+    """Same shape as GET /jobs/{job_id}, built from a raw task meta value (None = unknown/pending)."""
+    meta = json.loads(raw) if raw else {}
+    status = meta.get("status", "PENDING")
+    value = meta.get("result")
+    return {
+        "job_id": job_id,
+        "status": status,
+        "result": value if status == "SUCCESS" else None,
+        "traceback": meta.get("traceback") if status == "FAILURE" else None,
+        "progress": value if status == "PROGRESS" and isinstance(value, dict) else None,
+        "telemetry": value.get("telemetry") if status == "SUCCESS" and isinstance(value, dict) else None,
+    }
+
+
+def get_states(job_ids) -> list:
+    """States of many jobs in one Redis call."""
+    if not job_ids:
+        return []
+    return [job_state(j, raw) for j, raw in zip(job_ids, get_redis().mget(meta_keys(job_ids)))]
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_states(job_ids, interval: float = 1.0, heartbeat: float = 15.0, is_disconnected=None):
+    """
+    Server-sent events for `job_ids`: a `job` event whenever a job's state changes
+    (status, progress counters, stage), then `done` once every job is finished.
+    One MGET per tick for all watched jobs, whatever their number.
+    """
+    keys = meta_keys(job_ids)
+    last, pending = {}, set(job_ids)
+    idle = 0.0
+    r = get_aioredis()
+    yield f"retry: {int(interval * 1000)}\n\n"
+    while pending:
+        if is_disconnected is not None and await is_disconnected():
+            return
+        try:
+            values = await r.mget(keys)
+        except redis.RedisError as e:
+            yield _sse("error", {"detail": str(e)})
+            values = None
+        for job_id, raw in zip(job_ids, values or ()):
+            if raw == last.get(job_id, _UNSEEN):
+                continue
+            last[job_id] = raw
+            state = job_state(job_id, raw)
+            if state["status"] in READY_STATES:
+                pending.discard(job_id)
+            yield _sse("job", state)
+            idle = 0.0
+        if not pending:
+            break
+        if idle >= heartbeat:
+            yield ": keep-alive\n\n"  # stop proxies from closing a quiet stream
+            idle = 0.0
+        await asyncio.sleep(interval)
+        idle += interval
+    yield _sse("done", {"job_ids": list(job_ids)})
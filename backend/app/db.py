@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, DateTime, Date, JSON
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, DateTime, Date, JSON, Float, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
@@ -28,6 +28,28 @@ samples = Table(
     Column("meta", JSON),
     Column("created_at", DateTime, server_default=func.now())
 )
+
+# one row per Celery job: written on enqueue, start and finish (app/core/job_history.py)
+jobs = Table(
+    "jobs", metadata,
+    Column("id", String(64), primary_key=True),  # Celery task id
+    Column("kind", String(32), nullable=False),   # video | video_batch | export | validation | maintenance
+    Column("queue", String(32)),
+    Column("user", String),
+    Column("label", String),
+    Column("session_id", String),
+    Column("status", String(16), nullable=False),  # QUEUED | STARTED | SUCCESS | FAILURE | REVOKED
+    Column("error", Text),
+    Column("telemetry", JSON),
+    Column("created_at", DateTime, server_default=func.now(), nullable=False),
+    Column("started_at", DateTime),
+    Column("finished_at", DateTime),
+    Column("duration_s", Float),
+    # listing is keyset-paginated on (created_at, id), optionally filtered by user or status
+    Index("ix_jobs_created_id", "created_at", "id"),
+    Index("ix_jobs_user_created", "user", "created_at"),
+    Index("ix_jobs_status_created", "status", "created_at"),
+)
 Base = declarative_base()
 
 class User(Base):
@@ -9,19 +9,66 @@ import cv2
 import random
 
 # -------- Stage A: Frame-level augment --------
+# Frame ops work in uint8 and write into caller-owned buffers (dst), so a video pass
+# reuses the same few arrays instead of allocating float32 copies of every frame.
+def flip_frame(f, dst=None):
+    return cv2.flip(f, 1, dst=dst)
+
+def brightness_lut(factor=1.2):
+    # same values as cv2.convertScaleAbs(f, alpha=factor), as a 256-entry table
+    return cv2.convertScaleAbs(np.arange(256, dtype=np.uint8).reshape(1, -1), alpha=factor)
+
+def adjust_brightness_frame(f, lut, dst=None):
+    return cv2.LUT(f, lut, dst=dst)
+
+def add_gaussian_noise_frame(f, noise, mean=0, sigma=10, dst=None):
+    """noise: int16 buffer shaped like f, refilled in place; the sum saturates to uint8."""
+    ch = f.shape[2] if f.ndim == 3 else 1
+    cv2.randn(noise, (mean,) * ch, (sigma,) * ch)
+    return cv2.add(f, noise, dst=dst, dtype=cv2.CV_8U)
+
 def flip_frames(frames):
-    return [cv2.flip(f, 1) for f in frames]
+    return [flip_frame(f) for f in frames]
 
 def add_gaussian_noise(frames, mean=0, sigma=10):
+    noise = None
     noisy_frames = []
     for f in frames:
-        noise = np.random.normal(mean, sigma, f.shape).astype(np.float32)
-        noisy = np.clip(f.astype(np.float32) + noise, 0, 255).astype(np.uint8)
-        noisy_frames.append(noisy)
+        if noise is None or noise.shape != f.shape:
+            noise = np.empty(f.shape, dtype=np.int16)
+        noisy_frames.append(add_gaussian_noise_frame(f, noise, mean, sigma))
     return noisy_frames
 
 def adjust_brightness(frames, factor=1.2):
-    return [cv2.convertScaleAbs(f, alpha=factor, beta=0) for f in frames]
+    lut = brightness_lut(factor)
+    return [adjust_brightness_frame(f, lut) for f in frames]
+
+FRAME_VARIANTS = ("original", "flipped", "bright", "noisy")
+
+def make_frame_variant(name: str):
+    """
+    Per-frame function for one Stage A variant: f(frame) -> variant frame.
+    Each function owns its output (and noise) buffer, reused while the frame size
+    stays the same, so the returned image is only valid until the next call.
+    """
+    if name not in FRAME_VARIANTS:
+        raise ValueError(f"unknown frame variant {name!r} (known: {', '.join(FRAME_VARIANTS)})")
+    if name == "original":
+        return lambda f: f
+    bufs = {}
+
+    def buf(key, f, dtype=np.uint8):
+        b = bufs.get(key)
+        if b is None or b.shape != f.shape:
+            b = bufs[key] = np.empty(f.shape, dtype=dtype)
+        return b
+
+    if name == "flipped":
+        return lambda f: flip_frame(f, buf("out", f))
+    if name == "bright":
+        lut = brightness_lut(1.3)
+        return lambda f: adjust_brightness_frame(f, lut, buf("out", f))
+    return lambda f: add_gaussian_noise_frame(f, buf("noise", f, np.int16), sigma=15, dst=buf("out", f))
 
 def stage_a_frame_level(frames):
     # apply a set of augmentations
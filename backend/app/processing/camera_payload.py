@@ -0,0 +1,151 @@
+"""
+Parsing of /upload/camera payloads.
+
+The body is decoded with orjson, and the frames are written straight into a preallocated
+(T, D) float32 array in the feature layout's columns. Each part's points are read with
+one itemgetter call per point (C code, no per-field Python) and each part is assigned
+to its row slice at once.
+Missing parts, missing points and null fields stay zero, as in the layout convention.
+
+Frames may also carry `landmarks` as a flat list of numbers (already in layout order);
+those rows are copied as-is and D becomes the longest row.
+
+Binary transport (Content-Type: application/x-landmarks), for clients that already hold
+the (T, D) array; the server reads it with np.frombuffer, with no per-value parsing:
+
+    header  16 bytes, little-endian "<4sBBHII": magic b"SLMK", format version (1),
+            dtype (1 = float32, 2 = float16), meta length, T, D
+    meta    UTF-8 JSON {"user", "label", "session_id", "dialect", "layout"},
+            space-padded to a multiple of 4 bytes so the array starts aligned
+    array   T * D little-endian values, row-major, in the layout's column order
+
+The whole message may be gzip-compressed (Content-Encoding: gzip).
+"""
+
+import gzip
+import json
+import struct
+import zlib
+from itertools import chain
+from operator import itemgetter
+import numpy as np
+import orjson
+
+from app.processing.layouts import FeatureLayout
+
+
+def _getter(fields):
+    if len(fields) == 1:
+        name = fields[0]
+        return lambda p: (p[name],)
+    return itemgetter(*fields)
+
+
+def _point_values(p, fields):
+    # slow path for a part with points missing fields, or not dicts at all
+    if not isinstance(p, dict):
+        return (0.0,) * len(fields)
+    return tuple(p.get(f) for f in fields)
+
+
+def frames_to_array(frames: list, layout: FeatureLayout) -> np.ndarray:
+    """[{timestamp, landmarks}, ...] -> (T, D) float32. Raises ValueError on malformed frames."""
+    landmarks = [f.get("landmarks") if isinstance(f, dict) else None for f in frames]
+    if any(ld is None for ld in landmarks):
+        raise ValueError("frame missing landmarks")
+    dim = max((layout.dim if isinstance(ld, dict) else len(ld) for ld in landmarks), default=layout.dim)
+    seq = np.zeros((len(frames), dim), dtype=np.float32)
+    parts = [(p.name, layout.offsets[p.name], p.n, p.fields, _getter(p.fields)) for p in layout.parts]
+    try:
+        for row, ld in zip(seq, landmarks):
+            if not isinstance(ld, dict):
+                row[:len(ld)] = ld
+                continue
+            for name, off, n, fields, get in parts:
+                points = ld.get(name)
+                if not points:
+                    continue
+                points = points[:n]
+                try:
+                    vals = list(chain.from_iterable(map(get, points)))
+                except (KeyError, TypeError):
+                    vals = list(chain.from_iterable(_point_values(p, fields) for p in points))
+                row[off:off + len(vals)] = vals
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"non-numeric landmarks: {e}")
+    # null fields were stored as NaN
+    np.nan_to_num(seq, copy=False, nan=0.0)
+    return seq
+
+
+def parse_camera_payload(body: bytes, layout: FeatureLayout):
+    """JSON body -> (payload fields other than frames, (T, D) float32 sequence)."""
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(payload, dict):
+        raise ValueError("payload must be a JSON object")
+    frames = payload.pop("frames", None) or []
+    if not isinstance(frames, list):
+        raise ValueError("frames must be a list")
+    return payload, frames_to_array(frames, layout)
+
+
+BINARY_CONTENT_TYPE = "application/x-landmarks"
+BINARY_MAGIC = b"SLMK"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sBBHII")
+BINARY_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+MAX_BINARY_BYTES = 64 * 1024 * 1024  # decompressed; a 90-frame 226-dim clip is ~80 KB
+
+
+def _gunzip(body: bytes, limit: int = MAX_BINARY_BYTES) -> bytes:
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        out = d.decompress(body, limit)
+    except zlib.error as e:
+        raise ValueError(f"invalid gzip body: {e}")
+    if d.unconsumed_tail:
+        raise ValueError("decompressed body too large")
+    return out
+
+
+def encode_camera_binary(seq: np.ndarray, meta: dict, dtype: str = "float32", compress: bool = False) -> bytes:
+    """Reference encoder for the binary transport (see the module docstring)."""
+    code = {"float32": 1, "float16": 2}[dtype]
+    blob = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    blob += b" " * (-len(blob) % 4)
+    T, D = seq.shape
+    body = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, code, len(blob), T, D) + blob + \
+        np.ascontiguousarray(seq, dtype=BINARY_DTYPES[code]).tobytes()
+    return gzip.compress(body, compresslevel=6) if compress else body
+
+
+def parse_camera_binary(body: bytes, layout: FeatureLayout):
+    """Binary body -> (meta fields, (T, D) float32 sequence). Raises ValueError on malformed input."""
+    if body[:2] == b"\x1f\x8b":
+        body = _gunzip(body)
+    if len(body) < BINARY_HEADER.size:
+        raise ValueError("truncated header")
+    magic, version, code, meta_len, T, D = BINARY_HEADER.unpack_from(body)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("not a landmarks v1 body")
+    dtype = BINARY_DTYPES.get(code)
+    if dtype is None:
+        raise ValueError(f"unknown dtype code {code}")
+    offset = BINARY_HEADER.size + meta_len
+    if len(body) != offset + T * D * dtype.itemsize:
+        raise ValueError(f"body is {len(body)} bytes, header announces {offset + T * D * dtype.itemsize}")
+    try:
+        meta = orjson.loads(body[BINARY_HEADER.size:offset]) if meta_len else {}
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f"invalid meta JSON: {e}")
+    if not isinstance(meta, dict):
+        raise ValueError("meta must be a JSON object")
+    if meta.get("layout") and (meta["layout"] != layout.version or D != layout.dim):
+        raise ValueError(f"layout {meta['layout']} (D={D}) does not match the server layout "
+                         f"{layout.version} (D={layout.dim})")
+    # zero-copy view for float32; float16 is widened once
+    seq = np.frombuffer(body, dtype=dtype, count=T * D, offset=offset).reshape(T, D)
+    return meta, seq if dtype.itemsize == 4 else seq.astype(np.float32)
@@ -0,0 +1,95 @@
+"""
+Export validated samples into the memmap files read by training / evaluation:
+dataset/processed/memmap/dataset_X.dat (float32, N x T x D), dataset_y.dat (int32, N)
+and dataset_meta.json.
+
+Labels are contiguous and 0-based, in the order tools/torch_dataset.SignDataset uses:
+the position of the sample's class folder among the sorted class folders. Registry
+class_idx values can have gaps (merge_labels removes the merged label), so they are not
+used as labels; dataset_meta.json["classes"] maps each label back to its class_idx,
+label name and folder.
+"""
+
+import os
+import re
+import json
+from collections import Counter
+from pathlib import Path
+import numpy as np
+
+from app.processing import storage_utils as su
+from app.processing.validator import validate_samples, _read_npz
+
+MEMMAP_DIR = os.path.join(su.DATASET_ROOT, "processed", "memmap")
+_FOLDER_IDX = re.compile(r"^class_(\d+)_")
+
+
+def class_table(features_root: str = su.FEATURE_ROOT, labels_csv: str = su.LABELS_CSV):
+    """[{label, class_idx, label_original, folder_name}] for the class folders, label = sorted position."""
+    registry = {r["folder_name"]: r for r in su.read_csv(labels_csv)}
+    folders = sorted(d for d in os.listdir(features_root) if os.path.isdir(os.path.join(features_root, d)))
+    table = []
+    for label, folder in enumerate(folders):
+        row = registry.get(folder)
+        m = _FOLDER_IDX.match(folder)
+        class_idx = int(row["class_idx"]) if row else (int(m.group(1)) if m else None)
+        table.append({"label": label, "class_idx": class_idx,
+                      "label_original": row["label_original"] if row else None, "folder_name": folder})
+    return table
+
+
+def export_memmap(features_root: str = su.FEATURE_ROOT, out_dir: str = MEMMAP_DIR, fix: bool = False,
+                  labels_csv: str = su.LABELS_CSV):
+    """Validate (optionally fix) samples, then write every sample of the target shape. Returns a report."""
+    report = validate_samples(Path(features_root), fix=fix)
+    if "target_shape" not in report:
+        return {"ok": False, "validation": report}
+    T, D = report["target_shape"]
+    classes = class_table(features_root, labels_csv)
+    # same sample order as SignDataset: class folders sorted, then files sorted
+    files = [(c["label"], p) for c in classes
+             for p in sorted(Path(features_root, c["folder_name"]).glob("*.npz"))]
+
+    os.makedirs(out_dir, exist_ok=True)
+    x_tmp = os.path.join(out_dir, "dataset_X.dat.tmp")
+    X = np.memmap(x_tmp, dtype=np.float32, mode="w+", shape=(max(1, len(files)), T, D))
+    labels, dialects, skipped = [], Counter(), []
+    for label, p in files:
+        try:
+            seq, meta = _read_npz(p)
+        except Exception as e:
+            skipped.append({"file": str(p), "reason": str(e)})
+            continue
+        if seq is None or seq.shape != (T, D):
+            skipped.append({"file": str(p), "reason": "shape"})
+            continue
+        X[len(labels)] = seq
+        labels.append(label)
+        dialects[meta.get("dialect") or ""] += 1
+    X.flush()
+    del X
+    n = len(labels)
+    # drop the unused tail rows
+    with open(x_tmp, "r+b") as f:
+        f.truncate(n * T * D * 4)
+    np.asarray(labels, dtype=np.int32).tofile(os.path.join(out_dir, "dataset_y.dat.tmp"))
+
+    meta = {
+        "total_samples": n,
+        "sequence_length": int(T),
+        "feature_dim": int(D),
+        "X_dtype": "float32",
+        "y_dtype": "int32",
+        # every class folder keeps its label, even one with no exported sample
+        "num_classes": len(classes),
+        "classes": classes,
+        "class_counts": {str(k): v for k, v in sorted(Counter(labels).items())},
+        "dialect_counts": dict(dialects),
+        "skipped": len(skipped),
+        "exported_at": su.now_str(),
+    }
+    os.replace(x_tmp, os.path.join(out_dir, "dataset_X.dat"))
+    os.replace(os.path.join(out_dir, "dataset_y.dat.tmp"), os.path.join(out_dir, "dataset_y.dat"))
+    with open(os.path.join(out_dir, "dataset_meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return {"ok": True, "meta": meta, "skipped": skipped[:100], "fixed_count": report.get("fixed_count", 0)}
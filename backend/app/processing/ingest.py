@@ -1,24 +1,194 @@
 import cv2, os
+import numpy as np
+import queue
+import threading
 from app.processing.utils import ensure_dir
 
-def sample_frames_from_video(video_path: str, target_fps: float = 5.0):
+def iter_sampled_frames(video_path: str, target_fps: float = 5.0, start_sec: float = 0.0, end_sec: float = None):
     """
-    Decode video and sample frames roughly at target_fps.
-    Returns list of BGR numpy arrays.
+    Decode video and yield (timestamp_sec, BGR frame) on a target_fps time grid.
+    Every frame is grab()bed but only the sampled ones are retrieve()d, so the
+    colour conversion and copy are skipped for dropped frames.
+    start_sec / end_sec restrict decoding to [start_sec, end_sec); the grid starts at start_sec.
     """
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise RuntimeError("Cannot open video file")
-    video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-    sample_rate = max(1, int(video_fps / target_fps))
-    frames = []
-    idx = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if idx % sample_rate == 0:
-            frames.append(frame)
-        idx += 1
-    cap.release()
+    try:
+        video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        step = 1.0 / target_fps if target_fps and target_fps < video_fps else 0.0
+        half_frame = 0.5 / video_fps
+        k = 0  # next grid point is start_sec + k * step (no accumulated float drift)
+        next_ts = start_sec
+        idx = 0
+        if start_sec > 0:
+            cap.set(cv2.CAP_PROP_POS_MSEC, start_sec * 1000.0)
+            idx = int(round(start_sec * video_fps))
+        while cap.grab():
+            # container timestamp when available (handles variable frame rate), else index / fps
+            pos_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            ts = pos_ms / 1000.0 if pos_ms > 0 else idx / video_fps
+            idx += 1
+            if end_sec is not None and ts >= end_sec - half_frame:
+                break
+            if ts < next_ts - half_frame:
+                continue
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            yield ts, frame
+            # advance on the grid; skip grid points already passed (e.g. after a timestamp jump)
+            k = max(k + 1, int((ts - start_sec) / step) + 1) if step else k + 1
+            next_ts = start_sec + k * step
+    finally:
+        cap.release()
+
+def video_duration(video_path: str) -> float:
+    """Duration in seconds from container metadata (0.0 if unknown)."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError("Cannot open video file")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+        return max(0.0, frames / fps)
+    finally:
+        cap.release()
+
+def sample_frames_from_video(video_path: str, target_fps: float = 5.0):
+    """
+    Decode video and sample frames roughly at target_fps.
+    Returns list of BGR numpy arrays.
+    """
+    return [frame for _, frame in iter_sampled_frames(video_path, target_fps)]
+
+def preprocess_frame(frame, max_side: int = 0, roi=None):
+    """
+    Prepare a BGR frame for landmark extraction: optional crop to `roi`
+    ((x0, y0, x1, y1) normalized to the full frame), INTER_AREA downscale so the
+    longest side is <= max_side (0 = keep), then one contiguous BGR->RGB conversion.
+    Returns (rgb, transform); transform = (ox, oy, sx, sy) maps coordinates normalized
+    to the processed image back to the full frame: x_full = ox + x * sx.
+    """
+    H, W = frame.shape[:2]
+    ox, oy, sx, sy = 0.0, 0.0, 1.0, 1.0
+    if roi is not None:
+        x0, y0 = max(0, int(roi[0] * W)), max(0, int(roi[1] * H))
+        x1, y1 = min(W, int(round(roi[2] * W))), min(H, int(round(roi[3] * H)))
+        if x1 - x0 > 1 and y1 - y0 > 1:
+            frame = frame[y0:y1, x0:x1]
+            ox, oy, sx, sy = x0 / W, y0 / H, (x1 - x0) / W, (y1 - y0) / H
+    h, w = frame.shape[:2]
+    if max_side and max(h, w) > max_side:
+        scale = max_side / max(h, w)
+        frame = cv2.resize(frame, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), (ox, oy, sx, sy)
+
+def motion_gate(frames, min_changed: float = 0.002, pixel_delta: int = 12, thumb_width: int = 96,
+                keep_if_static: bool = True):
+    """
+    Skip sampled frames without motion before they reach the landmark model.
+    frames: iterable of (timestamp_sec, BGR frame). Each frame is reduced to a small
+    grayscale thumbnail and compared with the last kept frame; it is kept when at least
+    `min_changed` of the thumbnail pixels changed by more than `pixel_delta` levels.
+    Static lead-in / lead-out and holds are dropped, except the frame right before the
+    first motion (use hold_resample to restore the time axis). A fully static clip
+    yields its last frame unless keep_if_static is False.
+    """
+    ref = None
+    last = None  # most recent frame that was not kept
+    kept = 0
+    try:
+        for ts, frame in frames:
+            h, w = frame.shape[:2]
+            small = cv2.resize(frame, (thumb_width, max(1, round(h * thumb_width / w))), interpolation=cv2.INTER_AREA)
+            thumb = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            if ref is not None:
+                _, moved = cv2.threshold(cv2.absdiff(thumb, ref), pixel_delta, 255, cv2.THRESH_BINARY)
+                if cv2.countNonZero(moved) >= min_changed * thumb.size:
+                    if not kept and last is not None:
+                        yield last  # pose right before the motion starts
+                    ref = thumb
+                    kept += 1
+                    last = None
+                    yield ts, frame
+                    continue
+            else:
+                ref = thumb
+            last = (ts, frame)
+        if not kept and last is not None and keep_if_static:
+            yield last
+    finally:
+        close = getattr(frames, "close", None)
+        if close is not None:
+            close()
+
+def iter_video_frames(video_path: str, target_fps: float = 5.0, motion: float = 0.0,
+                      start_sec: float = 0.0, end_sec: float = None, keep_if_static: bool = True):
+    """iter_sampled_frames, through motion_gate(min_changed=motion) when motion > 0."""
+    frames = iter_sampled_frames(video_path, target_fps, start_sec=start_sec, end_sec=end_sec)
+    if motion > 0:
+        return motion_gate(frames, min_changed=motion, keep_if_static=keep_if_static)
     return frames
+
+def hold_resample(timestamps, seq, fps: float):
+    """
+    Put a (T, D) sequence with (possibly gapped) timestamps back on a uniform 1/fps grid
+    from its first to its last timestamp. Each grid point takes the latest frame at or
+    before it, so frames skipped as static repeat the previous keypoints.
+    """
+    ts = np.asarray(timestamps, dtype=np.float64)
+    if len(ts) < 2:
+        return seq
+    n = int(np.floor((ts[-1] - ts[0]) * fps + 0.5)) + 1
+    grid = ts[0] + np.arange(n) / fps
+    idx = np.searchsorted(ts, grid + 0.5 / fps, side="right") - 1
+    return seq[np.clip(idx, 0, len(ts) - 1)]
+
+_DONE = object()
+
+def prefetch(iterable, maxsize: int = 4):
+    """
+    Run `iterable` on a background thread and yield its items through a bounded queue.
+    OpenCV releases the GIL while decoding, so decode overlaps the consumer's work
+    (MediaPipe inference) while at most `maxsize` frames are held in memory.
+    """
+    if maxsize <= 0:
+        yield from iterable
+        return
+    q = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def producer():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    break
+                q.put(item)
+            q.put(_DONE)
+        except BaseException as e:
+            q.put(e)
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+
+    t = threading.Thread(target=producer, name="frame-prefetch", daemon=True)
+    t.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # consumer stopped early: unblock the producer so the capture is released
+        stop.set()
+        while t.is_alive():
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        t.join()
@@ -0,0 +1,222 @@
+"""
+Cache of raw per-frame keypoint sequences, keyed by video content and extractor config.
+
+Decode + MediaPipe is by far the most expensive stage of the video pipeline. Its output
+(timestamps + the unpadded (T, D) sequence) is stored under
+    dataset/cache/keypoints/<sha[:2]>/<sha256 of video>_<config digest>.npz
+with a .json sidecar carrying the config and the metadata (user, label, ...) of every
+job that used the entry (the first one and each later cache hit), so padding /
+augmentation / export changes can be re-run from here without inference
+(see scripts/reprocess_from_cache.py).
+
+While a long video is being extracted, the rows produced so far are checkpointed as
+segments under dataset/cache/checkpoints/<sha256>_<config digest>/, so a job redelivered
+after a worker died resumes there instead of at frame zero. Jobs of the same video and
+config can run at once (dedup also keys on user / label / dialect), so a directory has
+one owner at a time (claim_checkpoint); other jobs extract without checkpoints. The
+owner drops the checkpoint once the full entry is saved.
+"""
+
+import os
+import json
+import glob
+import uuid
+import hashlib
+import numpy as np
+
+from app.processing import storage_utils as su
+
+CACHE_ROOT = os.path.join(su.DATASET_ROOT, "cache", "keypoints")
+CHECKPOINT_ROOT = os.path.join(su.DATASET_ROOT, "cache", "checkpoints")
+
+CHECKPOINT_LOCK = "owner.lock"
+
+# bump when extraction output changes in a way the config does not capture
+EXTRACTOR_VERSION = 1
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """sha256 of the file contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def config_digest(config: dict, target_fps: float) -> str:
+    """Digest of everything that affects the extracted sequence."""
+    import mediapipe as mp
+    from app.processing.keypoints_adapter import DEFAULT_CONFIG, HOLISTIC_PARAMS
+    key = {
+        "extractor": EXTRACTOR_VERSION,
+        "mediapipe": getattr(mp, "__version__", ""),
+        "holistic": HOLISTIC_PARAMS,
+        "config": {**DEFAULT_CONFIG, **(config or {})},
+        "target_fps": float(target_fps),
+    }
+    blob = json.dumps(key, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+def _tmp_path(path: str) -> str:
+    # unique per writer: two jobs may write the same entry or segment at once
+    return f"{path}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp{os.path.splitext(path)[1]}"
+
+def entry_path(video_hash: str, cfg_digest: str) -> str:
+    return os.path.join(CACHE_ROOT, video_hash[:2], f"{video_hash}_{cfg_digest}.npz")
+
+def load(video_hash: str, cfg_digest: str):
+    """Return (timestamps, sequence) or None on a miss (or an unreadable entry)."""
+    path = entry_path(video_hash, cfg_digest)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            return data["timestamps"], data["sequence"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def entry_jobs(meta: dict) -> list:
+    """Jobs recorded in a sidecar (entries written before "jobs" carry a single "job")."""
+    if "jobs" in meta:
+        return meta["jobs"]
+    return [meta["job"]] if meta.get("job") else []
+
+def _write_meta(meta_path: str, meta: dict, job: dict = None):
+    """Atomic sidecar update that keeps the jobs already recorded and appends `job` (once)."""
+    lock = su.lock_file(os.path.join(os.path.dirname(meta_path), ".sidecar.lock"))
+    try:
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                old = json.load(f)
+        except (OSError, ValueError):
+            old = {}
+        jobs = entry_jobs(old)
+        if job and job not in jobs:
+            jobs.append(job)
+        meta = {**old, **meta, "jobs": jobs}
+        meta.pop("job", None)
+        tmp = _tmp_path(meta_path)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, meta_path)
+    finally:
+        su.unlock_file(lock)
+
+def add_job(video_hash: str, cfg_digest: str, job: dict):
+    """Record another job served by an existing entry (a cache hit), for bulk reprocessing."""
+    path = entry_path(video_hash, cfg_digest)
+    _write_meta(path[:-len(".npz")] + ".json", {"video_sha256": video_hash, "config_digest": cfg_digest}, job)
+
+def save(video_hash: str, cfg_digest: str, timestamps, sequence, config: dict, target_fps: float, job: dict = None):
+    """Write an entry atomically (tmp file + rename); `job` is added to its jobs for bulk reprocessing."""
+    path = entry_path(video_hash, cfg_digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = _tmp_path(path)
+    np.savez(tmp, timestamps=np.asarray(timestamps, dtype=np.float64),
+             sequence=np.asarray(sequence, dtype=np.float32))
+    os.replace(tmp, path)
+    meta = {
+        "video_sha256": video_hash,
+        "config_digest": cfg_digest,
+        "config": config,
+        "target_fps": target_fps,
+        "frames": int(len(sequence)),
+        "created_at": su.now_str(),
+    }
+    # a concurrent job of the same video may have saved (and recorded its job) first
+    _write_meta(path[:-len(".npz")] + ".json", meta, job)
+    return path
+
+def checkpoint_dir(video_hash: str, cfg_digest: str) -> str:
+    return os.path.join(CHECKPOINT_ROOT, f"{video_hash}_{cfg_digest}")
+
+def claim_checkpoint(video_hash: str, cfg_digest: str):
+    """
+    Make the caller the only job using this checkpoint directory: returns the lock fd
+    (pass it to drop_checkpoint / release_checkpoint), or None while another job owns it.
+    """
+    d = checkpoint_dir(video_hash, cfg_digest)
+    lock_path = os.path.join(d, CHECKPOINT_LOCK)
+    while True:
+        os.makedirs(d, exist_ok=True)
+        try:
+            fd = su.try_lock_file(lock_path)
+        except FileNotFoundError:
+            continue  # the previous owner removed the directory meanwhile
+        if fd is None:
+            return None
+        try:
+            # the previous owner may have dropped the lock file we just locked
+            if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        su.unlock_file(fd)
+
+def release_checkpoint(owner: int):
+    """Give up ownership and keep the segments (the job failed: a redelivery resumes from them)."""
+    su.unlock_file(owner)
+
+def save_checkpoint_segment(video_hash: str, cfg_digest: str, first_row: int, timestamps, sequence):
+    """Write rows [first_row, first_row + len(sequence)) of a partial extraction (atomic; owner only)."""
+    d = checkpoint_dir(video_hash, cfg_digest)
+    os.makedirs(d, exist_ok=True)
+    path = os.path.join(d, f"{first_row:08d}.npz")
+    tmp = _tmp_path(path)
+    np.savez(tmp, timestamps=np.asarray(timestamps, dtype=np.float64),
+             sequence=np.asarray(sequence, dtype=np.float32))
+    os.replace(tmp, path)
+    return path
+
+def load_checkpoint(video_hash: str, cfg_digest: str):
+    """(timestamps, sequence) extracted so far by an interrupted job, or None."""
+    ts_parts, seq_parts, n = [], [], 0
+    for path in sorted(glob.glob(os.path.join(checkpoint_dir(video_hash, cfg_digest), "[0-9]*[0-9].npz"))):
+        try:
+            with np.load(path) as data:
+                ts, seq = data["timestamps"], data["sequence"]
+        except (OSError, ValueError, KeyError):
+            break
+        if int(os.path.basename(path)[:-len(".npz")]) != n:
+            break  # keep only the contiguous prefix
+        ts_parts.append(ts)
+        seq_parts.append(seq)
+        n += len(seq)
+    if not n:
+        return None
+    return np.concatenate(ts_parts), np.concatenate(seq_parts, axis=0)
+
+def drop_checkpoint(video_hash: str, cfg_digest: str, owner: int):
+    """Remove the segments of the checkpoint `owner` holds, then give up ownership."""
+    d = checkpoint_dir(video_hash, cfg_digest)
+    try:
+        for path in glob.glob(os.path.join(d, "[0-9]*[0-9].npz")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        # a job waiting on the lock sees the file is gone and locks a new one
+        try:
+            os.remove(os.path.join(d, CHECKPOINT_LOCK))
+            os.rmdir(d)
+        except OSError:
+            pass  # lock file still open (Windows) or a dead writer's temp file: cleanup_stale_uploads takes it
+    finally:
+        su.unlock_file(owner)
+
+def iter_entries(root: str = None):
+    """Yield (npz_path, meta) for every cache entry."""
+    root = root or CACHE_ROOT
+    if not os.path.isdir(root):
+        return
+    for sub in sorted(os.listdir(root)):
+        d = os.path.join(root, sub)
+        if not os.path.isdir(d):
+            continue
+        for fname in sorted(os.listdir(d)):
+            if not fname.endswith(".json"):
+                continue
+            with open(os.path.join(d, fname), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            npz_path = os.path.join(d, fname[:-len(".json")] + ".npz")
+            if os.path.exists(npz_path):
+                yield npz_path, meta
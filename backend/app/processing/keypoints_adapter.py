@@ -4,62 +4,210 @@ Refactored keypoints extraction from collect_dataset.py
 - Flatten into fixed-length vector
 """
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from operator import attrgetter
+from typing import Iterable
 import numpy as np
 import mediapipe as mp
+from app.processing.ingest import preprocess_frame
+from app.processing.layouts import DEFAULT_LAYOUT, get_layout
 
-# constants (giống file collect_dataset.py bạn gửi)
-N_POSE = 25   # upper body
-N_HAND = 21
-N_FACE = 468
+# extraction options; callers override per job through `config`
+DEFAULT_CONFIG = {
+    "layout": DEFAULT_LAYOUT,  # feature layout version (see layouts.py)
+    "max_side": 960,      # downscale longest side before inference (0 = full resolution)
+    "roi_crop": False,    # crop to the previous frame's pose box
+    "roi_margin": 0.25,   # ROI padding, as a fraction of the pose box size
+    "motion_gate": 0.0,   # skip frames with less than this fraction of changed pixels (0 = off; see ingest.motion_gate)
+}
 
-def extract_sequence_from_frames(frames: List[np.ndarray], config: dict = None):
+HOLISTIC_PARAMS = dict(
+    static_image_mode=False,
+    model_complexity=1,
+    min_detection_confidence=0.5,
+    min_tracking_confidence=0.5,
+)
+
+# Holistic graphs of this process (Celery prefork child), created at worker_process_init.
+# "default" serves single-stream extraction; frame-level variants each get their own
+# graph because tracking state belongs to one frame stream.
+_holistics = {}
+
+def get_holistic(name: str = "default"):
+    """Return this process's Holistic graph `name`, building it on first use."""
+    holistic = _holistics.get(name)
+    if holistic is None:
+        holistic = _holistics[name] = mp.solutions.holistic.Holistic(**HOLISTIC_PARAMS)
+    return holistic
+
+def close_holistic():
+    global _variant_pool
+    for holistic in _holistics.values():
+        holistic.close()
+    _holistics.clear()
+    if _variant_pool is not None:
+        _variant_pool.shutdown(wait=True)
+        _variant_pool = None
+
+def reset_tracking(holistic):
+    """Drop tracking state from the previous video without rebuilding the graph."""
+    holistic.reset()
+
+def extract_sequence_from_frames(frames: Iterable[np.ndarray], config: dict = None, holistic=None,
+                                 n_frames: int = 0, checkpoint=None, checkpoint_every: int = 0):
     """
-    frames: list of BGR images
-    return: np.ndarray shape (T, D)
+    frames: iterable of BGR images (a list or a streaming generator; each frame is
+            released as soon as its keypoints are extracted)
+    holistic: detector to use; defaults to the process-wide instance
+    n_frames: expected frame count, used to size the output buffer (grown as needed)
+    checkpoint: called with the rows extracted so far (a view) every `checkpoint_every` frames
+    return: np.ndarray shape (T, D) float32
     """
-    mp_holistic = mp.solutions.holistic
-    seq = []
-    with mp_holistic.Holistic(
-        static_image_mode=False,
-        model_complexity=1,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5
-    ) as holistic:
-        for frame in frames:
-            img_rgb = frame[:, :, ::-1]
-            results = holistic.process(img_rgb)
-            kp_dict = extract_keypoints_from_results(results)
-            vec = flatten_keypoints(kp_dict)
-            seq.append(vec)
-    if len(seq) == 0:
+    cfg = {**DEFAULT_CONFIG, **(config or {})}
+    layout = get_layout(cfg["layout"])
+    if holistic is None:
+        holistic = get_holistic()
+    reset_tracking(holistic)
+    if not n_frames and hasattr(frames, "__len__"):
+        n_frames = len(frames)
+    buf = SequenceBuffer(layout.dim, n_frames or 64)
+    pose_x, pose_y = layout.field_indices("pose", "x"), layout.field_indices("pose", "y")
+    roi = None
+    for frame in frames:
+        img_rgb, transform = preprocess_frame(frame, cfg["max_side"], roi)
+        results = holistic.process(img_rgb)
+        row = buf.next_row()
+        write_keypoints(results, row, transform, layout)
+        if cfg["roi_crop"]:
+            pose = np.stack([row[pose_x], row[pose_y]], axis=1) if results.pose_landmarks else None
+            roi = update_roi(roi, pose, cfg["roi_margin"])
+        if checkpoint is not None and checkpoint_every > 0 and len(buf) % checkpoint_every == 0:
+            checkpoint(buf.array())
+    if len(buf) == 0:
         return np.zeros((0, 0), dtype=np.float32)
-    return np.stack(seq, axis=0)
+    return buf.array()
+
+_variant_pool = None
+
+def _get_variant_pool(n: int):
+    global _variant_pool
+    if _variant_pool is None or _variant_pool._max_workers < n:
+        if _variant_pool is not None:
+            _variant_pool.shutdown(wait=True)
+        _variant_pool = ThreadPoolExecutor(max_workers=n, thread_name_prefix="holistic-variant")
+    return _variant_pool
+
+def extract_variant_sequences(frames: Iterable[np.ndarray], variants, config: dict = None, n_frames: int = 0):
+    """
+    Frame-level (Stage A) augmentation in one pass: every frame is decoded and
+    downscaled/converted once, then each variant (augmenter.FRAME_VARIANTS, e.g.
+    "original", "flipped") is derived in uint8 buffers and run through its own Holistic
+    graph; the variants of a frame run concurrently on a thread pool (MediaPipe and
+    OpenCV release the GIL). ROI cropping is not applied here.
+    return: {variant: np.ndarray (T, D) float32}
+    """
+    from app.processing.augmenter import make_frame_variant
+    cfg = {**DEFAULT_CONFIG, **(config or {})}
+    layout = get_layout(cfg["layout"])
+    variants = list(variants)
+    if not n_frames and hasattr(frames, "__len__"):
+        n_frames = len(frames)
+    ops = {v: make_frame_variant(v) for v in variants}
+    holistics = {v: get_holistic("default" if v == "original" else v) for v in variants}
+    bufs = {v: SequenceBuffer(layout.dim, n_frames or 64) for v in variants}
+    for holistic in holistics.values():
+        reset_tracking(holistic)
+    pool = _get_variant_pool(len(variants))
+
+    def run(v, rgb, transform):
+        results = holistics[v].process(ops[v](rgb))
+        write_keypoints(results, bufs[v].next_row(), transform, layout)
+
+    for frame in frames:
+        rgb, transform = preprocess_frame(frame, cfg["max_side"])
+        # wait for every variant before the next frame: variant buffers are reused
+        for f in [pool.submit(run, v, rgb, transform) for v in variants]:
+            f.result()
+    return {v: (b.array() if len(b) else np.zeros((0, 0), dtype=np.float32)) for v, b in bufs.items()}
 
-def extract_keypoints_from_results(results):
-    def lm_to_list(landmarks, expected_n):
+class SequenceBuffer:
+    """(T, D) float32 buffer filled one row per frame; capacity doubles when full."""
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self._buf = np.empty((max(1, capacity), dim), dtype=np.float32)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def next_row(self) -> np.ndarray:
+        if self._n == self._buf.shape[0]:
+            grown = np.empty((2 * self._buf.shape[0], self._buf.shape[1]), dtype=np.float32)
+            grown[:self._n] = self._buf
+            self._buf = grown
+        row = self._buf[self._n]
+        self._n += 1
+        return row
+
+    def array(self) -> np.ndarray:
+        return self._buf[:self._n]
+
+def update_roi(roi, pose, margin=0.25):
+    """
+    Next frame's crop box from this frame's pose (full-frame normalized).
+    The box is kept while the pose stays inside it, so the tracker does not see a
+    new crop every frame; no pose -> full frame.
+    """
+    if pose is None:
+        return None
+    x0, y0 = pose[:, 0].min(), pose[:, 1].min()
+    x1, y1 = pose[:, 0].max(), pose[:, 1].max()
+    if roi is not None and x0 >= roi[0] and y0 >= roi[1] and x1 <= roi[2] and y1 <= roi[3]:
+        return roi
+    mx, my = (x1 - x0) * margin, (y1 - y0) * margin
+    return (max(0.0, x0 - mx), max(0.0, y0 - my), min(1.0, x1 + mx), min(1.0, y1 + my))
+
+# per-layout-part attribute getters, e.g. attrgetter("x", "y", "z", "visibility")
+_getters = {}
+
+def write_keypoints(results, out: np.ndarray, transform=None, layout=None):
+    """
+    Write the parts of `layout` from Holistic `results` into the flat row `out` (layout.dim,).
+    Landmark fields are pulled in bulk (attrgetter + fromiter, no per-landmark lists) and
+    mapped back to full-frame normalized coordinates in place; missing parts are zeroed.
+    """
+    layout = layout or get_layout()
+    ox, oy, sx, sy = transform or (0.0, 0.0, 1.0, 1.0)
+    for p in layout.parts:
+        dst = out[layout.slice(p.name)].reshape(p.n, len(p.fields))
+        landmarks = getattr(results, p.source)
         if not landmarks:
-            return np.zeros((expected_n, 3), dtype=np.float32)
-        coords = []
-        for i in range(expected_n):
-            if i < len(landmarks.landmark):
-                lm = landmarks.landmark[i]
-                coords.append([lm.x, lm.y, getattr(lm, "z", 0.0)])
-            else:
-                coords.append([0.0, 0.0, 0.0])
-        return np.array(coords, dtype=np.float32)
-
-    return {
-        "pose": lm_to_list(results.pose_landmarks, N_POSE),
-        "left_hand": lm_to_list(results.left_hand_landmarks, N_HAND),
-        "right_hand": lm_to_list(results.right_hand_landmarks, N_HAND),
-        "face": lm_to_list(results.face_landmarks, N_FACE)
-    }
-
-def flatten_keypoints(kp_dict):
-    # flatten order: pose, left, right, face
-    pose = kp_dict["pose"].flatten()
-    left = kp_dict["left_hand"].flatten()
-    right = kp_dict["right_hand"].flatten()
-    face = kp_dict["face"].flatten()
-    return np.concatenate([pose, left, right, face], axis=0)
+            dst[:] = 0.0
+            continue
+        lms = landmarks.landmark
+        n = min(p.n, len(lms))
+        getter = _getters.get(p.fields)
+        if getter is None:
+            getter = _getters[p.fields] = attrgetter(*p.fields)
+        dst[:n] = np.fromiter(chain.from_iterable(map(getter, lms[:n])), dtype=np.float32,
+                              count=n * len(p.fields)).reshape(n, len(p.fields))
+        dst[n:] = 0.0
+        if (ox, oy, sx, sy) != (0.0, 0.0, 1.0, 1.0):
+            # z shares x's scale
+            for field, off, scale in (("x", ox, sx), ("y", oy, sy), ("z", 0.0, sx)):
+                if field in p.fields:
+                    col = dst[:n, p.fields.index(field)]
+                    col *= scale
+                    col += off
+    return out
+
+def extract_keypoints_from_results(results, transform=None, layout=None):
+    """Convert the parts of `layout` (only those) into {part: (n, len(fields)) float32}."""
+    layout = layout or get_layout()
+    vec = write_keypoints(results, np.empty(layout.dim, dtype=np.float32), transform, layout)
+    return {p.name: vec[layout.slice(p.name)].reshape(p.n, len(p.fields)) for p in layout.parts}
+def flatten_keypoints(kp_dict, layout=None):
+    # flatten in layout order (default: pose, left_hand, right_hand)
+    layout = layout or get_layout()
+    return np.concatenate([kp_dict[p.name].reshape(-1) for p in layout.parts], axis=0)
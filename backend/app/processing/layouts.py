@@ -0,0 +1,98 @@
+"""
+Versioned feature layouts.
+
+A layout fixes which landmark groups make up one frame vector, in which order, and
+which fields each point carries. The video pipeline, the camera upload path and the
+training tools all resolve layouts from this registry, so samples from either ingest
+path have the same columns. The layout version is stored in each sample's metadata.
+
+This module only depends on numpy so tools/ can import it without the backend stack.
+"""
+
+from typing import Dict, List, NamedTuple, Tuple
+import numpy as np
+
+
+class Part(NamedTuple):
+    name: str                 # key in payloads / kp dicts ("pose", "left_hand", ...)
+    source: str               # MediaPipe Holistic results attribute
+    n: int                    # number of points kept (extra points are dropped)
+    fields: Tuple[str, ...]   # per-point values, in order
+
+
+class FeatureLayout:
+    def __init__(self, version: str, parts: List[Part]):
+        self.version = version
+        self.parts = list(parts)
+        self.offsets: Dict[str, int] = {}
+        off = 0
+        for p in self.parts:
+            self.offsets[p.name] = off
+            off += p.n * len(p.fields)
+        self.dim = off
+
+    def part(self, name: str) -> Part:
+        for p in self.parts:
+            if p.name == name:
+                return p
+        raise KeyError(f"layout {self.version} has no part {name!r}")
+
+    def slice(self, name: str) -> slice:
+        p = self.part(name)
+        start = self.offsets[name]
+        return slice(start, start + p.n * len(p.fields))
+
+    def field_indices(self, name: str, field: str) -> np.ndarray:
+        """Column indices of one field (e.g. every x of the pose) in the flat frame vector."""
+        p = self.part(name)
+        if field not in p.fields:
+            return np.zeros((0,), dtype=np.int64)
+        k = len(p.fields)
+        return self.offsets[name] + np.arange(p.n) * k + p.fields.index(field)
+
+    def __repr__(self):
+        return f"FeatureLayout({self.version!r}, dim={self.dim})"
+
+
+XYZ = ("x", "y", "z")
+XYZV = ("x", "y", "z", "visibility")
+
+LAYOUTS: Dict[str, FeatureLayout] = {}
+
+def register_layout(layout: FeatureLayout) -> FeatureLayout:
+    if layout.version in LAYOUTS:
+        raise ValueError(f"layout {layout.version} already registered")
+    LAYOUTS[layout.version] = layout
+    return layout
+
+def get_layout(version: str = None) -> FeatureLayout:
+    version = version or DEFAULT_LAYOUT
+    try:
+        return LAYOUTS[version]
+    except KeyError:
+        raise ValueError(f"unknown feature layout {version!r} (known: {', '.join(LAYOUTS)})")
+
+def layout_for_dim(dim: int) -> FeatureLayout:
+    """Best-effort lookup for legacy samples stored without a layout version."""
+    for layout in LAYOUTS.values():
+        if layout.dim == dim:
+            return layout
+    raise ValueError(f"no registered layout has dim {dim}")
+
+
+# v1: original video pipeline output, pose xyz + hands xyz + 468 face points (1605 dims)
+HOLISTIC_FULL_V1 = register_layout(FeatureLayout("holistic_full_v1", [
+    Part("pose", "pose_landmarks", 25, XYZ),
+    Part("left_hand", "left_hand_landmarks", 21, XYZ),
+    Part("right_hand", "right_hand_landmarks", 21, XYZ),
+    Part("face", "face_landmarks", 468, XYZ),
+]))
+
+# v2: upper-body pose with visibility + both hands, no face (226 dims; see OPTIMIZATION_SUMMARY.md)
+POSE_HANDS_V2 = register_layout(FeatureLayout("pose_hands_v2", [
+    Part("pose", "pose_landmarks", 25, XYZV),
+    Part("left_hand", "left_hand_landmarks", 21, XYZ),
+    Part("right_hand", "right_hand_landmarks", 21, XYZ),
+]))
+
+DEFAULT_LAYOUT = POSE_HANDS_V2.version
@@ -0,0 +1,99 @@
+"""
+Parallel chunked keypoint extraction for long videos.
+
+The video is split into time chunks; each chunk is decoded and run through MediaPipe
+in a pool process with its own Holistic graph. Every chunk starts decoding `overlap`
+seconds early so the tracker has warmed up by the chunk boundary; those warm-up frames
+are dropped when the chunks are stitched back together. With the motion gate on, a
+fully static video still yields its last frame, as in the sequential pass.
+
+The pool is billiard's (Celery's multiprocessing fork): a Celery prefork worker process
+is daemonic, and the stdlib refuses to start children from a daemonic process, while
+billiard allows it.
+"""
+
+import math
+import billiard
+import numpy as np
+
+from app.processing.ingest import iter_video_frames
+
+_pool = None
+_pool_size = 0
+
+def plan_chunks(duration: float, target_fps: float, chunk_sec: float, overlap_sec: float):
+    """
+    Return [(warm_start, start, end), ...] covering [0, duration).
+    Boundaries sit on the target_fps sampling grid so the stitched sequence samples
+    exactly the frames a sequential pass would.
+    """
+    step = 1.0 / target_fps
+    chunk_steps = max(1, int(round(chunk_sec / step)))
+    overlap_steps = int(math.ceil(overlap_sec / step))
+    n_steps = int(math.ceil(duration / step))
+    chunks = []
+    for k in range(0, n_steps, chunk_steps):
+        start = k * step
+        end = min(k + chunk_steps, n_steps) * step if k + chunk_steps < n_steps else None
+        warm_start = max(0, k - overlap_steps) * step
+        chunks.append((warm_start, start, end))
+    return chunks
+
+def _init_pool_process():
+    # each pool process owns one detector for its lifetime
+    from app.processing.keypoints_adapter import get_holistic
+    get_holistic()
+
+def _extract_chunk(video_path: str, warm_start: float, start: float, end, target_fps: float, config: dict,
+                   keep_if_static: bool = False):
+    from app.processing.keypoints_adapter import extract_sequence_from_frames
+    timestamps = []
+
+    def frames():
+        # by default a static chunk contributes nothing (no fallback frame), so static lead-out stays trimmed
+        for ts, frame in iter_video_frames(video_path, target_fps, config.get("motion_gate", 0.0),
+                                           start_sec=warm_start, end_sec=end, keep_if_static=keep_if_static):
+            timestamps.append(ts)
+            yield frame
+
+    seq = extract_sequence_from_frames(frames(), config)
+    ts = np.asarray(timestamps, dtype=np.float64)
+    keep = ts >= start - 0.5 / target_fps
+    return ts[keep], seq[keep] if seq.size else seq
+
+def get_pool(processes: int):
+    """Process pool shared by all jobs of this worker process (spawned, so no forked MediaPipe state)."""
+    global _pool, _pool_size
+    if _pool is None or _pool_size != processes:
+        shutdown_pool()
+        _pool = billiard.get_context("spawn").Pool(processes=processes, initializer=_init_pool_process)
+        _pool_size = processes
+    return _pool
+
+def shutdown_pool():
+    global _pool, _pool_size
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+        _pool_size = 0
+
+def extract_sequence_parallel(video_path: str, duration: float, target_fps: float, config: dict,
+                              processes: int, chunk_sec: float, overlap_sec: float):
+    """
+    Extract keypoints for the whole video using `processes` pool workers.
+    Returns (timestamps (T,), sequence (T, D)) in time order.
+    """
+    chunks = plan_chunks(duration, target_fps, chunk_sec, overlap_sec)
+    pool = get_pool(processes)
+    results = [pool.apply_async(_extract_chunk, (video_path, w, s, e, target_fps, config)) for w, s, e in chunks]
+    parts = [r.get() for r in results]
+    parts = [(ts, seq) for ts, seq in parts if len(ts)]
+    if not parts and chunks:
+        # every chunk was static: like the sequential pass, keep the video's last frame
+        w, s, e = chunks[-1]
+        ts, seq = pool.apply_async(_extract_chunk, (video_path, w, s, e, target_fps, config, True)).get()
+        parts = [(ts, seq)] if len(ts) else []
+    if not parts:
+        return np.zeros((0,), dtype=np.float64), np.zeros((0, 0), dtype=np.float32)
+    return np.concatenate([ts for ts, _ in parts]), np.concatenate([seq for _, seq in parts], axis=0)
@@ -1,24 +1,209 @@
-from app.processing.ingest import sample_frames_from_video
-from app.processing.keypoints_adapter import extract_sequence_from_frames
+from app.processing.ingest import iter_video_frames, hold_resample, prefetch, video_duration
+from app.processing.keypoints_adapter import extract_sequence_from_frames, extract_variant_sequences
+from app.processing.parallel_extract import extract_sequence_parallel
 from app.processing.augmenter import generate_augmented_sequences
 from app.processing import storage_utils as su
+from app.processing import keypoint_cache as kc
+from app.processing.progress import JobProgress, JobCancelled
+from app.config import settings
 import numpy as np
 import os
+import time
 
-def process_video_job(video_path: str, user: str, label: str, session_id: str, dialect: str = ""):
+TARGET_FPS = 6.0
+
+def extractor_config():
+    """Keypoint extractor config of this deployment (see keypoints_adapter.DEFAULT_CONFIG)."""
+    return {"layout": settings.feature_layout, "max_side": settings.max_frame_side, "roi_crop": settings.roi_crop,
+            "motion_gate": settings.motion_gate}
+
+def restore_time_axis(timestamps, seq, config: dict):
+    """Motion-gated sequences have gaps: resample them back onto the uniform TARGET_FPS grid."""
+    if config.get("motion_gate") and seq.size:
+        return hold_resample(timestamps, seq, TARGET_FPS)
+    return seq
+
+def _decoded_frames(video_path: str, config: dict, timestamps: list, progress: JobProgress, start_sec: float = 0.0):
     """
-    Synchronous function to process video without Celery decorator.
-    This is called by the Celery task in tasks.py
+    Sampled (and motion-gated) frames of the video, recording their timestamps.
+    Runs on the prefetch thread: decode time is measured there with thread CPU time.
     """
+    # resuming mid-video: a static remainder adds nothing (no fallback frame)
+    frames = iter_video_frames(video_path, TARGET_FPS, config.get("motion_gate", 0.0), start_sec=start_sec,
+                               keep_if_static=start_sec == 0)
     try:
-        frames = sample_frames_from_video(video_path, target_fps=6.0)
-        if not frames:
-            raise RuntimeError("No frames extracted")
+        while True:
+            w0, c0 = time.perf_counter(), time.thread_time()
+            try:
+                ts, frame = next(frames)
+            except StopIteration:
+                return
+            progress.add_time("decode", time.perf_counter() - w0, time.thread_time() - c0)
+            progress.incr("frames_decoded")
+            timestamps.append(ts)
+            yield frame
+    finally:
+        frames.close()
 
-        seq = extract_sequence_from_frames(frames)
-        if seq.size == 0:
-            raise RuntimeError("No keypoints extracted")
+def _extracted(frames, progress: JobProgress):
+    # the consumer asks for the next frame once it is done with the previous one
+    try:
+        for frame in frames:
+            yield frame
+            progress.incr("frames_extracted")
+    finally:
+        frames.close()
+
+def _resume_point(done_ts):
+    """
+    Where to restart after a checkpoint ending at done_ts[-1]: decoding starts
+    CHUNK_OVERLAP_SECONDS earlier on the sampling grid so the tracker is warm again,
+    and only frames from the next grid point on are kept.
+    """
+    step = 1.0 / TARGET_FPS
+    k_next = int(round(done_ts[-1] / step)) + 1
+    warm_k = max(0, k_next - int(np.ceil(settings.chunk_overlap_seconds / step)))
+    return warm_k * step, k_next * step - 0.5 * step
+
+def _checkpoint_writer(checkpoint_key, timestamps: list, keep_from: float, first_row: int, progress: JobProgress):
+    """Callback for extract_sequence_from_frames: writes the rows added since its last call as one segment."""
+    written = 0
+
+    def write(rows):
+        nonlocal written, first_row
+        ts = np.asarray(timestamps[written:len(rows)], dtype=np.float64)
+        new = rows[written:]
+        written = len(rows)
+        keep = ts >= keep_from
+        if keep.any():
+            kc.save_checkpoint_segment(*checkpoint_key, first_row, ts[keep], new[keep])
+            first_row += int(keep.sum())
+            progress.incr("checkpoints")
+    return write
+
+def extract_keypoints(video_path: str, config: dict, progress: JobProgress = None, checkpoint_key=None):
+    """
+    Decode + MediaPipe for the whole video. Returns (timestamps (T,), sequence (T, D)).
+    checkpoint_key: (video_hash, config digest); the sequential pass then checkpoints every
+    KEYPOINT_CHECKPOINT_FRAMES frames and resumes from an earlier run's checkpoint.
+    """
+    progress = progress or JobProgress()
+    duration = video_duration(video_path) if settings.extract_processes > 1 else 0.0
+    if duration >= settings.parallel_min_seconds > 0:
+        # long video: overlapping time chunks on a process pool, stitched in order
+        # (decode happens inside the pool, so it is part of the extract stage here)
+        with progress.stage("extract"):
+            timestamps, seq = extract_sequence_parallel(video_path, duration, TARGET_FPS, config,
+                                                        processes=settings.extract_processes,
+                                                        chunk_sec=settings.chunk_seconds,
+                                                        overlap_sec=settings.chunk_overlap_seconds)
+        progress.set("frames_decoded", len(timestamps))
+        progress.set("frames_extracted", len(seq))
+        return timestamps, seq
+    every = settings.keypoint_checkpoint_frames if checkpoint_key else 0
+    done = kc.load_checkpoint(*checkpoint_key) if every > 0 else None
+    start_sec, keep_from = 0.0, 0.0
+    if done is not None:
+        start_sec, keep_from = _resume_point(done[0])
+        progress.set("resumed_frames", len(done[1]))
+    # decode -> extract as a stream: only a few frames are alive at any time
+    timestamps = []
+    frames = prefetch(_decoded_frames(video_path, config, timestamps, progress, start_sec),
+                      maxsize=settings.decode_prefetch)
+    checkpoint = (_checkpoint_writer(checkpoint_key, timestamps, keep_from, len(done[1]) if done else 0, progress)
+                  if every > 0 else None)
+    with progress.stage("extract"):
+        seq = extract_sequence_from_frames(_extracted(frames, progress), config, checkpoint=checkpoint,
+                                           checkpoint_every=every)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if done is None:
+        return timestamps, seq
+    # drop the warm-up frames and append to the checkpointed part
+    keep = timestamps >= keep_from
+    if not seq.size or not keep.any():
+        return done
+    return np.concatenate([done[0], timestamps[keep]]), np.concatenate([done[1], seq[keep]], axis=0)
+
+def frame_variants():
+    """Stage A variants to extract per video ("original" first) from FRAME_AUGMENTATIONS."""
+    extra = [v.strip() for v in settings.frame_augmentations.split(",") if v.strip() and v.strip() != "original"]
+    return ["original"] + list(dict.fromkeys(extra))
 
+def variant_config(config: dict, variant: str):
+    # "original" keeps the plain extractor config so its cache entries are shared with non-augmented jobs
+    return config if variant == "original" else {**config, "frame_variant": variant}
+
+def extract_variant_keypoints(video_path: str, config: dict, variants, progress: JobProgress = None):
+    """One decode pass for all Stage A variants. Returns (timestamps (T,), {variant: (T, D)})."""
+    progress = progress or JobProgress()
+    timestamps = []
+    frames = prefetch(_decoded_frames(video_path, config, timestamps, progress), maxsize=settings.decode_prefetch)
+    with progress.stage("extract"):
+        seqs = extract_variant_sequences(_extracted(frames, progress), variants, config)
+    return np.asarray(timestamps, dtype=np.float64), seqs
+
+def extract_variant_keypoints_cached(video_path: str, config: dict, variants, job: dict = None, video_hash: str = "",
+                                     progress: JobProgress = None):
+    """extract_variant_keypoints through the keypoint cache; one entry per variant."""
+    progress = progress or JobProgress()
+    config = {**config, "roi_crop": False}  # the variant pass never crops, keep cache keys honest
+    if not settings.keypoint_cache:
+        return extract_variant_keypoints(video_path, config, variants, progress)
+    with progress.stage("hash"):
+        video_hash = video_hash or kc.file_digest(video_path)
+        digests = {v: kc.config_digest(variant_config(config, v), TARGET_FPS) for v in variants}
+        hits = {v: kc.load(video_hash, d) for v, d in digests.items()}
+    if all(hit is not None for hit in hits.values()):
+        progress.set("cache_hit", True)
+        for v, d in digests.items():
+            kc.add_job(video_hash, d, {**(job or {}), "video_path": video_path, "frame_variant": v})
+        return hits["original"][0], {v: hit[1] for v, hit in hits.items()}
+    timestamps, seqs = extract_variant_keypoints(video_path, config, variants, progress)
+    for v, seq in seqs.items():
+        if seq.size:
+            kc.save(video_hash, digests[v], timestamps, seq, variant_config(config, v), TARGET_FPS,
+                    job={**(job or {}), "video_path": video_path, "frame_variant": v})
+    return timestamps, seqs
+
+def extract_keypoints_cached(video_path: str, config: dict, job: dict = None, video_hash: str = "",
+                             progress: JobProgress = None):
+    """
+    extract_keypoints through the keypoint cache (keyed by video sha256 + extractor config).
+    `job` (user, label, ...) is recorded with the entry, new or hit, for bulk reprocessing.
+    `video_hash`: sha256 of the file when already known (computed during upload).
+    """
+    progress = progress or JobProgress()
+    if not settings.keypoint_cache:
+        return extract_keypoints(video_path, config, progress)
+    with progress.stage("hash"):
+        video_hash = video_hash or kc.file_digest(video_path)
+        cfg_digest = kc.config_digest(config, TARGET_FPS)
+        hit = kc.load(video_hash, cfg_digest)
+    if hit is not None:
+        progress.set("cache_hit", True)
+        kc.add_job(video_hash, cfg_digest, {**(job or {}), "video_path": video_path})
+        return hit
+    # another job extracting the same video and config owns the checkpoint: run without one
+    owner = kc.claim_checkpoint(video_hash, cfg_digest) if settings.keypoint_checkpoint_frames > 0 else None
+    try:
+        timestamps, seq = extract_keypoints(video_path, config, progress,
+                                            checkpoint_key=(video_hash, cfg_digest) if owner is not None else None)
+        if seq.size:
+            kc.save(video_hash, cfg_digest, timestamps, seq, config, TARGET_FPS,
+                    job={**(job or {}), "video_path": video_path})
+        if owner is not None:
+            kc.drop_checkpoint(video_hash, cfg_digest, owner)
+            owner = None
+    finally:
+        if owner is not None:
+            kc.release_checkpoint(owner)
+    return timestamps, seq
+
+def build_samples(seq: np.ndarray, user: str, label: str, session_id: str, dialect: str = "", layout: str = None,
+                  frame_variant: str = "original", progress: JobProgress = None):
+    """Pad/trim a raw keypoint sequence, augment it (Stage B) and save every variant as a sample."""
+    progress = progress or JobProgress()
+    with progress.stage("augment"):
         T, D = seq.shape
         target_T = 60
         if T < target_T:
@@ -29,14 +214,51 @@ def process_video_job(video_path: str, user: str, label: str, session_id: str, d
 
         augmented_seq_list = generate_augmented_sequences(seq_padded)
 
+    with progress.stage("save"):
         class_idx, folder = su.register_label(label)
         saved_paths = []
         for aseq in augmented_seq_list:
-            meta = {"user": user, "session_id": session_id, "frames": target_T, "source": "video", "dialect": dialect}
+            meta = {"user": user, "session_id": session_id, "frames": target_T, "source": "video", "dialect": dialect,
+                    "layout": layout, "frame_variant": frame_variant}
             path = su.save_sample(aseq, class_idx, folder, metadata=meta)
             saved_paths.append(path)
+            progress.incr("samples_saved")
+    progress.incr("variants_saved")
+    return saved_paths
+
+def process_video_job(video_path: str, user: str, label: str, session_id: str, dialect: str = "",
+                      video_sha256: str = "", progress: JobProgress = None):
+    """
+    Synchronous function to process video without Celery decorator.
+    This is called by the Celery task in tasks.py
+    progress: receives frame/sample counters and per-stage timings
+    """
+    progress = progress or JobProgress()
+    try:
+        config = extractor_config()
+        job = {"user": user, "label": label, "session_id": session_id, "dialect": dialect}
+        variants = frame_variants()
+        if len(variants) > 1:
+            # Stage A: all frame-level variants from a single decode pass
+            timestamps, seqs = extract_variant_keypoints_cached(video_path, config, variants, job, video_sha256,
+                                                                 progress)
+        else:
+            timestamps, seq = extract_keypoints_cached(video_path, config, job, video_sha256, progress)
+            seqs = {"original": seq}
+        seqs = {v: restore_time_axis(timestamps, vseq, config) for v, vseq in seqs.items()}
+        seq = seqs["original"]
+        if seq.shape[0] == 0:
+            raise RuntimeError("No frames extracted")
+        if seq.size == 0:
+            raise RuntimeError("No keypoints extracted")
 
+        saved_paths = []
+        for variant, vseq in seqs.items():
+            saved_paths += build_samples(vseq, user, label, session_id, dialect, layout=config["layout"],
+                                         frame_variant=variant, progress=progress)
         return {"status": "success", "saved": saved_paths}
 
+    except JobCancelled:
+        raise
     except Exception as e:
         raise Exception(f"Pipeline processing failed: {str(e)}")
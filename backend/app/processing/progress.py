@@ -0,0 +1,93 @@
+"""
+Job progress and per-stage timing for the video pipeline.
+
+Counters (frames_decoded, frames_extracted, samples_saved, ...) and stage timings
+(wall + CPU seconds per stage: hash, decode, extract, augment, save) are collected
+while a job runs and pushed to `callback` (the Celery task's update_state) at most
+every `min_interval` seconds. The final snapshot is returned with the job result.
+
+`should_stop` (optional) is polled at the same points, on the job's own thread: when it
+returns a reason (cancelled, deadline passed) JobCancelled is raised, so a job stops at
+the next stage boundary or frame instead of running to the end.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+class JobCancelled(Exception):
+    pass
+
+class JobProgress:
+    def __init__(self, callback=None, min_interval: float = 0.5, should_stop=None):
+        self._callback = callback
+        self._should_stop = should_stop
+        self._min_interval = min_interval
+        self._owner = threading.get_ident()  # publish only from the job's own thread
+        self._lock = threading.Lock()
+        self._last_publish = 0.0
+        self._started = time.perf_counter()
+        self.stage_name = ""
+        self.counters = {}
+        self.stages = {}
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+        self.publish()
+
+    def set(self, name: str, value):
+        with self._lock:
+            self.counters[name] = value
+        self.publish()
+
+    def add_time(self, stage: str, wall: float, cpu: float = 0.0):
+        with self._lock:
+            st = self.stages.setdefault(stage, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+            st["wall_s"] += wall
+            st["cpu_s"] += cpu
+            st["calls"] += 1
+
+    @contextmanager
+    def stage(self, name: str, cpu_clock=time.process_time):
+        """
+        Time a block as stage `name`. CPU defaults to process time (includes MediaPipe's
+        and the decode thread's work during the block); pass time.thread_time for code
+        running on its own thread.
+        """
+        prev, self.stage_name = self.stage_name, name
+        self.publish(force=True)
+        w0, c0 = time.perf_counter(), cpu_clock()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - w0, cpu_clock() - c0)
+            self.stage_name = prev
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "stage": self.stage_name,
+                "counters": dict(self.counters),
+                "stages": {k: {"wall_s": round(v["wall_s"], 4), "cpu_s": round(v["cpu_s"], 4), "calls": v["calls"]}
+                           for k, v in self.stages.items()},
+                "elapsed_s": round(time.perf_counter() - self._started, 4),
+            }
+
+    def publish(self, force: bool = False):
+        if (self._callback is None and self._should_stop is None) or threading.get_ident() != self._owner:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_publish < self._min_interval:
+            return
+        self._last_publish = now
+        if self._should_stop is not None:
+            reason = self._should_stop()
+            if reason:
+                raise JobCancelled(reason)
+        if self._callback is None:
+            return
+        try:
+            self._callback(self.snapshot())
+        except Exception:
+            pass  # progress is best effort, never fail the job for it
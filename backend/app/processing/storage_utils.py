@@ -13,11 +13,18 @@ import json
 import shutil
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows dev setup
+    fcntl = None
+    import msvcrt
+
 # ---- Config paths ----
 DATASET_ROOT = "dataset"
 FEATURE_ROOT = os.path.join(DATASET_ROOT, "features")
 LABELS_CSV = os.path.join(DATASET_ROOT, "labels.csv")
 SAMPLES_CSV = os.path.join(DATASET_ROOT, "samples.csv")
+UPLOADS_ROOT = os.path.join(DATASET_ROOT, "uploads")  # in-progress resumable video uploads
 
 # ---- Utils ----
 def slugify(text: str, maxlen: int = 20) -> str:
@@ -34,6 +41,42 @@ def slugify(text: str, maxlen: int = 20) -> str:
 def now_str() -> str:
     return datetime.utcnow().isoformat() + "Z"
 
+# ---- File locks ----
+def try_lock_file(path):
+    """
+    Non-blocking exclusive lock on `path` (created if missing); returns the open fd, or None
+    while another holder (any process) has it. The OS drops the lock with the process,
+    so a crash cannot leave it held. Release with unlock_file.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+def lock_file(path):
+    """Blocking exclusive lock on `path` (created if missing); returns the open fd for unlock_file."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+    except OSError:
+        os.close(fd)
+        raise
+    return fd
+
+def unlock_file(fd):
+    if fcntl is None:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    os.close(fd)
+
 # ---- CSV helpers ----
 def read_csv(csv_path):
     if not os.path.exists(csv_path):
@@ -6,6 +6,8 @@ import os
 import shutil
 
 from app.processing import storage_utils as su
+from app.processing.layouts import get_layout
+from app.core import job_history
 from app.core.oauth2 import get_current_admin
 
 router = APIRouter(prefix="/dataset", tags=["dataset"])
@@ -57,6 +59,24 @@ def merge_labels(src_class_idx: int = Form(...), dst_class_idx: int = Form(...))
     return {"status": "success" if ok else "failed"}
 
 
+@router.post("/export")
+def export_dataset(fix: bool = False, current_admin = Depends(get_current_admin)):
+    """Queue a memmap export (export queue); poll /jobs/{id} for the report."""
+    from app.tasks import export_dataset as export_task
+    job = export_task.delay(fix=fix)
+    job_history.record_enqueued(job.id, "export", "export")
+    return {"job_id": job.id, "status": "queued"}
+
+
+@router.post("/validate")
+def validate_dataset(fix: bool = False, current_admin = Depends(get_current_admin)):
+    """Queue a dataset validation (validation queue); poll /jobs/{id} for the report."""
+    from app.tasks import validate_dataset as validate_task
+    job = validate_task.delay(fix=fix)
+    job_history.record_enqueued(job.id, "validation", "validation")
+    return {"job_id": job.id, "status": "queued"}
+
+
 @router.get("/samples", response_model=List[SampleOut])
 def list_samples():
     return su.read_csv(su.SAMPLES_CSV)
@@ -107,7 +127,7 @@ def add_sample(
         seq = np.load(tmp_path)["sequence"]
     else:
         # fallback: random (chỉ demo)
-        seq = np.random.rand(60, 1605)
+        seq = np.random.rand(60, get_layout().dim)
 
     os.remove(tmp_path)
 
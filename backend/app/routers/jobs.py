@@ -1,10 +1,57 @@
-from fastapi import APIRouter, Depends
-from typing import Optional
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 from app.worker import celery_app
+from app.core import job_control, job_history, job_status
 from app.core.oauth2 import get_current_admin
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+MAX_BULK_JOBS = 500
+
+
+def _job_ids(ids: List[str]) -> List[str]:
+    ids = list(dict.fromkeys(i for i in ids if i))
+    if len(ids) > MAX_BULK_JOBS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_JOBS} job ids per request")
+    return ids
+
+
+@router.post("/status")
+def bulk_job_status(job_ids: List[str] = Body(..., embed=True), current_admin = Depends(get_current_admin)):
+    """
+    Status of many jobs in one call (one pipelined Redis read instead of one AsyncResult per job)
+    """
+    return {"jobs": job_status.get_states(_job_ids(job_ids))}
+
+
+@router.get("/events")
+async def job_events(request: Request, ids: str = Query(..., description="comma-separated job ids"),
+                     interval: float = Query(1.0, ge=0.2, le=10.0), current_admin = Depends(get_current_admin)):
+    """
+    Server-sent events: one `job` event per state change of the given jobs, then `done`
+    when all of them are finished. Replaces one polling loop per job with one connection.
+    """
+    job_ids = _job_ids(ids.split(","))
+    if not job_ids:
+        raise HTTPException(status_code=400, detail="No job ids")
+    return StreamingResponse(
+        job_status.stream_states(job_ids, interval, is_disconnected=request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+def job_stats(days: int = Query(7, ge=1, le=365), kind: Optional[str] = None,
+              current_admin = Depends(get_current_admin)):
+    """
+    Jobs per day and status (with mean duration) over the last `days` days
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    return {"since": since.isoformat(), "days": job_history.daily_stats(since, kind)}
+
 
 @router.get("/{job_id}")
 def get_job_status(job_id: str, current_admin = Depends(get_current_admin)):
@@ -14,20 +61,39 @@ def get_job_status(job_id: str, current_admin = Depends(get_current_admin)):
     from celery.result import AsyncResult
     result = AsyncResult(job_id, app=celery_app)
 
+    status = result.status
+    info = result.info if status == "PROGRESS" else None
+    value = result.result if result.successful() else None
     response = {
         "job_id": job_id,
-        "status": result.status,   # PENDING, STARTED, SUCCESS, FAILURE, RETRY
-        "result": result.result if result.successful() else None,
-        "traceback": str(result.traceback) if result.failed() else None
+        "status": status,   # PENDING, STARTED, PROGRESS, SUCCESS, FAILURE, RETRY
+        "result": value,
+        "traceback": str(result.traceback) if result.failed() else None,
+        # live counters/stage timings while running; the final telemetry once finished
+        "progress": info if isinstance(info, dict) else None,
+        "telemetry": value.get("telemetry") if isinstance(value, dict) else None,
     }
     return response
 
 
+@router.post("/{job_id}/cancel")
+def cancel_job(job_id: str, current_admin = Depends(get_current_admin)):
+    """
+    Cancel a job: dropped if still queued, stopped at its next checkpoint if running
+    """
+    job_control.cancel(job_id)
+    return {"job_id": job_id, "status": "cancelling"}
+
+
 @router.get("/")
-def list_jobs(limit: int = 10, current_admin = Depends(get_current_admin)):
+def list_jobs(limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None, user: Optional[str] = None,
+              status: Optional[str] = None, kind: Optional[str] = None, since: Optional[datetime] = None,
+              until: Optional[datetime] = None, current_admin = Depends(get_current_admin)):
     """
-    ⚠️ Celery không lưu job history mặc định.
-    Để list nhiều job, bạn cần kết hợp Redis backend hoặc DB backend.
-    Ở đây chỉ demo nên chỉ trả thông báo.
+    Job history from the jobs table, newest first.
+    Pass `next_cursor` from the previous response as `cursor` to get the next page.
     """
-    return {"message": f"Listing last {limit} jobs not implemented (use DB backend)."}
+    try:
+        return job_history.list_jobs(limit, cursor, user, status, kind, since, until)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,21 +1,104 @@
-from fastapi import APIRouter, UploadFile, File, Form
-import shutil
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+import aiofiles
+import hashlib
+import json
 import os
+import shutil
 import uuid
 
+from app.core import admission, job_control, job_history
 from app.processing import storage_utils as su
+from app.processing.layouts import get_layout
+from app.config import settings
 from app.tasks import enqueue_process_video
-from fastapi import Body
-import numpy as np
+from app.processing.camera_payload import BINARY_CONTENT_TYPE, parse_camera_binary, parse_camera_payload
+from pydantic import BaseModel
+from typing import List, Optional, Union
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
 UPLOAD_DIR = "dataset/raw_videos"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# in-progress resumable uploads: <upload_id>/state.json + <upload_id>/data.part
+RESUMABLE_DIR = su.UPLOADS_ROOT
+
+READ_CHUNK = 1 << 20
+
+
+def _raw_video_path(user: str, label: str, filename: str) -> str:
+    save_name = f"{user}_{label}_{uuid.uuid4().hex[:8]}_{os.path.basename(filename or 'video')}"
+    return os.path.join(UPLOAD_DIR, save_name)
+
+
+def _admission_key(request: Request, user: str) -> str:
+    # per-user limits; anonymous uploads are limited per client address
+    return f"user:{user}" if user else f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def _enqueue_video(file_path: str, user: str, label: str, session_id: str, dialect: str, sha256: str,
+                         admission_key: str = "", size: int = 0):
+    """
+    Queue the video; returns (job id, duplicate). A retried upload of the same video with
+    the same parameters attaches to the job already in flight (duplicate=True): its copy
+    and admission slot are given back right away. If this raises, no job holds the
+    admission slot: the caller gives it back.
+    """
+    # CSV label registry and the broker publish are blocking: keep them off the event loop
+    await run_in_threadpool(su.register_label, label)
+    job_id = uuid.uuid4().hex
+    if settings.job_dedup and sha256:
+        key = job_control.dedup_key(sha256, user, label, dialect)
+        existing = await run_in_threadpool(job_control.claim, key, job_id)
+        if existing:
+            await run_in_threadpool(os.remove, file_path)
+            await run_in_threadpool(admission.release_video, admission_key)
+            return existing, True
+    # small clips go ahead of long videos on the video queue (redis: 0 = first)
+    priority = 0 if size <= settings.small_video_bytes else 5
+    deadline = job_control.deadline()
+    kwargs = dict(video_path=file_path, user=user, label=label, session_id=session_id, dialect=dialect,
+                  video_sha256=sha256, admission_key=admission_key, deadline=deadline)
+    try:
+        # still queued at the deadline: the worker drops it (expires)
+        await run_in_threadpool(enqueue_process_video.apply_async, kwargs=kwargs, priority=priority,
+                                task_id=job_id, expires=settings.job_deadline_seconds)
+    except Exception:
+        await run_in_threadpool(job_control.release, job_id)
+        raise
+    await run_in_threadpool(job_history.record_enqueued, job_id, "video", "video", user, label, session_id)
+    return job_id, False
+
+
+def _abandon_video(admission_key: str, file_path: str):
+    """Give back the admission slot of an upload that did not become a job, and drop its copy."""
+    try:
+        admission.release_video(admission_key)
+    finally:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+
+def _return_to_upload(admission_key: str, file_path: str, data: str):
+    """Undo complete_video_upload's move to raw_videos after a failed enqueue, and give the slot back."""
+    try:
+        admission.release_video(admission_key)
+    finally:
+        if os.path.exists(file_path):
+            os.replace(file_path, data)
+
+
+@router.get("/admission")
+async def admission_status():
+    """Queue depth, worker slots and disk headroom behind 429 responses on the upload endpoints."""
+    return await run_in_threadpool(admission.snapshot)
 
 
 @router.post("/video")
 async def upload_video(
+    request: Request,
     file: UploadFile = File(...),
     user: str = Form(""),
     label: str = Form(...),
@@ -25,156 +108,268 @@ async def upload_video(
     if not session_id:
         session_id = uuid.uuid4().hex
 
-    class_idx, folder = su.register_label(label)
+    # FastAPI has already spooled the multipart body (form parsing runs before the handler and
+    # its dependencies); refuse before copying it to raw_videos and queueing a job when the
+    # queue, the user's quota or the disk is over budget. Large clients should use the
+    # resumable upload, which is admitted at init before any byte is sent.
+    key = _admission_key(request, user)
+    await run_in_threadpool(admission.admit_video, key)
 
-    save_name = f"{user}_{label}_{uuid.uuid4().hex[:8]}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, save_name)
-    with open(file_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    file_path = _raw_video_path(user, label, file.filename)
+    try:
+        # stream to disk without blocking the event loop; hash while the bytes pass through
+        sha = hashlib.sha256()
+        size = 0
+        async with aiofiles.open(file_path, "wb") as f:
+            while True:
+                chunk = await file.read(READ_CHUNK)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                size += len(chunk)
+                await f.write(chunk)
 
-    # Gửi task tới Celery
-    job = enqueue_process_video.delay(video_path=file_path, user=user, label=label, session_id=session_id, dialect=dialect)
+        # Gửi task tới Celery
+        job_id, duplicate = await _enqueue_video(file_path, user, label, session_id, dialect, sha.hexdigest(), key,
+                                                 size)
+    except BaseException:
+        # no job was queued to give the slot back (also when the request is cancelled)
+        await run_in_threadpool(_abandon_video, key, file_path)
+        raise
 
     # Normalize response to frontend UploadResult shape
-    return {"success": True, "id": job.id, "session_id": session_id, "message": "queued"}
+    return {"success": True, "id": job_id, "session_id": session_id, "duplicate": duplicate,
+            "message": "already queued" if duplicate else "queued"}
+
+
+# ---- Resumable chunked upload: init -> part (repeat, resume from offset) -> complete ----
 
+def _upload_dir(upload_id: str) -> str:
+    if not upload_id or not all(c in "0123456789abcdef" for c in upload_id):
+        raise HTTPException(status_code=404, detail="Unknown upload")
+    return os.path.join(RESUMABLE_DIR, upload_id)
 
-@router.post("/camera")
-async def upload_camera(payload: dict = Body(...)):
+
+def _load_state(upload_id: str):
+    d = _upload_dir(upload_id)
+    try:
+        with open(os.path.join(d, "state.json"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Unknown upload")
+    data = os.path.join(d, "data.part")
+    # bytes on disk are the source of truth for the resume offset
+    state["offset"] = os.path.getsize(data) if os.path.exists(data) else 0
+    return d, state
+
+
+def _lock_upload(d: str):
+    """
+    Non-blocking exclusive lock on <upload_id>/part.lock, held while a part is appended;
+    returns the lock fd, or None while another request (in any API process) holds it.
+    The OS drops the lock with the process, so a crash mid-part cannot wedge the upload.
+    """
+    try:
+        return su.try_lock_file(os.path.join(d, "part.lock"))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Unknown upload")
+
+
+def _status(upload_id: str, state: dict):
+    return {"upload_id": upload_id, "offset": state["offset"], "size": state["size"],
+            "part_size": settings.upload_part_bytes, "complete": state["offset"] >= state["size"]}
+
+
+@router.post("/video/init")
+async def init_video_upload(
+    request: Request,
+    filename: str = Form(...),
+    size: int = Form(...),
+    user: str = Form(""),
+    label: str = Form(...),
+    dialect: str = Form(""),
+    session_id: str = Form(None),
+    sha256: str = Form(""),
+):
+    """Start a resumable upload of `size` bytes; send the bytes with PUT /upload/video/{upload_id}."""
+    if size <= 0 or size > settings.max_upload_bytes:
+        raise HTTPException(status_code=413, detail=f"size must be between 1 and {settings.max_upload_bytes} bytes")
+    # check (without reserving a slot) before the client starts sending bytes
+    await run_in_threadpool(admission.admit_video, _admission_key(request, user), size, False)
+    upload_id = uuid.uuid4().hex
+    d = os.path.join(RESUMABLE_DIR, upload_id)
+    state = {"filename": os.path.basename(filename), "size": size, "user": user, "label": label,
+             "dialect": dialect, "session_id": session_id or uuid.uuid4().hex, "sha256": sha256.lower(),
+             "created_at": su.now_str()}
+
+    def create():
+        os.makedirs(d, exist_ok=True)
+        open(os.path.join(d, "data.part"), "wb").close()
+        with open(os.path.join(d, "state.json"), "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+
+    await run_in_threadpool(create)
+    return _status(upload_id, {**state, "offset": 0})
+
+
+@router.get("/video/{upload_id}")
+async def get_video_upload(upload_id: str):
+    """Current offset of a resumable upload: resume by sending the bytes from there."""
+    _, state = await run_in_threadpool(_load_state, upload_id)
+    return _status(upload_id, state)
+
+
+@router.put("/video/{upload_id}")
+async def put_video_part(upload_id: str, request: Request, offset: int = 0):
+    """
+    Append the raw request body at `offset` (must equal the current offset; a part
+    cut off by a dropped connection keeps the bytes that arrived). One part at a time
+    per upload: a part sent while another is in flight gets 409.
+    """
+    lock = await run_in_threadpool(_lock_upload, _upload_dir(upload_id))
+    if lock is None:
+        raise HTTPException(status_code=409, detail={"message": "another part of this upload is in flight"})
+    try:
+        # the offset is read under the lock, so no other part can append between check and write
+        d, state = await run_in_threadpool(_load_state, upload_id)
+        if offset != state["offset"]:
+            raise HTTPException(status_code=409, detail={"message": "offset mismatch", "offset": state["offset"]})
+        limit = state["size"] - offset
+        written = 0
+        async with aiofiles.open(os.path.join(d, "data.part"), "ab") as f:
+            async for chunk in request.stream():
+                if written + len(chunk) > limit:
+                    raise HTTPException(status_code=413, detail="part extends past the declared size")
+                await f.write(chunk)
+                written += len(chunk)
+    finally:
+        await run_in_threadpool(su.unlock_file, lock)
+    state["offset"] = offset + written
+    return _status(upload_id, state)
+
+
+@router.post("/video/{upload_id}/complete")
+async def complete_video_upload(upload_id: str, request: Request):
+    """Verify size (and sha256 if given at init), move the file to raw_videos and queue processing."""
+    d, state = await run_in_threadpool(_load_state, upload_id)
+    if state["offset"] != state["size"]:
+        raise HTTPException(status_code=409, detail={"message": "upload incomplete", "offset": state["offset"]})
+    data = os.path.join(d, "data.part")
+    sha = hashlib.sha256()
+    async with aiofiles.open(data, "rb") as f:
+        while True:
+            chunk = await f.read(READ_CHUNK)
+            if not chunk:
+                break
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    if state["sha256"] and state["sha256"] != digest:
+        raise HTTPException(status_code=422, detail="sha256 mismatch")
+
+    # the bytes are kept on 429, so the client only retries this call
+    key = _admission_key(request, state["user"])
+    await run_in_threadpool(admission.admit_video, key)
+    file_path = _raw_video_path(state["user"], state["label"], state["filename"])
+    try:
+        # the file must be in raw_videos before a worker can pick the job up
+        await run_in_threadpool(os.replace, data, file_path)
+        job_id, duplicate = await _enqueue_video(file_path, state["user"], state["label"], state["session_id"],
+                                                 state["dialect"], digest, key, state["size"])
+    except BaseException:
+        # put the bytes back: the upload stays resumable and the client retries this call
+        await run_in_threadpool(_return_to_upload, key, file_path, data)
+        raise
+    # the upload state goes only once a job (or the one it duplicates) holds the file
+    await run_in_threadpool(shutil.rmtree, d, True)
+    return {"success": True, "id": job_id, "session_id": state["session_id"], "sha256": digest,
+            "duplicate": duplicate, "message": "already queued" if duplicate else "queued"}
+
+
+class CameraPoint(BaseModel):
+    x: float
+    y: float
+    z: float = 0.0
+    visibility: Optional[float] = None
+
+
+class CameraLandmarks(BaseModel):
+    # parts outside the feature layout (e.g. "face") are ignored
+    pose: List[Optional[CameraPoint]] = []
+    left_hand: List[Optional[CameraPoint]] = []
+    right_hand: List[Optional[CameraPoint]] = []
+
+
+class CameraFrame(BaseModel):
+    timestamp: Optional[float] = None
+    landmarks: Union[CameraLandmarks, List[float]]
+
+
+class CameraUpload(BaseModel):
+    user: str = ""
+    label: str
+    session_id: Optional[str] = None
+    dialect: str = ""
+    frames: List[CameraFrame]
+
+
+def _inline_schema(model) -> dict:
+    # the body is parsed by hand (camera_payload), so the schema is only documented:
+    # inline the pydantic definitions for openapi_extra
+    schema = model.schema()
+    defs = schema.pop("definitions", {})
+
+    def resolve(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {k: resolve(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [resolve(v) for v in node]
+        return node
+    return resolve(schema)
+
+
+@router.post("/camera", openapi_extra={"requestBody": {"required": True, "content": {
+    "application/json": {"schema": _inline_schema(CameraUpload)},
+    BINARY_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+}}})
+async def upload_camera(request: Request):
     """
     Accept frames (array of arrays) and metadata, save as npz via storage_utils.save_sample
     Payload example: { user: str, label: str, session_id: str, dialect: str, frames: [{timestamp, landmarks}, ...] }
+    or, with Content-Type application/x-landmarks, the binary (T, D) array format of
+    app/processing/camera_payload.py (optionally gzip-compressed).
+    Camera uploads use their own admission lane, so they are not held back by queued videos.
     """
+    body = await request.body()
+    binary = request.headers.get("content-type", "").split(";")[0].strip() == BINARY_CONTENT_TYPE
+    with admission.camera_lane():
+        return await run_in_threadpool(save_camera_upload, body, binary)
+
+
+def save_camera_upload(body: bytes, binary: bool = False):
+    layout = get_layout(settings.feature_layout)
+    # one pass from JSON (or a zero-copy view of the binary array) into (T, D) float32 in layout
+    # columns (app/processing/camera_payload.py)
+    try:
+        payload, seq = (parse_camera_binary if binary else parse_camera_payload)(body, layout)
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid frames payload: {e}"}
+
     user = payload.get("user", "")
     label = payload.get("label")
     dialect = payload.get("dialect", "")
     session_id = payload.get("session_id", None) or uuid.uuid4().hex
-    frames = payload.get("frames")
 
-    if not label or not frames:
+    if not label or not len(seq):
         return {"success": False, "message": "Missing label or frames"}
 
     # Ensure label exists
     class_idx, folder = su.register_label(label)
 
-    # Convert frames (list of {timestamp, landmarks}) into numpy array
-    # We expect landmarks arrays per frame; stack into (T, N) array
-    try:
-        # helper: convert a MediaPipe-like dict into a flat numeric vector
-        def flatten_landmarks(ld):
-            # If already a list/array of numbers, return as-is
-            if ld is None:
-                return None
-            if isinstance(ld, (list, tuple, np.ndarray)):
-                return np.asarray(ld)
-
-            # If dict (MediaPipe style) with keys like 'pose','face','left_hand','right_hand'
-            if isinstance(ld, dict):
-                parts = []
-                # order matters to keep consistent vector size
-                for key in ("pose", "face", "left_hand", "right_hand"):
-                    elems = ld.get(key, [])
-                    # each elem is expected to be dict with x,y,z and optionally visibility
-                    for p in elems:
-                        if p is None:
-                            # missing point -> pad zeros
-                            parts.extend([0.0, 0.0, 0.0, 0.0])
-                            continue
-                        x = p.get("x") if isinstance(p, dict) else None
-                        y = p.get("y") if isinstance(p, dict) else None
-                        z = p.get("z") if isinstance(p, dict) else None
-                        v = p.get("visibility") if isinstance(p, dict) else 1.0
-                        # replace None with 0.0
-                        parts.extend([
-                            float(x) if x is not None else 0.0,
-                            float(y) if y is not None else 0.0,
-                            float(z) if z is not None else 0.0,
-                            float(v) if v is not None else 0.0,
-                        ])
-                return np.array(parts, dtype="float32")
-
-            # Unknown format -> attempt to coerce
-            return np.asarray(ld)
-
-        landmarks_seq = []
-        for f in frames:
-            raw = f.get("landmarks")
-            flat = flatten_landmarks(raw)
-            if flat is None:
-                raise ValueError("frame missing landmarks")
-            landmarks_seq.append(flat)
-
-        # Ensure all frames have same vector length by padding shorter ones
-        maxlen = max([a.size for a in landmarks_seq])
-        # Build a numeric 2D array explicitly to avoid object-dtype pitfalls
-        T = len(landmarks_seq)
-        seq = np.zeros((T, maxlen), dtype="float32")
-        for i, a in enumerate(landmarks_seq):
-            if a.size > maxlen:
-                # truncate if unexpectedly longer
-                seq[i, :] = a[:maxlen].astype("float32")
-            else:
-                seq[i, : a.size] = a.astype("float32")
-
-        # Debug output
-        print(f"[DEBUG] First frame landmarks type: {type(frames[0].get('landmarks'))}")
-        print(f"[DEBUG] First frame landmarks shape/content: {frames[0].get('landmarks')}")
-        print(f"[DEBUG] Built numeric sequence shape: {seq.shape}, dtype: {seq.dtype}")
-        # Ensure sequence is numeric float32 (some inputs may produce object-dtype rows)
-        try:
-            seq = seq.astype("float32")
-        except Exception as e:
-            print(f"[WARN] seq.astype failed: {e}, attempting per-row conversion")
-            new = np.zeros((T, maxlen), dtype="float32")
-            for i in range(T):
-                row = landmarks_seq[i]
-                try:
-                    arr = np.asarray(row, dtype=np.float32).flatten()
-                except Exception:
-                    # best-effort flatten for nested dict/list structures
-                    vals = []
-                    def collect(x):
-                        if x is None:
-                            return
-                        if isinstance(x, (int, float)):
-                            vals.append(float(x))
-                        elif isinstance(x, dict):
-                            # prefer x,y,z,visibility order if available
-                            for k in ("x", "y", "z", "visibility"):
-                                if k in x:
-                                    try:
-                                        vals.append(float(x.get(k) or 0.0))
-                                    except Exception:
-                                        vals.append(0.0)
-                            # if dict has nested lists, collect them too
-                            for v in x.values():
-                                if isinstance(v, (list, tuple)):
-                                    for it in v:
-                                        collect(it)
-                        elif isinstance(x, (list, tuple, np.ndarray)):
-                            for it in x:
-                                collect(it)
-                        else:
-                            # ignore unknown types
-                            return
-                    collect(row)
-                    arr = np.asarray(vals, dtype=np.float32)
-
-                if arr.size > maxlen:
-                    new[i, :] = arr[:maxlen]
-                else:
-                    new[i, : arr.size] = arr
-            seq = new
-    except Exception as e:
-        print(f"[ERROR] Error processing landmarks: {e}")
-        return {"success": False, "message": f"Invalid frames payload: {e}"}
-
-    metadata = {"user": user, "session_id": session_id, "frames": len(frames), "source": "camera", "dialect": dialect, "created_at": su.now_str()}
-    # Safety checks before saving
-    if not isinstance(seq, np.ndarray) or seq.dtype.kind not in ("f", "i") or seq.ndim != 2:
-        print(f"[ERROR] Sequence not numeric 2D array: type={type(seq)}, dtype={getattr(seq, 'dtype', None)}, ndim={getattr(seq, 'ndim', None)}")
-        return {"success": False, "message": "Processed sequence is not a numeric 2D array"}
-
+    metadata = {"user": user, "session_id": session_id, "frames": len(seq), "source": "camera", "dialect": dialect,
+                "created_at": su.now_str(), "layout": layout.version if seq.shape[1] == layout.dim else None,
+                "transport": "binary" if binary else "json"}
     path = su.save_sample(seq, class_idx, folder, metadata=metadata)
     # Normalize to UploadResult shape: return session id as id and include saved path
     return {"success": True, "id": session_id, "path": path, "message": "saved"}
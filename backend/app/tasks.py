@@ -1,13 +1,133 @@
+import os
+import time
+import shutil
 from app.worker import celery_app
 from app.processing.pipeline import process_video_job
+from app.processing.progress import JobProgress, JobCancelled
 
-@celery_app.task(bind=True)
-def enqueue_process_video(self, video_path: str, user: str, label: str, session_id: str, dialect: str = ""):
+# Queues (see worker.py task_routes): video | export | validation | maintenance.
+# Long jobs ack late so a worker crash hands the job to another worker instead of losing it.
+# Video jobs stop early (status "cancelled") when cancelled via /jobs/{id}/cancel or past their deadline.
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def enqueue_process_video(self, video_path: str, user: str, label: str, session_id: str, dialect: str = "",
+                          video_sha256: str = "", admission_key: str = "", deadline: float = 0.0):
     # This wrapper calls processing.pipeline (synchronous heavy processing)
     # Use try/except to capture failure and push status
+    from app.core import job_control
+    started = time.time()
+    # frames decoded/extracted, samples saved and per-stage timings, visible as state PROGRESS in /jobs/{id};
+    # the same checkpoints poll for cancellation and the deadline
+    progress = JobProgress(lambda meta: self.update_state(state="PROGRESS", meta=meta),
+                           should_stop=job_control.stop_check(self.request.id, deadline))
     try:
-        result = process_video_job(video_path, user, label, session_id, dialect)
-        return {"status": "done", "result": result}
+        result = process_video_job(video_path, user, label, session_id, dialect, video_sha256=video_sha256,
+                                   progress=progress)
+        return {"status": "done", "result": result, "telemetry": progress.snapshot()}
+    except JobCancelled as e:
+        return {"status": "cancelled", "reason": str(e), "telemetry": progress.snapshot()}
     except Exception as e:
         # you can log here and rethrow or return failure
-        return {"status": "error", "error": str(e)}
+        return {"status": "error", "error": str(e), "telemetry": progress.snapshot()}
+    finally:
+        _finish_admission(admission_key, time.time() - started)
+        _release_dedup(self.request.id)
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_video_batch(self, jobs: list):
+    """
+    Many small videos in one task: one dispatch, and the worker's detector, pools and
+    imports are reused across them. `jobs` holds enqueue_process_video kwargs.
+    """
+    from app.core import job_control
+    results = []
+    should_stop = job_control.stop_check(self.request.id)
+    for i, job in enumerate(jobs):
+        started = time.time()
+        progress = JobProgress(lambda meta, i=i: self.update_state(
+            state="PROGRESS", meta={**meta, "batch_index": i, "batch_size": len(jobs)}), should_stop=should_stop)
+        try:
+            result = process_video_job(job["video_path"], job.get("user", ""), job["label"], job.get("session_id", ""),
+                                       job.get("dialect", ""), video_sha256=job.get("video_sha256", ""),
+                                       progress=progress)
+            results.append({"video_path": job["video_path"], "status": "done", "result": result,
+                            "telemetry": progress.snapshot()})
+        except JobCancelled as e:
+            # the rest of the batch is not started either; give back their admission slots
+            results += [{"video_path": rest["video_path"], "status": "cancelled", "reason": str(e)} for rest in jobs[i:]]
+            for rest in jobs[i + 1:]:
+                _finish_admission(rest.get("admission_key", ""))
+            break
+        except Exception as e:
+            results.append({"video_path": job["video_path"], "status": "error", "error": str(e),
+                            "telemetry": progress.snapshot()})
+        finally:
+            _finish_admission(job.get("admission_key", ""), time.time() - started)
+    failed = sum(r["status"] == "error" for r in results)
+    if any(r["status"] == "cancelled" for r in results):
+        return {"status": "cancelled", "failed": failed, "results": results}
+    return {"status": "done" if not failed else "partial", "failed": failed, "results": results}
+
+@celery_app.task(acks_late=True, reject_on_worker_lost=True)
+def export_dataset(fix: bool = False):
+    from app.processing.exporter import export_memmap
+    return export_memmap(fix=fix)
+
+@celery_app.task
+def validate_dataset(expected_T: int = None, expected_D: int = None, fix: bool = False):
+    from pathlib import Path
+    from app.processing import storage_utils as su
+    from app.processing.validator import validate_samples
+    report = validate_samples(Path(su.FEATURE_ROOT), expected_T, expected_D, fix=fix)
+    # the per-file lists can be huge; keep the result backend entry small
+    for key in ("mismatches", "fixed", "cannot_fix"):
+        if isinstance(report.get(key), list):
+            report[key] = report[key][:100]
+    return report
+
+@celery_app.task
+def cleanup_stale_uploads(max_age_hours: float = 24.0):
+    """Remove resumable uploads that were never completed and checkpoints of jobs that never finished."""
+    from app.processing import storage_utils as su
+    from app.processing import keypoint_cache as kc
+    cutoff = time.time() - max_age_hours * 3600
+    removed = []
+    for root in (su.UPLOADS_ROOT, kc.CHECKPOINT_ROOT):
+        if not os.path.isdir(root):
+            continue
+        for name in os.listdir(root):
+            d = os.path.join(root, name)
+            if not os.path.isdir(d):
+                continue
+            # last activity: the newest write to the directory's files
+            touched = max([os.path.getmtime(d)] + [os.path.getmtime(os.path.join(d, f)) for f in os.listdir(d)])
+            if touched < cutoff:
+                lock = None
+                if root == kc.CHECKPOINT_ROOT:
+                    # a job still extracting holds the checkpoint's owner lock
+                    lock = su.try_lock_file(os.path.join(d, kc.CHECKPOINT_LOCK))
+                    if lock is None:
+                        continue
+                shutil.rmtree(d, ignore_errors=True)
+                if lock is not None:
+                    su.unlock_file(lock)
+                removed.append(name)
+    return {"removed": removed}
+
+def _finish_admission(admission_key: str, seconds: float = None):
+    # give the user's slot back and feed the job duration into Retry-After estimates
+    from app.core import admission
+    try:
+        admission.release_video(admission_key)
+        if seconds is not None:
+            admission.record_job_seconds(seconds)
+    except Exception:
+        pass
+
+def _release_dedup(job_id: str):
+    # later uploads of the same video start a new job
+    from app.core import job_control
+    try:
+        job_control.release(job_id)
+    except Exception:
+        pass
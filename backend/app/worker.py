@@ -1,4 +1,7 @@
 from celery import Celery
+from kombu import Queue
+import time
+from celery.signals import worker_process_init, worker_process_shutdown, task_prerun, task_postrun, task_revoked
 from app.config import settings
 
 # dùng Redis làm broker & backend từ environment variables
@@ -15,7 +18,75 @@ celery_app.conf.update(
     result_expires=3600,
     timezone="Asia/Ho_Chi_Minh",
     enable_utc=True,
+    # one queue per kind of work, so short jobs never wait behind hour-long videos;
+    # run a worker per queue (see docker-compose.yml)
+    task_queues=[Queue(q) for q in ("video", "export", "validation", "maintenance")],
+    task_default_queue="video",
+    task_routes={
+        "app.tasks.enqueue_process_video": {"queue": "video"},
+        "app.tasks.process_video_batch": {"queue": "video"},
+        "app.tasks.export_dataset": {"queue": "export"},
+        "app.tasks.validate_dataset": {"queue": "validation"},
+        "app.tasks.cleanup_stale_uploads": {"queue": "maintenance"},
+    },
+    # fair dispatch: a process reserves one job at a time instead of a prefetched batch
+    worker_prefetch_multiplier=1,
+    # redis transport: priorities 0 (first) .. 9, and an unacked job is only redelivered
+    # after visibility_timeout, which must exceed the longest job when acks are late
+    broker_transport_options={
+        "queue_order_strategy": "priority",
+        "priority_steps": list(range(10)),
+        "visibility_timeout": settings.visibility_timeout,
+    },
+    task_default_priority=5,
+    # run `celery -A app.worker.celery_app beat` for periodic maintenance
+    beat_schedule={
+        "cleanup-stale-uploads": {"task": "app.tasks.cleanup_stale_uploads", "schedule": 3600.0},
+    },
 )
 
+@worker_process_init.connect
+def init_keypoint_detector(**kwargs):
+    # build the MediaPipe graph once per worker process instead of once per job
+    from app.processing.keypoints_adapter import get_holistic
+    from app.processing.pipeline import frame_variants
+    for variant in frame_variants():
+        get_holistic("default" if variant == "original" else variant)
+
+@worker_process_shutdown.connect
+def close_keypoint_detector(**kwargs):
+    from app.processing.keypoints_adapter import close_holistic
+    from app.processing.parallel_extract import shutdown_pool
+    shutdown_pool()
+    close_holistic()
+
+_job_started = {}  # task id -> perf_counter at start, for the job history duration
+
+@task_prerun.connect
+def record_job_started(task_id=None, task=None, kwargs=None, **extra):
+    from app.core import job_history
+    _job_started[task_id] = time.perf_counter()
+    queue = (task.request.delivery_info or {}).get("routing_key") if task is not None else None
+    job_history.record_started(task_id, task.name if task is not None else "", kwargs, queue)
+
+@task_postrun.connect
+def record_job_finished(task_id=None, task=None, retval=None, state=None, **extra):
+    from app.core import job_history
+    started = _job_started.pop(task_id, None)
+    duration = time.perf_counter() - started if started is not None else None
+    job_history.record_finished(task_id, task.name if task is not None else "", retval, state, duration)
+
+@task_revoked.connect
+def release_revoked_job(sender=None, request=None, expired=False, **extra):
+    # a job cancelled or expired while still queued never runs its own cleanup
+    from app.core import job_history
+    from app.tasks import _finish_admission, _release_dedup
+    if request is None:
+        return
+    _finish_admission((request.kwargs or {}).get("admission_key", ""))
+    _release_dedup(request.id)
+    job_history.record_finished(request.id, getattr(sender, "name", ""),
+                                {"status": "cancelled", "reason": "deadline exceeded" if expired else "cancelled"})
+
 # Import tasks to register them with Celery
 from app import tasks
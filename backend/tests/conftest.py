@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# tests import the backend as `app`, like the worker and the API do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.processing import exporter  # noqa: E402
+from app.processing import storage_utils as su  # noqa: E402
+
+EXPORT_T, EXPORT_D = 8, 6
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """Label registry, samples.csv and features/ under tmp_path."""
+    monkeypatch.setattr(su, "FEATURE_ROOT", str(tmp_path / "features"))
+    monkeypatch.setattr(su, "LABELS_CSV", str(tmp_path / "labels.csv"))
+    monkeypatch.setattr(su, "SAMPLES_CSV", str(tmp_path / "samples.csv"))
+    return tmp_path
+
+
+def _add_samples(label, n, value):
+    class_idx, folder = su.register_label(label)
+    for _ in range(n):
+        su.save_sample(np.full((EXPORT_T, EXPORT_D), value, dtype=np.float32), class_idx, folder, {"user": "u1"})
+    return class_idx
+
+
+@pytest.fixture
+def gapped_export(registry):
+    """
+    Memmap export of a registry with merge gaps: 1 halo, 2 ahoj, 3 dakujem, 4 prosim with
+    1 merged into 2 and 3 into 4, so class_idx 2 and 4 are left. Samples hold their
+    label's value (1.0 .. 4.0). Returns the export directory.
+    """
+    halo = _add_samples("halo", 2, 1.0)
+    ahoj = _add_samples("ahoj", 3, 2.0)
+    dakujem = _add_samples("ďakujem", 1, 3.0)
+    prosim = _add_samples("prosím", 2, 4.0)
+    su.merge_labels(halo, ahoj)
+    su.merge_labels(dakujem, prosim)
+    out_dir = str(registry / "memmap")
+    res = exporter.export_memmap(features_root=su.FEATURE_ROOT, out_dir=out_dir, labels_csv=su.LABELS_CSV)
+    assert res["ok"], res
+    return out_dir
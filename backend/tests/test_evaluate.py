@@ -0,0 +1,62 @@
+"""tools/evaluate.py on a memmap written by the exporter (gapped registry, 0-based labels)."""
+import json
+import os
+import sys
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "tools"))
+import evaluate  # noqa: E402
+
+
+class ThresholdModel(torch.nn.Module):
+    """Class 0 for the samples exported with values 1.0 / 2.0, class 1 for 3.0 / 4.0."""
+
+    def __init__(self, num_classes=2):
+        super().__init__()
+        self.num_classes = num_classes
+
+    def forward(self, x):
+        v = x[:, 0, 0]
+        return torch.stack([2.5 - v, v - 2.5], dim=1)[:, :self.num_classes]
+
+
+def test_evaluate_exported_memmap(gapped_export):
+    X, y, meta = evaluate.open_memmap(gapped_export)
+    names = evaluate.class_names(meta)
+    confusion, _, latencies = evaluate.evaluate_memmap(ThresholdModel(), X, y, 2, batch_size=3, latency_samples=2)
+    rep = evaluate.report(confusion, 0.0, latencies, names)
+
+    assert names == ["ahoj", "prosím"]
+    assert rep["accuracy"] == 1.0 and rep["total"] == 8
+    assert rep["confusion"] == [[5, 0], [0, 3]]
+    assert [pc["name"] for pc in rep["per_class"]] == names
+
+
+def test_evaluate_rejects_labels_outside_the_model(gapped_export):
+    X, y, _ = evaluate.open_memmap(gapped_export)
+    with pytest.raises(ValueError, match="outside the model's 1 classes"):
+        evaluate.evaluate_memmap(ThresholdModel(1), X, y, 1, batch_size=3)
+
+
+def test_evaluate_requires_class_mapping(gapped_export):
+    path = os.path.join(gapped_export, "dataset_meta.json")
+    with open(path, encoding="utf-8") as f:
+        meta = json.load(f)
+    del meta["classes"]
+    with pytest.raises(ValueError, match="re-export"):
+        evaluate.class_names(meta)
+
+
+def test_evaluate_cli(gapped_export, tmp_path):
+    pytest.importorskip("torch.utils.tensorboard", exc_type=ImportError)  # model_from_checkpoint imports train_baseline
+    from train_baseline import BiGRUModel
+
+    ckpt = str(tmp_path / "model.pth.tar")
+    torch.save({"state_dict": BiGRUModel(input_dim=6, hidden=8, num_layers=1, num_classes=2).state_dict()}, ckpt)
+    rep = evaluate.main(evaluate.parse_args(["--checkpoint", ckpt, "--memmap-dir", gapped_export, "--threads", "1"]))
+    assert rep["total"] == 8
+    assert [pc["support"] for pc in rep["per_class"]] == [5, 3]
+    assert [pc["name"] for pc in rep["per_class"]] == ["ahoj", "prosím"]
@@ -0,0 +1,42 @@
+"""Exported labels are contiguous and 0-based even when merge_labels left gaps in the registry."""
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from app.processing import storage_utils as su
+
+
+def test_export_remaps_gapped_registry(gapped_export):
+    out_dir = gapped_export
+    with open(os.path.join(out_dir, "dataset_meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    X = np.fromfile(os.path.join(out_dir, "dataset_X.dat"), dtype=np.float32)
+    X = X.reshape(-1, meta["sequence_length"], meta["feature_dim"])
+    y = np.fromfile(os.path.join(out_dir, "dataset_y.dat"), dtype=np.int32)
+
+    assert meta["total_samples"] == len(y) == len(X) == 8
+    assert meta["num_classes"] == 2
+    assert [(c["label"], c["class_idx"], c["label_original"]) for c in meta["classes"]] == \
+        [(0, 2, "ahoj"), (1, 4, "prosím")]
+    assert sorted(set(y.tolist())) == [0, 1]
+    assert meta["class_counts"] == {"0": 5, "1": 3}
+    # each row carries the label of the class it was merged into
+    assert set(X[y == 0, 0, 0].tolist()) == {1.0, 2.0}
+    assert set(X[y == 1, 0, 0].tolist()) == {3.0, 4.0}
+
+
+def test_export_matches_sign_dataset(gapped_export):
+    pytest.importorskip("torch")
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                    "tools"))
+    from torch_dataset import SignDataset
+
+    out_dir = gapped_export
+    # a stray file next to the class folders must not shift either side's labels
+    open(os.path.join(su.FEATURE_ROOT, "README.txt"), "w").close()
+    ds = SignDataset(features_root=su.FEATURE_ROOT, augment=False)
+    y = np.fromfile(os.path.join(out_dir, "dataset_y.dat"), dtype=np.int32)
+    assert [label for _, label, _ in ds.samples] == y.tolist()
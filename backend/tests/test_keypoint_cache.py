@@ -0,0 +1,151 @@
+"""Keypoint cache writers and checkpoint ownership when jobs of the same video run at once."""
+import argparse
+import importlib.util
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.processing import keypoint_cache as kc
+from app.processing import pipeline
+
+H, CFG = "ab" * 32, "0123456789abcdef"
+
+
+@pytest.fixture(autouse=True)
+def roots(tmp_path, monkeypatch):
+    monkeypatch.setattr(kc, "CACHE_ROOT", str(tmp_path / "keypoints"))
+    monkeypatch.setattr(kc, "CHECKPOINT_ROOT", str(tmp_path / "checkpoints"))
+
+
+def _rows(n, start=0):
+    return np.arange(start, start + n, dtype=np.float64), np.full((n, 4), start, dtype=np.float32)
+
+
+def test_concurrent_writers_use_their_own_temp_files():
+    errors = []
+
+    def writer(i):
+        try:
+            for _ in range(20):
+                kc.save(H, CFG, *_rows(5, i), config={}, target_fps=6.0, job={"label": str(i)})
+                kc.save_checkpoint_segment(H, CFG, 0, *_rows(5, i))
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert kc.load(H, CFG) is not None
+    assert not [f for f in os.listdir(os.path.dirname(kc.entry_path(H, CFG))) if ".tmp" in f]
+
+
+def test_checkpoint_has_one_owner():
+    owner = kc.claim_checkpoint(H, CFG)
+    assert owner is not None
+    assert kc.claim_checkpoint(H, CFG) is None
+    kc.save_checkpoint_segment(H, CFG, 0, *_rows(3))
+
+    kc.drop_checkpoint(H, CFG, owner)
+    assert kc.load_checkpoint(H, CFG) is None
+    assert not os.path.exists(kc.checkpoint_dir(H, CFG))
+    again = kc.claim_checkpoint(H, CFG)
+    assert again is not None
+    kc.release_checkpoint(again)
+
+
+def test_failed_owner_leaves_segments_for_the_redelivery():
+    owner = kc.claim_checkpoint(H, CFG)
+    kc.save_checkpoint_segment(H, CFG, 0, *_rows(3))
+    kc.release_checkpoint(owner)
+    owner = kc.claim_checkpoint(H, CFG)
+    assert owner is not None
+    assert len(kc.load_checkpoint(H, CFG)[1]) == 3
+    kc.release_checkpoint(owner)
+
+
+def test_second_job_runs_without_the_owners_checkpoint(monkeypatch):
+    monkeypatch.setattr(settings, "keypoint_cache", True)
+    monkeypatch.setattr(settings, "keypoint_checkpoint_frames", 300)
+    monkeypatch.setattr(kc, "config_digest", lambda config, fps: CFG)
+    keys = []
+
+    def extract(video_path, config, progress=None, checkpoint_key=None):
+        keys.append(checkpoint_key)
+        return _rows(4)
+    monkeypatch.setattr(pipeline, "extract_keypoints", extract)
+
+    # the first job is still extracting: it owns the checkpoint and has written a segment
+    first = kc.claim_checkpoint(H, CFG)
+    kc.save_checkpoint_segment(H, CFG, 0, *_rows(3))
+    ts, seq = pipeline.extract_keypoints_cached("clip.mp4", {}, {"label": "b"}, H)
+    assert keys == [None] and len(seq) == 4
+    # ... and finds its segments untouched when it goes on
+    assert len(kc.load_checkpoint(H, CFG)[1]) == 3
+    kc.drop_checkpoint(H, CFG, first)
+
+    # with no other job around, a job owns the checkpoint and drops it when done
+    monkeypatch.setattr(kc, "load", lambda *a: None)  # skip the entry the job above saved
+    pipeline.extract_keypoints_cached("clip.mp4", {}, {"label": "c"}, H)
+    assert keys[-1] == (H, CFG)
+    assert not os.path.exists(kc.checkpoint_dir(H, CFG))
+
+
+def _sidecar(h=H, cfg=CFG):
+    with open(kc.entry_path(h, cfg)[:-len(".npz")] + ".json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_cache_hits_record_their_jobs(monkeypatch):
+    monkeypatch.setattr(settings, "keypoint_cache", True)
+    monkeypatch.setattr(settings, "keypoint_checkpoint_frames", 0)
+    monkeypatch.setattr(kc, "config_digest", lambda config, fps: CFG)
+    monkeypatch.setattr(pipeline, "extract_keypoints", lambda *a, **k: _rows(4))
+
+    for user, label in (("u1", "halo"), ("u2", "ahoj"), ("u1", "halo")):
+        pipeline.extract_keypoints_cached("clip.mp4", {}, {"user": user, "label": label}, H)
+    assert [(j["user"], j["label"]) for j in kc.entry_jobs(_sidecar())] == [("u1", "halo"), ("u2", "ahoj")]
+
+
+def test_legacy_sidecar_keeps_its_job():
+    kc.save(H, CFG, *_rows(4), config={}, target_fps=6.0)
+    meta = _sidecar()
+    meta.pop("jobs")
+    meta["job"] = {"user": "u1", "label": "halo"}
+    with open(kc.entry_path(H, CFG)[:-len(".npz")] + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    assert kc.entry_jobs(meta) == [{"user": "u1", "label": "halo"}]
+
+    kc.add_job(H, CFG, {"user": "u2", "label": "ahoj"})
+    meta = _sidecar()
+    assert "job" not in meta
+    assert [j["label"] for j in meta["jobs"]] == ["halo", "ahoj"]
+
+
+def test_reprocess_rebuilds_every_job(monkeypatch, tmp_path):
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          "scripts", "reprocess_from_cache.py")
+    spec = importlib.util.spec_from_file_location("reprocess_from_cache", script)
+    reprocess = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(reprocess)
+
+    monkeypatch.setattr(kc, "config_digest", lambda config, fps: CFG)
+    monkeypatch.chdir(tmp_path)
+    built = []
+    monkeypatch.setattr(reprocess, "build_samples",
+                        lambda seq, user, label, *a, **k: built.append((user, label)) or ["x"])
+    kc.save(H, CFG, *_rows(4), config={}, target_fps=6.0, job={"user": "u1", "label": "halo"})
+    kc.add_job(H, CFG, {"user": "u2", "label": "ahoj"})
+
+    args = argparse.Namespace(dry_run=False, label="", all_configs=False, check_raw=False)
+    reprocess.main(args)
+    assert built == [("u1", "halo"), ("u2", "ahoj")]
+    built.clear()
+    reprocess.main(argparse.Namespace(**{**vars(args), "label": "ahoj"}))
+    assert built == [("u2", "ahoj")]
@@ -0,0 +1,69 @@
+"""Chunked extraction: runs inside a Celery prefork (billiard, daemonic) worker and matches the sequential pass."""
+import billiard
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("mediapipe")
+
+
+def _write_video(path, seconds=4.0, fps=10, moving=True):
+    out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (160, 120))
+    for i in range(int(seconds * fps)):
+        frame = np.full((120, 160, 3), 90, dtype=np.uint8)
+        cv2.circle(frame, (20 + i * 3 if moving else 80, 60), 15, (200, 180, 160), -1)
+        out.write(frame)
+    out.release()
+
+
+def _run_chunked(video_path):
+    # runs in the billiard pool child, as a Celery prefork task would
+    from app.processing import parallel_extract as pe
+    from app.processing.ingest import video_duration
+    from app.processing.keypoints_adapter import DEFAULT_CONFIG
+    try:
+        ts, seq = pe.extract_sequence_parallel(video_path, video_duration(video_path), 6.0, dict(DEFAULT_CONFIG),
+                                               processes=2, chunk_sec=1.5, overlap_sec=0.5)
+        return len(ts), len(seq), billiard.current_process().daemon
+    finally:
+        pe.shutdown_pool()
+
+
+def test_chunked_extract_inside_prefork_worker(tmp_path):
+    video = tmp_path / "clip.mp4"
+    _write_video(video)
+    pool = billiard.Pool(processes=1)  # the pool Celery's prefork worker runs tasks in
+    try:
+        n_ts, n_seq, daemon = pool.apply_async(_run_chunked, (str(video),)).get(timeout=300)
+    finally:
+        pool.terminate()
+        pool.join()
+    assert daemon
+    assert n_ts == n_seq == 24  # 4 s on the 6 fps grid, warm-up frames dropped
+
+
+def test_static_video_matches_sequential_pass(tmp_path, monkeypatch):
+    from app.config import settings
+    from app.processing import parallel_extract as pe
+    from app.processing import pipeline
+    from app.processing.keypoints_adapter import DEFAULT_CONFIG
+
+    video = str(tmp_path / "static.mp4")
+    _write_video(video, moving=False)
+    config = {**DEFAULT_CONFIG, "motion_gate": 0.01}
+    monkeypatch.setattr(settings, "keypoint_checkpoint_frames", 0)
+    monkeypatch.setattr(settings, "chunk_seconds", 1.5)
+    monkeypatch.setattr(settings, "chunk_overlap_seconds", 0.5)
+
+    monkeypatch.setattr(settings, "extract_processes", 1)
+    seq_ts, seq = pipeline.extract_keypoints(video, config)
+    monkeypatch.setattr(settings, "extract_processes", 2)
+    monkeypatch.setattr(settings, "parallel_min_seconds", 1.0)
+    try:
+        par_ts, par = pipeline.extract_keypoints(video, config)
+    finally:
+        pe.shutdown_pool()
+    assert len(seq_ts) == 1  # the motion gate keeps only the last frame
+    np.testing.assert_allclose(par_ts, seq_ts)
+    assert par.shape == seq.shape
+    np.testing.assert_allclose(par, seq, atol=1e-5)
@@ -0,0 +1,118 @@
+"""Video uploads give their admission slot back (and keep no orphan copy) when they do not become a job."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core import admission, job_history
+from app.processing import storage_utils as su
+from app.routers import upload
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        v = self.data.get(key)
+        return None if v is None else str(v).encode()
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def decr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) - 1
+        return self.data[key]
+
+    def expire(self, key, ttl):
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+SLOT = admission.USER_KEY.format("user:u1")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    r = FakeRedis()
+    monkeypatch.setattr(admission, "_redis", r)
+    monkeypatch.setattr(admission, "queue_depth", lambda queue=None: 0)
+    monkeypatch.setattr(admission, "check_disk", lambda incoming_bytes=0: None)
+    monkeypatch.setattr(settings, "admission_enabled", True)
+    monkeypatch.setattr(settings, "admission_worker_slots", 1)
+    monkeypatch.setattr(settings, "job_dedup", False)
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path / "raw_videos"))
+    (tmp_path / "raw_videos").mkdir()
+    monkeypatch.setattr(upload, "RESUMABLE_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(su, "FEATURE_ROOT", str(tmp_path / "features"))
+    monkeypatch.setattr(su, "LABELS_CSV", str(tmp_path / "labels.csv"))
+    monkeypatch.setattr(job_history, "record_enqueued", lambda *a, **k: None)
+    monkeypatch.setattr(upload.enqueue_process_video, "apply_async", lambda **kwargs: None)
+    app = FastAPI()
+    app.include_router(upload.router)
+    return TestClient(app, raise_server_exceptions=False), r, tmp_path / "raw_videos"
+
+
+def _post(c):
+    return c.post("/upload/video", data={"user": "u1", "label": "halo"},
+                  files={"file": ("clip.mp4", b"\x00" * 1000, "video/mp4")})
+
+
+def test_queued_upload_keeps_its_slot(client):
+    c, r, raw = client
+    assert _post(c).status_code == 200
+    assert r.data[SLOT] == 1
+    assert len(list(raw.iterdir())) == 1
+
+
+def test_failed_write_releases_slot(client, monkeypatch):
+    c, r, raw = client
+    monkeypatch.setattr(upload, "_raw_video_path", lambda *a: str(raw / "missing" / "clip.mp4"))
+    assert _post(c).status_code == 500
+    assert SLOT not in r.data
+
+
+def test_failed_label_registry_releases_slot(client, monkeypatch):
+    c, r, raw = client
+
+    def broken(label):
+        raise OSError("labels.csv is read-only")
+    monkeypatch.setattr(su, "register_label", broken)
+    assert _post(c).status_code == 500
+    assert SLOT not in r.data
+    assert list(raw.iterdir()) == []
+
+
+def test_failed_enqueue_releases_slot(client, monkeypatch):
+    c, r, raw = client
+
+    def broken(**kwargs):
+        raise ConnectionError("broker down")
+    monkeypatch.setattr(upload.enqueue_process_video, "apply_async", broken)
+    assert _post(c).status_code == 500
+    assert SLOT not in r.data
+    assert list(raw.iterdir()) == []
+
+
+def test_failed_complete_keeps_the_upload_resumable(client, monkeypatch):
+    c, r, raw = client
+    upload_id = c.post("/upload/video/init", data={"filename": "clip.mp4", "size": "1000", "user": "u1",
+                                                   "label": "halo"}).json()["upload_id"]
+    assert c.put(f"/upload/video/{upload_id}?offset=0", content=b"\x00" * 1000).status_code == 200
+
+    def broken(**kwargs):
+        raise ConnectionError("broker down")
+    monkeypatch.setattr(upload.enqueue_process_video, "apply_async", broken)
+    assert c.post(f"/upload/video/{upload_id}/complete").status_code == 500
+    assert SLOT not in r.data
+    assert list(raw.iterdir()) == []
+    assert c.get(f"/upload/video/{upload_id}").json()["offset"] == 1000
+
+    monkeypatch.setattr(upload.enqueue_process_video, "apply_async", lambda **kwargs: None)
+    assert c.post(f"/upload/video/{upload_id}/complete").status_code == 200
+    assert r.data[SLOT] == 1
+    assert len(list(raw.iterdir())) == 1
+    assert c.get(f"/upload/video/{upload_id}").status_code == 404
@@ -0,0 +1,94 @@
+"""Resumable uploads take one part at a time: an overlapping PUT gets 409 and cannot corrupt data.part."""
+import asyncio
+import json
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.processing import storage_utils as su
+from app.routers import upload
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "admission_enabled", False)
+    monkeypatch.setattr(upload, "RESUMABLE_DIR", str(tmp_path / "uploads"))
+    app = FastAPI()
+    app.include_router(upload.router)
+    return app
+
+
+async def _put(app, upload_id, offset, body: asyncio.Queue):
+    """PUT a part whose body arrives as the test feeds `body` (bytes chunks, then None)."""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "PUT", "scheme": "http",
+             "path": f"/upload/video/{upload_id}", "raw_path": f"/upload/video/{upload_id}".encode(),
+             "query_string": f"offset={offset}".encode(), "root_path": "", "headers": [],
+             "client": ("127.0.0.1", 5000), "server": ("testserver", 80)}
+
+    async def receive():
+        chunk = await body.get()
+        return {"type": "http.request", "body": chunk or b"", "more_body": chunk is not None}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    return status, json.loads(b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body"))
+
+
+def _body(*chunks):
+    q = asyncio.Queue()
+    for c in chunks + (None,):
+        q.put_nowait(c)
+    return q
+
+
+async def _wait_locked(d):
+    for _ in range(100):
+        fd = upload._lock_upload(d)
+        if fd is None:
+            return
+        su.unlock_file(fd)
+        await asyncio.sleep(0.02)
+    raise AssertionError("first part never took the upload lock")
+
+
+def test_overlapping_parts(app):
+    init = TestClient(app).post("/upload/video/init", data={"filename": "clip.mp4", "size": "12", "label": "halo"})
+    upload_id = init.json()["upload_id"]
+    d = os.path.join(upload.RESUMABLE_DIR, upload_id)
+
+    async def scenario():
+        first_body = asyncio.Queue()
+        first = asyncio.create_task(_put(app, upload_id, 0, first_body))
+        # the first part holds the lock while its body is still arriving
+        await _wait_locked(d)
+        second = await _put(app, upload_id, 0, _body(b"wxyz"))
+        first_body.put_nowait(b"abcd")
+        first_body.put_nowait(None)
+        return await first, second, await _put(app, upload_id, 4, _body(b"efgh"))
+
+    (s1, r1), (s2, r2), (s3, r3) = asyncio.run(scenario())
+    assert (s2, r2["detail"]["message"]) == (409, "another part of this upload is in flight")
+    assert (s1, r1["offset"]) == (200, 4)
+    assert (s3, r3["offset"]) == (200, 8)
+    with open(os.path.join(d, "data.part"), "rb") as f:
+        assert f.read() == b"abcdefgh"
+
+
+def test_stale_offset_is_rejected_under_the_lock(app):
+    c = TestClient(app)
+    upload_id = c.post("/upload/video/init", data={"filename": "clip.mp4", "size": "8", "label": "halo"}).json()["upload_id"]
+    assert c.put(f"/upload/video/{upload_id}?offset=0", content=b"abcd").json()["offset"] == 4
+    r = c.put(f"/upload/video/{upload_id}?offset=0", content=b"wxyz")
+    assert r.status_code == 409 and r.json()["detail"] == {"message": "offset mismatch", "offset": 4}
+
+
+def test_unknown_upload(app):
+    assert TestClient(app).put("/upload/video/abc123?offset=0", content=b"x").status_code == 404
@@ -38,6 +38,104 @@ const API_BASE_URL = 'http://localhost:8000';
 const MAX_UPLOAD_RETRIES = 3;
 const UPLOAD_TIMEOUT = 30000; // 30 seconds
 
+/**
+ * Binary upload format (Content-Type: application/x-landmarks), opt-in via
+ * uploadSession(..., { binary: true }). ~14x smaller than JSON with float16 and
+ * parsed by the server without touching individual values.
+ *
+ *   header  16 bytes little-endian: "SLMK", version 1, dtype (1 = float32, 2 = float16),
+ *           meta length (u16), T (u32), D (u32)
+ *   meta    UTF-8 JSON {user, label, session_id, dialect, layout}, space-padded to 4 bytes
+ *   array   T x D values, row-major, in the layout's column order (below)
+ *
+ * Layout pose_hands_v2 (D = 226, must match the backend FEATURE_LAYOUT):
+ * pose 25 x (x, y, z, visibility), left_hand 21 x (x, y, z), right_hand 21 x (x, y, z).
+ * Missing parts / points are zeros.
+ */
+const BINARY_CONTENT_TYPE = 'application/x-landmarks';
+const FEATURE_LAYOUT = {
+  version: 'pose_hands_v2',
+  parts: [
+    { name: 'pose', n: 25, fields: ['x', 'y', 'z', 'visibility'] },
+    { name: 'left_hand', n: 21, fields: ['x', 'y', 'z'] },
+    { name: 'right_hand', n: 21, fields: ['x', 'y', 'z'] },
+  ] as { name: keyof MediaPipeResults; n: number; fields: (keyof MediaPipeLandmark)[] }[],
+};
+const FEATURE_DIM = FEATURE_LAYOUT.parts.reduce((d, p) => d + p.n * p.fields.length, 0);
+
+interface BinaryUploadOptions {
+  binary?: boolean;              // send application/x-landmarks instead of JSON
+  dtype?: 'float32' | 'float16'; // float16 halves the size (precision ~1e-3, enough for landmarks)
+  gzip?: boolean;                // compress with CompressionStream when the browser has it
+}
+
+/** IEEE 754 half-precision bits of a number (round to nearest). */
+function toFloat16Bits(value: number): number {
+  const f32 = new Float32Array([value]);
+  const x = new Uint32Array(f32.buffer)[0];
+  const sign = (x >>> 16) & 0x8000;
+  const exp = (x >>> 23) & 0xff;
+  let mant = x & 0x7fffff;
+  if (exp === 0xff) return sign | 0x7c00 | (mant ? 0x200 : 0); // inf / NaN
+  let e = exp - 127 + 15;
+  if (e >= 0x1f) return sign | 0x7c00; // overflow -> inf
+  if (e <= 0) {
+    if (e < -10) return sign; // underflow -> 0
+    mant |= 0x800000;
+    const shift = 14 - e;
+    return sign | ((mant + (1 << (shift - 1))) >> shift);
+  }
+  const half = sign | (e << 10) | (mant >> 13);
+  return half + ((mant >> 12) & 1); // round (carry into the exponent is correct)
+}
+
+/** Encode captured frames into the binary upload format. */
+function encodeLandmarksBinary(
+  frames: CaptureFrame[],
+  meta: { user: string; label: string; session_id: string; dialect?: string },
+  dtype: 'float32' | 'float16' = 'float16'
+): ArrayBuffer {
+  const T = frames.length;
+  const D = FEATURE_DIM;
+  let metaBytes = new TextEncoder().encode(JSON.stringify({ ...meta, layout: FEATURE_LAYOUT.version }));
+  const padded = new Uint8Array(Math.ceil(metaBytes.length / 4) * 4).fill(0x20);
+  padded.set(metaBytes);
+  metaBytes = padded;
+
+  const itemSize = dtype === 'float16' ? 2 : 4;
+  const buffer = new ArrayBuffer(16 + metaBytes.length + T * D * itemSize);
+  const view = new DataView(buffer);
+  new Uint8Array(buffer, 0, 4).set([0x53, 0x4c, 0x4d, 0x4b]); // "SLMK"
+  view.setUint8(4, 1);
+  view.setUint8(5, dtype === 'float16' ? 2 : 1);
+  view.setUint16(6, metaBytes.length, true);
+  view.setUint32(8, T, true);
+  view.setUint32(12, D, true);
+  new Uint8Array(buffer, 16, metaBytes.length).set(metaBytes);
+
+  let pos = 16 + metaBytes.length;
+  for (const frame of frames) {
+    for (const part of FEATURE_LAYOUT.parts) {
+      const points = (frame.landmarks[part.name] || []).slice(0, part.n);
+      for (let i = 0; i < part.n; i++) {
+        const p = points[i];
+        for (const field of part.fields) {
+          const v = (p && p[field]) || 0;
+          if (itemSize === 2) view.setUint16(pos, toFloat16Bits(v), true);
+          else view.setFloat32(pos, v, true);
+          pos += itemSize;
+        }
+      }
+    }
+  }
+  return buffer;
+}
+
+async function gzipBody(body: ArrayBuffer): Promise<ArrayBuffer> {
+  const stream = new Blob([body]).stream().pipeThrough(new CompressionStream('gzip'));
+  return new Response(stream).arrayBuffer();
+}
+
 /**
  * Service class để upload camera data
  */
@@ -90,7 +188,8 @@ class CameraUploadService {
   async uploadSession(
     user: string,
     label: string,
-    onProgress?: (progress: number) => void
+    onProgress?: (progress: number) => void,
+    options: BinaryUploadOptions = {}
   ): Promise<UploadResponse> {
     if (!this.sessionId || this.frames.length === 0) {
       throw new Error('No data to upload. Capture some frames first.');
@@ -104,9 +203,26 @@ class CameraUploadService {
     };
 
     console.log(`📤 Uploading ${this.frames.length} frames...`);
-    
+
+    // Body: JSON (default) or the binary landmarks format
+    const headers: Record<string, string> = { 'User-Agent': 'React-MediaPipe-Frontend/1.0' };
+    let body: BodyInit;
+    if (options.binary) {
+      let buffer = encodeLandmarksBinary(this.frames, { user, label, session_id: this.sessionId },
+                                         options.dtype || 'float16');
+      if (options.gzip && typeof CompressionStream !== 'undefined') {
+        buffer = await gzipBody(buffer);
+        headers['Content-Encoding'] = 'gzip';
+      }
+      headers['Content-Type'] = BINARY_CONTENT_TYPE;
+      body = buffer;
+    } else {
+      headers['Content-Type'] = 'application/json';
+      body = JSON.stringify(payload);
+    }
+
     // Calculate payload size for progress indication
-    const payloadSize = JSON.stringify(payload).length;
+    const payloadSize = typeof body === 'string' ? body.length : (body as ArrayBuffer).byteLength;
     console.log(`📦 Payload size: ${(payloadSize / 1024).toFixed(1)} KB`);
 
     let lastError: Error;
@@ -118,11 +234,8 @@ class CameraUploadService {
 
         const response = await fetch(`${API_BASE_URL}/upload/camera`, {
           method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-            'User-Agent': 'React-MediaPipe-Frontend/1.0'
-          },
-          body: JSON.stringify(payload),
+          headers,
+          body,
           signal: AbortSignal.timeout(UPLOAD_TIMEOUT)
         });
 
@@ -212,7 +325,7 @@ function useCameraUpload() {
     }
   }, [uploadService, isCapturing]);
 
-  const upload = useCallback(async (user: string, label: string) => {
+  const upload = useCallback(async (user: string, label: string, options?: BinaryUploadOptions) => {
     if (isUploading) return;
 
     setIsUploading(true);
@@ -222,7 +335,8 @@ function useCameraUpload() {
       const result = await uploadService.uploadSession(
         user,
         label,
-        setUploadProgress
+        setUploadProgress,
+        options
       );
       
       setStats(uploadService.getSessionStats());
@@ -282,5 +396,5 @@ async function uploadFrames(user: string, label: string, frames: CaptureFrame[])
   return response.json();
 }
 
-export { CameraUploadService, useCameraUpload };
-export type { MediaPipeResults, CaptureFrame, UploadResponse };
\ No newline at end of file
+export { CameraUploadService, useCameraUpload, encodeLandmarksBinary, BINARY_CONTENT_TYPE };
+export type { MediaPipeResults, CaptureFrame, UploadResponse, BinaryUploadOptions };
\ No newline at end of file
@@ -0,0 +1,26 @@
+-- Migration: Persistent job history
+-- Description: One row per Celery job (video processing, export, validation, maintenance),
+-- written on enqueue, start and finish. Listed with keyset pagination by /jobs/.
+-- init_db() creates the same table on startup in development.
+
+CREATE TABLE IF NOT EXISTS jobs (
+  id VARCHAR(64) PRIMARY KEY,
+  kind VARCHAR(32) NOT NULL,
+  queue VARCHAR(32),
+  "user" TEXT,
+  label TEXT,
+  session_id TEXT,
+  status VARCHAR(16) NOT NULL,
+  error TEXT,
+  telemetry JSON,
+  created_at TIMESTAMP NOT NULL DEFAULT now(),
+  started_at TIMESTAMP,
+  finished_at TIMESTAMP,
+  duration_s DOUBLE PRECISION
+);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_created_id ON jobs(created_at, id);
+CREATE INDEX IF NOT EXISTS ix_jobs_user_created ON jobs("user", created_at);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs(status, created_at);
+
+COMMENT ON TABLE jobs IS 'Celery job history (status, timings, pipeline telemetry)';
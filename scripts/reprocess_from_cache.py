@@ -0,0 +1,104 @@
+"""Rebuild video samples from the keypoint cache (no decode, no MediaPipe).
+
+Every processed video leaves its raw keypoint sequence and job metadata in
+dataset/cache/keypoints (see backend/app/processing/keypoint_cache.py); a video submitted
+by several jobs (another user, label, ...) records each of them and is rebuilt once per
+job. After changing padding, augmentation or export logic, regenerate the samples from there.
+
+Usage (from the repo root):
+  # List what would be rebuilt
+  python scripts/reprocess_from_cache.py --dry-run
+
+  # Rebuild samples for one label only
+  python scripts/reprocess_from_cache.py --label "xin chao"
+
+  # Report raw videos that have no cache entry for the current config
+  python scripts/reprocess_from_cache.py --check-raw --dry-run
+
+Note: samples are added next to the existing ones. Clear dataset/features and
+samples.csv first (scripts/reset_dataset.ps1, after a backup) for a clean rebuild.
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / 'backend'))
+
+from app.processing import keypoint_cache as kc  # noqa: E402
+from app.processing.pipeline import (TARGET_FPS, build_samples, extractor_config, frame_variants,  # noqa: E402
+                                    restore_time_axis, variant_config)
+
+RAW_VIDEOS = REPO_ROOT / 'dataset' / 'raw_videos'
+
+
+def check_raw(cfg_digest):
+    """Print raw videos without a cache entry for cfg_digest."""
+    if not RAW_VIDEOS.exists():
+        print(f'Raw video folder not found: {RAW_VIDEOS}')
+        return
+    missing = []
+    for video in sorted(RAW_VIDEOS.iterdir()):
+        if video.is_file() and not os.path.exists(kc.entry_path(kc.file_digest(str(video)), cfg_digest)):
+            missing.append(video.name)
+    print(f'{len(missing)} raw videos without a cache entry (re-run them through /upload/video):')
+    for name in missing:
+        print(f'  {name}')
+
+
+def main(args):
+    os.chdir(REPO_ROOT)  # storage paths are relative to the repo root
+    cfg_digest = kc.config_digest(extractor_config(), TARGET_FPS)
+    # entries of the configured Stage A variants (FRAME_AUGMENTATIONS) count as current too
+    # (the variant pass never crops, see extract_variant_keypoints_cached)
+    variant_cfg = {**extractor_config(), "roi_crop": False}
+    digests = {cfg_digest} | {kc.config_digest(variant_config(variant_cfg, v), TARGET_FPS) for v in frame_variants()}
+    if args.check_raw:
+        check_raw(cfg_digest)
+
+    t0 = time.time()
+    n_entries = n_jobs = n_samples = 0
+    for npz_path, meta in kc.iter_entries():
+        if not args.all_configs and meta.get('config_digest') not in digests:
+            continue
+        jobs = [job for job in kc.entry_jobs(meta) if job.get('label')]
+        if not jobs:
+            print(f'skip {npz_path}: no job metadata')
+            continue
+        if args.label:
+            jobs = [job for job in jobs if job['label'] == args.label]
+            if not jobs:
+                continue
+        n_entries += 1
+        n_jobs += len(jobs)
+        if args.dry_run:
+            for job in jobs:
+                print(f"{job['label']:<24} {job.get('user', ''):<16} {meta.get('frames', 0):>5} frames  {npz_path}")
+            continue
+        hit = kc.load(meta['video_sha256'], meta['config_digest'])
+        if hit is None:
+            print(f'skip {npz_path}: unreadable entry')
+            continue
+        timestamps, seq = hit
+        seq = restore_time_axis(timestamps, seq, meta.get('config') or {})
+        for job in jobs:
+            saved = build_samples(seq, job.get('user', ''), job['label'], job.get('session_id', ''),
+                                  job.get('dialect', ''), layout=(meta.get('config') or {}).get('layout'),
+                                  frame_variant=job.get('frame_variant', 'original'))
+            n_samples += len(saved)
+
+    action = 'would rebuild' if args.dry_run else f'rebuilt {n_samples} samples from'
+    print(f'{action} {n_jobs} jobs of {n_entries} cached videos in {time.time() - t0:.1f}s')
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser(description='Rebuild video samples from the keypoint cache')
+    p.add_argument('--dry-run', action='store_true', help='list matching cache entries only')
+    p.add_argument('--label', default='', help='only entries of this label')
+    p.add_argument('--all-configs', action='store_true',
+                   help='also use entries extracted with a different extractor config')
+    p.add_argument('--check-raw', action='store_true', help='report raw videos that are not cached')
+    args = p.parse_args()
+    main(args)
@@ -0,0 +1,104 @@
+"""
+Benchmark for parsing /upload/camera payloads (backend/app/processing/camera_payload.py).
+
+    python tools/bench_camera_upload.py --frames 90 --repeat 20
+
+Builds a synthetic MediaPipe-style JSON clip in the feature layout and reports the body
+size and per-clip parse time of the previous handler (json.loads + per-point dict walk
+into per-frame vectors, then a padded copy) versus orjson + the one-pass parser, and of
+the binary transport (application/x-landmarks; float32 / float16, plain / gzip).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(here, 'backend'))
+
+from app.processing.layouts import get_layout  # noqa: E402
+from app.processing.camera_payload import encode_camera_binary, parse_camera_binary, parse_camera_payload  # noqa: E402
+
+
+def make_payload(layout, n_frames: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    frames = []
+    for t in range(n_frames):
+        landmarks = {}
+        for part in layout.parts:
+            landmarks[part.name] = [{f: float(v) for f, v in zip(part.fields, rng.random(len(part.fields)))}
+                                    for _ in range(part.n)]
+        frames.append({'timestamp': t * 33, 'landmarks': landmarks})
+    payload = {'user': 'bench', 'label': 'bench', 'session_id': 'bench', 'frames': frames}
+    return json.dumps(payload).encode('utf-8')
+
+
+def legacy_parse(body: bytes, layout):
+    """The handler before camera_payload: stdlib JSON, per-point .get + float(), padded copy."""
+    payload = json.loads(body)
+    frames = payload.get('frames')
+
+    def flatten_landmarks(ld):
+        vec = np.zeros(layout.dim, dtype='float32')
+        for part in layout.parts:
+            off = layout.offsets[part.name]
+            k = len(part.fields)
+            for i, p in enumerate((ld.get(part.name) or [])[:part.n]):
+                if not isinstance(p, dict):
+                    continue
+                for j, field in enumerate(part.fields):
+                    v = p.get(field)
+                    vec[off + i * k + j] = float(v) if v is not None else 0.0
+        return vec
+
+    landmarks_seq = [flatten_landmarks(f.get('landmarks')) for f in frames]
+    maxlen = max(a.size for a in landmarks_seq)
+    seq = np.zeros((len(landmarks_seq), maxlen), dtype='float32')
+    for i, a in enumerate(landmarks_seq):
+        seq[i, :a.size] = a.astype('float32')
+    return seq.astype('float32')
+
+
+def _time(fn, repeat: int):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t0) / repeat, out
+
+
+def main():
+    p = argparse.ArgumentParser(description='Camera upload payload parse benchmark')
+    p.add_argument('--layout', default=None, help='feature layout version (default: pose_hands_v2)')
+    p.add_argument('--frames', type=int, default=90)
+    p.add_argument('--repeat', type=int, default=20)
+    args = p.parse_args()
+
+    layout = get_layout(args.layout)
+    body = make_payload(layout, args.frames)
+    points = args.frames * sum(part.n for part in layout.parts)
+    print(f'{args.frames} frames, layout {layout.version} (D={layout.dim}), {points} points, '
+          f'{len(body) / 1024:.1f} KB JSON')
+
+    legacy, a = _time(lambda: legacy_parse(body, layout), args.repeat)
+    fast, (_, b) = _time(lambda: parse_camera_payload(body, layout), args.repeat)
+    assert a.shape == b.shape and np.array_equal(a, b), 'parsers disagree'
+    print(f'json + dict walk     : {legacy * 1000:8.2f} ms/clip')
+    print(f'orjson + one pass    : {fast * 1000:8.2f} ms/clip  ({legacy / fast:.1f}x)')
+
+    meta = {'user': 'bench', 'label': 'bench', 'session_id': 'bench', 'layout': layout.version}
+    for dtype in ('float32', 'float16'):
+        for compress in (False, True):
+            blob = encode_camera_binary(b, meta, dtype, compress)
+            t, (_, c) = _time(lambda: parse_camera_binary(blob, layout), args.repeat)
+            assert c.shape == b.shape and np.allclose(c, b, atol=1e-3)
+            name = f'binary {dtype}{" gzip" if compress else ""}'
+            print(f'{name:<21}: {t * 1000:8.3f} ms/clip  ({legacy / t:.0f}x), '
+                  f'{len(blob) / 1024:.1f} KB ({len(body) / len(blob):.0f}x smaller)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+Benchmarks for the backend keypoint extraction path (backend/app/processing).
+
+    python tools/bench_keypoints.py detector --video clip.mp4 --jobs 5
+
+detector:   per-job cost of building a new Holistic graph for every video versus
+            reusing the process-wide instance (reset between videos)
+preprocess: per-frame inference cost at full resolution versus downscaled input
+variants:   Stage A frame-level augmentation as separate passes (one per variant,
+            list-based augmenter) versus one shared pass with per-variant graphs in threads
+motion:     share of sampled frames the motion gate sends to MediaPipe, and its per-frame cost
+convert:    per-frame landmark -> array conversion cost, per-landmark lists versus
+            bulk extraction into a preallocated (T, D) buffer (no inference)
+"""
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+# ensure package imports resolve when running from workspace root
+here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(here, 'backend'))
+
+from app.processing import keypoints_adapter as ka  # noqa: E402
+from app.processing.ingest import iter_sampled_frames, motion_gate, sample_frames_from_video  # noqa: E402
+
+
+def _load_frames(args):
+    if args.video:
+        return sample_frames_from_video(args.video, target_fps=args.fps)[:args.frames]
+    # flat synthetic frames (no person): use --video with a real signer clip for representative numbers
+    frame = np.full((args.height, args.width, 3), 120, dtype=np.uint8)
+    cv2.circle(frame, (args.width // 2, args.height // 2), min(args.width, args.height) // 5, (200, 180, 160), -1)
+    return [frame.copy() for _ in range(args.frames)]
+
+
+def bench_detector(args):
+    import mediapipe as mp
+    frames = _load_frames(args)
+    print(f'{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, {args.jobs} jobs')
+
+    t0 = time.perf_counter()
+    for _ in range(args.jobs):
+        with mp.solutions.holistic.Holistic(**ka.HOLISTIC_PARAMS) as holistic:
+            ka.extract_sequence_from_frames(frames, holistic=holistic)
+    fresh = (time.perf_counter() - t0) / args.jobs
+
+    t_init = time.perf_counter()
+    ka.get_holistic()
+    t_init = time.perf_counter() - t_init
+    t0 = time.perf_counter()
+    for _ in range(args.jobs):
+        ka.extract_sequence_from_frames(frames)
+    persistent = (time.perf_counter() - t0) / args.jobs
+    ka.close_holistic()
+
+    print(f'new graph per job : {fresh * 1000:8.1f} ms/job')
+    print(f'persistent graph  : {persistent * 1000:8.1f} ms/job  (one-off init {t_init * 1000:.1f} ms at worker start)')
+    print(f'fixed overhead saved per job: {(fresh - persistent) * 1000:.1f} ms')
+
+
+def bench_preprocess(args):
+    frames = _load_frames(args)
+    h, w = frames[0].shape[:2]
+    print(f'{len(frames)} frames of {w}x{h}')
+    for max_side in args.max_sides:
+        ka.get_holistic()
+        ka.extract_sequence_from_frames(frames[:1], {"max_side": max_side})  # warm-up
+        t0 = time.perf_counter()
+        ka.extract_sequence_from_frames(frames, {"max_side": max_side})
+        per_frame = (time.perf_counter() - t0) / len(frames)
+        label = 'full' if not max_side else str(max_side)
+        print(f'max_side={label:<6} {per_frame * 1000:8.1f} ms/frame')
+    ka.close_holistic()
+
+
+def bench_variants(args):
+    from app.processing import augmenter
+    frames = _load_frames(args)
+    variants = ['original'] + [v for v in args.variants if v != 'original']
+    h, w = frames[0].shape[:2]
+    print(f'{len(frames)} frames of {w}x{h}, variants: {",".join(variants)}')
+    list_ops = {'original': lambda fs: fs, 'flipped': augmenter.flip_frames,
+                'bright': lambda fs: augmenter.adjust_brightness(fs, 1.3),
+                'noisy': lambda fs: augmenter.add_gaussian_noise(fs, sigma=15)}
+
+    ka.extract_variant_sequences(frames[:2], variants)  # build every graph + warm-up
+    t0 = time.perf_counter()
+    for v in variants:
+        ka.extract_sequence_from_frames(list_ops[v](frames))
+    separate = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ka.extract_variant_sequences(frames, variants)
+    shared = time.perf_counter() - t0
+    ka.close_holistic()
+
+    print(f'separate passes : {separate / len(frames) * 1000:8.1f} ms/frame')
+    print(f'one shared pass : {shared / len(frames) * 1000:8.1f} ms/frame  ({separate / shared:.2f}x)')
+    print('(decode is excluded here; with --video each separate job would also decode again)')
+
+
+def bench_motion(args):
+    frames = list(iter_sampled_frames(args.video, target_fps=args.fps))
+    print(f'{len(frames)} sampled frames from {args.video} at {args.fps} fps')
+    for threshold in args.thresholds:
+        t0 = time.perf_counter()
+        kept = [ts for ts, _ in motion_gate(iter(frames), min_changed=threshold)]
+        per_frame = (time.perf_counter() - t0) / max(1, len(frames))
+        span = f'{kept[0]:.2f}-{kept[-1]:.2f}s' if kept else '-'
+        print(f'min_changed={threshold:<7g} kept {len(kept):4d}/{len(frames)} ({len(kept) / max(1, len(frames)):6.1%}) '
+              f'span {span:<14} gate {per_frame * 1000:.2f} ms/frame')
+
+
+def _synthetic_results(seed=0):
+    """Holistic-like results with every landmark list filled (the worst case for conversion)."""
+    from types import SimpleNamespace
+    from mediapipe.framework.formats import landmark_pb2
+    rng = np.random.default_rng(seed)
+    sizes = {"pose_landmarks": 33, "left_hand_landmarks": 21, "right_hand_landmarks": 21, "face_landmarks": 468}
+    out = {}
+    for source, n in sizes.items():
+        lst = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z, v in rng.random((n, 4)):
+            lst.landmark.add(x=x, y=y, z=z, visibility=v)
+        out[source] = lst
+    return SimpleNamespace(**out)
+
+
+def _convert_lists(results, transform, layout):
+    # previous implementation: a Python list per landmark, an array per part, then concatenate
+    ox, oy, sx, sy = transform
+
+    def lm_to_list(landmarks, expected_n, fields):
+        if not landmarks:
+            return np.zeros((expected_n, len(fields)), dtype=np.float32)
+        coords = []
+        for i in range(expected_n):
+            if i < len(landmarks.landmark):
+                lm = landmarks.landmark[i]
+                vals = {"x": ox + lm.x * sx, "y": oy + lm.y * sy, "z": getattr(lm, "z", 0.0) * sx,
+                        "visibility": getattr(lm, "visibility", 0.0)}
+                coords.append([vals[f] for f in fields])
+            else:
+                coords.append([0.0] * len(fields))
+        return np.array(coords, dtype=np.float32)
+
+    return np.concatenate([lm_to_list(getattr(results, p.source), p.n, p.fields).reshape(-1)
+                           for p in layout.parts], axis=0)
+
+
+def bench_convert(args):
+    from app.processing.layouts import get_layout
+    layout = get_layout(args.layout)
+    results = _synthetic_results()
+    transform = (0.1, 0.05, 0.8, 0.9) if args.roi else (0.0, 0.0, 1.0, 1.0)
+    print(f'layout {layout.version} (D={layout.dim}), {args.frames} frames, roi transform={args.roi}')
+
+    t0 = time.perf_counter()
+    rows = [_convert_lists(results, transform, layout) for _ in range(args.frames)]
+    legacy_seq = np.stack(rows, axis=0)
+    legacy = (time.perf_counter() - t0) / args.frames
+
+    t0 = time.perf_counter()
+    buf = ka.SequenceBuffer(layout.dim)
+    for _ in range(args.frames):
+        ka.write_keypoints(results, buf.next_row(), transform, layout)
+    seq = buf.array()
+    bulk = (time.perf_counter() - t0) / args.frames
+
+    print(f'per-landmark lists : {legacy * 1e6:8.1f} us/frame')
+    print(f'bulk into buffer   : {bulk * 1e6:8.1f} us/frame  ({legacy / bulk:.1f}x)')
+    print(f'max abs difference : {np.abs(seq - legacy_seq).max():.2e}')
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Keypoint extraction benchmarks')
+    sub = p.add_subparsers(dest='bench', required=True)
+
+    d = sub.add_parser('detector', help='per-job Holistic construction vs persistent instance')
+    d.add_argument('--video', default='', help='sample frames from this video instead of random frames')
+    d.add_argument('--fps', type=float, default=6.0)
+    d.add_argument('--frames', type=int, default=10)
+    d.add_argument('--width', type=int, default=640)
+    d.add_argument('--height', type=int, default=480)
+    d.add_argument('--jobs', type=int, default=5)
+    d.set_defaults(func=bench_detector)
+
+    pp = sub.add_parser('preprocess', help='per-frame cost at full resolution vs downscaled input')
+    pp.add_argument('--video', default='')
+    pp.add_argument('--fps', type=float, default=6.0)
+    pp.add_argument('--frames', type=int, default=20)
+    pp.add_argument('--width', type=int, default=1920)
+    pp.add_argument('--height', type=int, default=1080)
+    pp.add_argument('--max-sides', type=lambda s: [int(x) for x in s.split(',')], default=[0, 1280, 960, 640])
+    pp.set_defaults(func=bench_preprocess)
+
+    v = sub.add_parser('variants', help='Stage A variants: separate passes vs one shared pass')
+    v.add_argument('--video', default='')
+    v.add_argument('--fps', type=float, default=6.0)
+    v.add_argument('--frames', type=int, default=20)
+    v.add_argument('--width', type=int, default=1280)
+    v.add_argument('--height', type=int, default=720)
+    v.add_argument('--variants', type=lambda s: s.split(','), default=['flipped', 'bright', 'noisy'])
+    v.set_defaults(func=bench_variants)
+
+    m = sub.add_parser('motion', help='frames kept by the motion gate (MOTION_GATE) on a real clip')
+    m.add_argument('--video', required=True)
+    m.add_argument('--fps', type=float, default=6.0)
+    m.add_argument('--thresholds', type=lambda s: [float(x) for x in s.split(',')], default=[0.001, 0.002, 0.005, 0.01])
+    m.set_defaults(func=bench_motion)
+
+    c = sub.add_parser('convert', help='landmark -> array conversion cost per frame')
+    c.add_argument('--layout', default=None, help='feature layout version (default: pose_hands_v2)')
+    c.add_argument('--frames', type=int, default=2000)
+    c.add_argument('--roi', action='store_true', help='apply a crop transform as with ROI_CROP=true')
+    c.set_defaults(func=bench_convert)
+    return p.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    args.func(args)
@@ -0,0 +1,230 @@
+"""
+Throughput benchmark for the training data and model path.
+
+Generates a synthetic dataset in the same on-disk layout as storage_utils
+(dataset/features/class_XXXX_slug/sample_XXXX_uuid.npz + .json) and times each
+stage separately: index build, load/decode, augment, collate, forward, backward
+and the end-to-end DataLoader, across worker counts and batch sizes.
+
+Results are written as JSON so two runs (e.g. two commits) can be compared:
+
+    python tools/bench_training.py --out bench_a.json
+    python tools/bench_training.py --out bench_b.json --compare bench_a.json
+"""
+import os
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+import uuid
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+
+from torch_dataset import SignDataset, jitter, scale, time_warp_resample, mirror_sequence, get_layout
+from train_baseline import BiGRUModel, collate_fn
+
+
+def make_synthetic_dataset(root, n_samples, n_classes, T=60, D=226, n_users=4, seed=0):
+    """Write n_samples random (T, D) sequences spread over n_classes label folders."""
+    rng = np.random.default_rng(seed)
+    for i in range(n_samples):
+        class_idx = i % n_classes + 1
+        folder = os.path.join(root, f"class_{class_idx:04d}_synthetic-{class_idx}")
+        os.makedirs(folder, exist_ok=True)
+        fname = f"sample_{class_idx:04d}_{uuid.uuid4().hex[:8]}"
+        seq = rng.standard_normal((T, D), dtype=np.float32)
+        np.savez_compressed(os.path.join(folder, fname + ".npz"), sequence=seq)
+        meta = {"user": f"user{i % n_users}", "class_idx": class_idx, "frames": T, "source": "synthetic"}
+        with open(os.path.join(folder, fname + ".json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+
+def _timeit(fn, repeats, setup=None):
+    """Return the best wall time of fn() over repeats runs; with setup, fn(setup()) and setup is not timed."""
+    best = float("inf")
+    for _ in range(repeats):
+        fn_args = (setup(),) if setup is not None else ()
+        t0 = time.perf_counter()
+        fn(*fn_args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _record(results, stage, seconds, items, **params):
+    rec = {"stage": stage, "seconds": seconds, "items": items,
+           "items_per_sec": items / seconds if seconds > 0 else None}
+    rec.update(params)
+    results.append(rec)
+    extra = " ".join(f"{k}={v}" for k, v in params.items())
+    print(f"{stage:<12} {extra:<28} {rec['items_per_sec'] or 0:>12.1f} items/s  ({seconds:.4f}s)")
+
+
+def bench_dataset_stages(root, args, results):
+    n = args.samples
+    _record(results, "index", _timeit(lambda: SignDataset(root, augment=False), args.repeats), n)
+
+    ds = SignDataset(root, augment=False)
+    _record(results, "load", _timeit(lambda: [ds[i] for i in range(len(ds))], args.repeats), len(ds))
+
+    seqs = [ds[i][0].numpy() for i in range(len(ds))]
+    augments = {"jitter": jitter, "scale": scale, "time_warp": time_warp_resample, "mirror": mirror_sequence}
+    for name, fn in augments.items():
+        _record(results, "augment", _timeit(lambda: [fn(s) for s in seqs], args.repeats), len(seqs), op=name)
+    return ds
+
+
+def bench_collate_and_model(ds, args, results):
+    num_classes = args.classes
+    model = BiGRUModel(input_dim=args.D, hidden=args.hidden, num_layers=args.num_layers, num_classes=num_classes)
+    criterion = torch.nn.CrossEntropyLoss()
+    items = [ds[i] for i in range(len(ds))]
+
+    for bs in args.batch_sizes:
+        batches = [items[i:i + bs] for i in range(0, len(items) - bs + 1, bs)] or [items]
+        n = sum(len(b) for b in batches)
+        _record(results, "collate", _timeit(lambda: [collate_fn(b) for b in batches], args.repeats), n, batch_size=bs)
+
+        xb, yb = collate_fn(batches[0])
+        model.eval()
+        with torch.no_grad():
+            model(xb)  # warm-up
+            t = _timeit(lambda: model(xb), args.repeats)
+        _record(results, "forward", t, xb.size(0), batch_size=bs)
+
+        model.train()
+
+        def step():
+            logits = model(xb)
+            loss = criterion(logits, yb)
+            model.zero_grad()
+            loss.backward()
+
+        step()  # warm-up
+        _record(results, "fwd+bwd", _timeit(step, args.repeats), xb.size(0), batch_size=bs)
+
+        def forward_loss():
+            # builds the graph backward walks; not part of the timed region
+            model.zero_grad()
+            return criterion(model(xb), yb)
+
+        _record(results, "backward", _timeit(lambda loss: loss.backward(), args.repeats, setup=forward_loss),
+                xb.size(0), batch_size=bs)
+
+
+def bench_loader(root, args, results):
+    ds = SignDataset(root, augment=True)
+    for workers in args.workers:
+        for bs in args.batch_sizes:
+            loader = DataLoader(ds, batch_size=bs, shuffle=True, num_workers=workers, collate_fn=collate_fn,
+                                persistent_workers=False)
+
+            def epoch():
+                for _ in loader:
+                    pass
+
+            _record(results, "loader", _timeit(epoch, args.repeats), len(ds), workers=workers, batch_size=bs)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def _key(rec):
+    return tuple((k, rec[k]) for k in sorted(rec) if k not in ("seconds", "items", "items_per_sec"))
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {_key(r): r for r in json.load(f)["results"]}
+    print(f"\nComparison against {baseline_path} (ratio > 1.0 means faster now)")
+    for rec in results:
+        old = baseline.get(_key(rec))
+        if not old or not old.get("items_per_sec") or not rec.get("items_per_sec"):
+            continue
+        ratio = rec["items_per_sec"] / old["items_per_sec"]
+        extra = " ".join(f"{k}={v}" for k, v in _key(rec) if k != "stage")
+        print(f"{rec['stage']:<12} {extra:<28} {ratio:>6.2f}x")
+
+
+def run(args):
+    random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    torch.set_num_threads(args.threads)
+
+    root = args.data_dir or tempfile.mkdtemp(prefix="sign_bench_")
+    created = not os.listdir(root) if os.path.isdir(root) else True
+    if created:
+        print(f"Generating {args.samples} synthetic samples under {root}")
+        make_synthetic_dataset(root, args.samples, args.classes, T=args.T, D=args.D, seed=args.seed)
+
+    results = []
+    try:
+        ds = bench_dataset_stages(root, args, results)
+        bench_collate_and_model(ds, args, results)
+        bench_loader(root, args, results)
+    finally:
+        if created and not args.keep_data:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+            "threads": args.threads,
+            "samples": args.samples,
+            "classes": args.classes,
+            "T": args.T,
+            "D": args.D,
+            "hidden": args.hidden,
+            "num_layers": args.num_layers,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {len(results)} results to {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+    return report
+
+
+def _int_list(s):
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark SignDataset / collate_fn / BiGRUModel throughput")
+    p.add_argument('--samples', type=int, default=256)
+    p.add_argument('--classes', type=int, default=10)
+    p.add_argument('--T', type=int, default=60)
+    p.add_argument('--D', type=int, default=get_layout().dim)
+    p.add_argument('--workers', type=_int_list, default=[0, 2, 4])
+    p.add_argument('--batch-sizes', type=_int_list, default=[8, 32])
+    p.add_argument('--hidden', type=int, default=128)
+    p.add_argument('--num-layers', type=int, default=1)
+    p.add_argument('--threads', type=int, default=torch.get_num_threads())
+    p.add_argument('--repeats', type=int, default=3)
+    p.add_argument('--data-dir', default='', help='reuse an existing features root instead of a temp dir')
+    p.add_argument('--keep-data', action='store_true')
+    p.add_argument('--out', default='bench_training.json')
+    p.add_argument('--compare', default='', help='previous results JSON to compare against')
+    p.add_argument('--seed', type=int, default=42)
+    return p.parse_args(argv)
+
+
+if __name__ == '__main__':
+    run(parse_args())
@@ -0,0 +1,147 @@
+"""
+Background checkpoint writer for train_baseline.py.
+
+The training loop only pays for copying the state to CPU memory; torch.save runs on a
+writer thread. Every epoch is written once to checkpoint_epochNNNN.pth.tar, and the
+"latest" / "best" names are hard links (atomic rename into place) instead of a second
+serialization. A keep-last-N / keep-best-K policy prunes old epoch files.
+"""
+import os
+import json
+import queue
+import shutil
+import threading
+from pathlib import Path
+
+import torch
+
+
+def snapshot_to_cpu(obj):
+    """Deep-copy a (nested) state dict, cloning every tensor to CPU so training can keep mutating the originals."""
+    if torch.is_tensor(obj):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {k: snapshot_to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [snapshot_to_cpu(v) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(snapshot_to_cpu(v) for v in obj)
+    return obj
+
+
+def link_atomic(src, dst):
+    """Point dst at src's content: hard link when the filesystem allows it, copy otherwise, then rename into place."""
+    src, dst = Path(src), Path(dst)
+    tmp = dst.with_name(dst.name + '.tmp')
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+class AsyncCheckpointWriter:
+    MANIFEST = 'checkpoints.json'
+
+    def __init__(self, out_dir, keep_last=3, keep_best=1, latest_name='checkpoint.pth.tar',
+                 best_name='model_best.pth.tar', mode='max'):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.latest_name = latest_name
+        self.best_name = best_name
+        self.mode = mode
+        self._records = self._load_manifest()  # [{"file", "epoch", "metric"}]
+        self._error = None
+        # at most one snapshot waiting while another is being written, so host memory stays bounded
+        self._queue = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+        self._thread.start()
+
+    def save(self, state, epoch, metric=None, is_best=False):
+        """Snapshot state to CPU and hand it to the writer thread. Blocks only if a previous write is still queued."""
+        self._raise_pending()
+        self._queue.put((snapshot_to_cpu(state), epoch, metric, is_best))
+
+    def flush(self):
+        self._queue.join()
+        self._raise_pending()
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---- writer thread ----
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except BaseException as e:  # surfaced to the training loop on the next save/flush
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, snapshot, epoch, metric, is_best):
+        fname = f'checkpoint_epoch{epoch:04d}.pth.tar'
+        path = self.out_dir / fname
+        tmp = path.with_name(fname + '.tmp')
+        torch.save(snapshot, str(tmp))
+        os.replace(tmp, path)
+
+        link_atomic(path, self.out_dir / self.latest_name)
+        if is_best:
+            link_atomic(path, self.out_dir / self.best_name)
+
+        self._records = [r for r in self._records if r['file'] != fname]
+        self._records.append({'file': fname, 'epoch': epoch, 'metric': metric})
+        self._apply_retention()
+        self._write_manifest()
+
+    def _apply_retention(self):
+        by_epoch = sorted(self._records, key=lambda r: r['epoch'])
+        keep = {r['file'] for r in by_epoch[-self.keep_last:]} if self.keep_last > 0 else set()
+        scored = [r for r in self._records if r['metric'] is not None]
+        scored.sort(key=lambda r: r['metric'], reverse=(self.mode == 'max'))
+        keep.update(r['file'] for r in scored[:self.keep_best])
+        # latest/best are separate links, so removing an epoch file never breaks them
+        for r in self._records:
+            if r['file'] not in keep:
+                try:
+                    (self.out_dir / r['file']).unlink()
+                except FileNotFoundError:
+                    pass
+        self._records = [r for r in self._records if r['file'] in keep]
+
+    def _load_manifest(self):
+        path = self.out_dir / self.MANIFEST
+        if not path.exists():
+            return []
+        try:
+            records = json.loads(path.read_text(encoding='utf-8'))
+        except Exception:
+            return []
+        return [r for r in records if (self.out_dir / r['file']).exists()]
+
+    def _write_manifest(self):
+        path = self.out_dir / self.MANIFEST
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(json.dumps(self._records, indent=2), encoding='utf-8')
+        os.replace(tmp, path)
+
+    def _raise_pending(self):
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise RuntimeError(f'checkpoint write failed: {err}') from err
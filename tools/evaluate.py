@@ -0,0 +1,171 @@
+"""
+Evaluation engine for the BiGRU baseline.
+
+- evaluate_tensors: batched torch.inference_mode evaluation over preloaded tensors,
+  returning accuracy and a confusion matrix (used by train_baseline for validation)
+- CLI: streams an exported memmap (dataset/processed/memmap) through a checkpoint and
+  reports accuracy, per-class precision/recall, the confusion matrix and per-sample latency;
+  class names come from the export's dataset_meta.json ("classes": label -> class_idx, name)
+
+    python tools/evaluate.py --checkpoint models/model_best.pth.tar --memmap-dir dataset/processed/memmap
+"""
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import torch
+
+from torch_dataset import load_arrays
+
+
+def decode_split(ds, indices):
+    """Decode the given samples of a SignDataset (no augmentation) into contiguous (X, y) tensors."""
+    X, y, _ = load_arrays(ds, indices)
+    return torch.from_numpy(X), torch.from_numpy(y)
+
+
+@torch.inference_mode()
+def evaluate_tensors(model, X, y, num_classes, batch_size=512):
+    """Return {"correct", "total", "confusion"} for preloaded X (N, T, D) / y (N,)."""
+    model.eval()
+    confusion = torch.zeros(num_classes * num_classes, dtype=torch.int64, device=y.device)
+    for s in range(0, len(y), batch_size):
+        preds = model(X[s:s + batch_size]).argmax(dim=1)
+        confusion += torch.bincount(y[s:s + batch_size] * num_classes + preds, minlength=num_classes * num_classes)
+    confusion = confusion.view(num_classes, num_classes).cpu()
+    return {"correct": int(confusion.diag().sum()), "total": int(len(y)), "confusion": confusion}
+
+
+def model_from_checkpoint(path, dropout=0.0):
+    """Rebuild BiGRUModel from a checkpoint, inferring its shape from the state dict."""
+    from train_baseline import BiGRUModel  # train_baseline imports this module
+    ckpt = torch.load(path, map_location='cpu')
+    state = ckpt['state_dict'] if 'state_dict' in ckpt else ckpt
+    hidden3, input_dim = state['rnn.weight_ih_l0'].shape
+    num_layers = len([k for k in state if k.startswith('rnn.weight_ih_l') and not k.endswith('_reverse')])
+    num_classes = state['fc.3.weight'].shape[0]
+    model = BiGRUModel(input_dim=input_dim, hidden=hidden3 // 3, num_layers=num_layers,
+                       num_classes=num_classes, dropout=dropout)
+    model.load_state_dict(state)
+    model.eval()
+    return model, ckpt
+
+
+def open_memmap(memmap_dir):
+    with open(os.path.join(memmap_dir, 'dataset_meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    shape = (meta['total_samples'], meta['sequence_length'], meta['feature_dim'])
+    X = np.memmap(os.path.join(memmap_dir, 'dataset_X.dat'), dtype=np.float32, mode='r', shape=shape)
+    y = np.memmap(os.path.join(memmap_dir, 'dataset_y.dat'), dtype=np.int32, mode='r', shape=(shape[0],))
+    return X, y, meta
+
+
+def class_names(meta):
+    """Label -> class name, from the exporter's dataset_meta.json "classes" mapping."""
+    classes = meta.get('classes')
+    if classes is None:
+        raise ValueError('dataset_meta.json has no "classes" mapping: the export predates 0-based labels, '
+                         're-export the dataset (POST /dataset/export)')
+    return [c.get('label_original') or c['folder_name'] for c in sorted(classes, key=lambda c: c['label'])]
+
+
+@torch.inference_mode()
+def evaluate_memmap(model, X, y, num_classes, batch_size=512, latency_samples=100):
+    """Stream the memmap in chunks so memory stays at one batch regardless of dataset size."""
+    confusion = torch.zeros(num_classes * num_classes, dtype=torch.int64)
+    t0 = time.perf_counter()
+    for s in range(0, len(y), batch_size):
+        xb = torch.from_numpy(np.array(X[s:s + batch_size], dtype=np.float32))
+        yb = torch.from_numpy(np.asarray(y[s:s + batch_size], dtype=np.int64))
+        # an out-of-range label would silently land in another cell of the flattened bincount
+        bad = ((yb < 0) | (yb >= num_classes)).nonzero()
+        if len(bad):
+            i = s + int(bad[0])
+            raise ValueError(f'sample {i} has label {int(y[i])}, outside the model\'s {num_classes} classes '
+                             f'(0..{num_classes - 1}): the checkpoint was not trained on this export\'s classes')
+        preds = model(xb).argmax(dim=1)
+        confusion += torch.bincount(yb * num_classes + preds, minlength=num_classes * num_classes)
+    throughput_s = (time.perf_counter() - t0) / max(1, len(y))
+
+    # single-sample latency, as seen by an online recognizer
+    latencies = []
+    for i in range(min(latency_samples, len(y))):
+        xb = torch.from_numpy(np.array(X[i:i + 1], dtype=np.float32))
+        t = time.perf_counter()
+        model(xb)
+        latencies.append(time.perf_counter() - t)
+    return confusion.view(num_classes, num_classes), throughput_s, latencies
+
+
+def report(confusion, throughput_s, latencies, names=None):
+    cm = confusion.numpy()
+    total = int(cm.sum())
+    correct = int(np.trace(cm))
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    per_class = []
+    for c in range(cm.shape[0]):
+        tp = int(cm[c, c])
+        per_class.append({
+            "class": c,
+            "name": names[c] if names and c < len(names) else None,
+            "support": int(support[c]),
+            "precision": tp / predicted[c] if predicted[c] else 0.0,
+            "recall": tp / support[c] if support[c] else 0.0,
+        })
+    lat = np.array(latencies) * 1000.0 if latencies else np.zeros(1)
+    return {
+        "accuracy": correct / max(1, total),
+        "correct": correct,
+        "total": total,
+        "per_class": per_class,
+        "confusion": cm.tolist(),
+        "batched_ms_per_sample": throughput_s * 1000.0,
+        "latency_ms": {"p50": float(np.percentile(lat, 50)), "p95": float(np.percentile(lat, 95)),
+                       "mean": float(lat.mean())},
+    }
+
+
+def main(args):
+    torch.set_num_threads(args.threads)
+    model, _ = model_from_checkpoint(args.checkpoint)
+    num_classes = model.fc[3].out_features
+    X, y, meta = open_memmap(args.memmap_dir)
+    names = class_names(meta)
+    print(f"Evaluating {meta['total_samples']} samples ({meta['sequence_length']}, {meta['feature_dim']}) "
+          f"of {len(names)} classes with {num_classes}-class model")
+    confusion, throughput_s, latencies = evaluate_memmap(model, X, y, num_classes, batch_size=args.batch_size,
+                                                         latency_samples=args.latency_samples)
+    rep = report(confusion, throughput_s, latencies, names)
+
+    print(f"Accuracy: {rep['accuracy']:.4f} ({rep['correct']}/{rep['total']})")
+    print(f"Batched: {rep['batched_ms_per_sample']:.3f} ms/sample  "
+          f"single-sample latency p50={rep['latency_ms']['p50']:.2f} ms p95={rep['latency_ms']['p95']:.2f} ms")
+    print('class  support  precision  recall  name')
+    for pc in rep['per_class']:
+        print(f"{pc['class']:<6} {pc['support']:<8} {pc['precision']:<10.4f} {pc['recall']:<7.4f} {pc['name'] or ''}")
+    print('Confusion matrix (rows = true, cols = predicted):')
+    for row in rep['confusion']:
+        print(' '.join(f'{v:>5}' for v in row))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(rep, f, indent=2)
+        print(f'Wrote report to {args.out}')
+    return rep
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Evaluate a BiGRU checkpoint on an exported memmap dataset')
+    p.add_argument('--checkpoint', default='models/model_best.pth.tar')
+    p.add_argument('--memmap-dir', default='dataset/processed/memmap')
+    p.add_argument('--batch-size', type=int, default=512)
+    p.add_argument('--latency-samples', type=int, default=100)
+    p.add_argument('--threads', type=int, default=torch.get_num_threads())
+    p.add_argument('--out', default='', help='optional JSON report path')
+    return p.parse_args(argv)
+
+
+if __name__ == '__main__':
+    main(parse_args())
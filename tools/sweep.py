@@ -0,0 +1,265 @@
+"""
+Parallel hyperparameter sweep / k-fold runner for the BiGRU baseline.
+
+The dataset under --data-root is decoded once into .npy files in --cache-dir; every
+trial process memory-maps them, so trials share the page cache instead of re-reading
+npz files. Trials (grid over --hidden/--num-layers/--lr/--dropout, times folds) run in
+a process pool with a fixed torch thread budget each, and trials that fall below the
+median of their peers after --prune-after epochs are stopped early.
+
+    python tools/sweep.py --hidden 64,128,256 --lr 1e-3,3e-4 --folds 5 --user-folds
+"""
+import os
+import csv
+import json
+import time
+import random
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.optim import AdamW
+from torch.utils.data import DataLoader
+
+from torch_dataset import SignDataset, ArrayDataset, load_arrays
+from train_baseline import BiGRUModel, collate_fn
+from evaluate import evaluate_tensors
+
+_X = None
+_y = None
+
+
+def build_cache(args):
+    """Decode the dataset once into X.npy / y.npy / users.json under cache_dir."""
+    os.makedirs(args.cache_dir, exist_ok=True)
+    x_path = os.path.join(args.cache_dir, 'X.npy')
+    if os.path.exists(x_path) and not args.rebuild_cache:
+        print(f'Reusing dataset cache in {args.cache_dir}')
+    else:
+        t0 = time.time()
+        ds = SignDataset(features_root=args.data_root, augment=False, max_samples=args.max_samples)
+        X, y, users = load_arrays(ds)
+        np.save(x_path, X)
+        np.save(os.path.join(args.cache_dir, 'y.npy'), y)
+        with open(os.path.join(args.cache_dir, 'users.json'), 'w', encoding='utf-8') as f:
+            json.dump(users, f)
+        print(f'Cached {X.shape[0]} samples {X.shape[1:]} in {time.time() - t0:.1f}s')
+    y = np.load(os.path.join(args.cache_dir, 'y.npy'))
+    with open(os.path.join(args.cache_dir, 'users.json'), 'r', encoding='utf-8') as f:
+        users = json.load(f)
+    return y, users
+
+
+def make_folds(y, users, k, by_user=False, seed=42):
+    """Return k (train_idx, val_idx) pairs. by_user keeps all samples of a user in the same fold."""
+    rng = random.Random(seed)
+    n = len(y)
+    if by_user:
+        groups = {}
+        for i, u in enumerate(users):
+            groups.setdefault(u, []).append(i)
+        keys = list(groups)
+        rng.shuffle(keys)
+        if len(keys) < k:
+            raise ValueError(f'--user-folds needs at least {k} users, found {len(keys)}')
+        # greedy: largest users first into the currently smallest fold
+        keys.sort(key=lambda u: len(groups[u]), reverse=True)
+        fold_members = [[] for _ in range(k)]
+        for u in keys:
+            min(fold_members, key=len).extend(groups[u])
+    else:
+        idx = list(range(n))
+        rng.shuffle(idx)
+        fold_members = [idx[f::k] for f in range(k)]
+    folds = []
+    for f in range(k):
+        val = sorted(fold_members[f])
+        val_set = set(val)
+        train = [i for i in range(n) if i not in val_set]
+        folds.append((np.array(train), np.array(val)))
+    return folds
+
+
+def expand_grid(args):
+    grid = itertools.product(args.hidden, args.num_layers, args.lr, args.dropout)
+    trials = [dict(hidden=h, num_layers=nl, lr=lr, dropout=d) for h, nl, lr, d in grid]
+    if args.max_trials and len(trials) > args.max_trials:
+        trials = random.Random(args.seed).sample(trials, args.max_trials)
+    return trials
+
+
+def _init_worker(cache_dir, threads):
+    global _X, _y
+    torch.set_num_threads(threads)
+    _X = np.load(os.path.join(cache_dir, 'X.npy'), mmap_mode='r')
+    _y = np.load(os.path.join(cache_dir, 'y.npy'))
+
+
+def _should_prune(progress, key, epoch, acc, min_peers=3):
+    """Median pruning: stop when best-so-far acc is below the median of peers at the same epoch."""
+    peers = [hist[epoch] for k, hist in progress.items() if k != key and len(hist) > epoch]
+    if len(peers) < min_peers:
+        return False
+    return acc < float(np.median(peers))
+
+
+def run_trial(task, progress):
+    cfg, fold = task['cfg'], task['fold']
+    key = f"{task['trial_id']}:{fold}"
+    random.seed(task['seed'])
+    np.random.seed(task['seed'])
+    torch.manual_seed(task['seed'])
+
+    train_ds = ArrayDataset(_X, _y, task['train_idx'], augment=task['augment'])
+    loader = DataLoader(train_ds, batch_size=task['batch_size'], shuffle=True, collate_fn=collate_fn)
+    val_idx = task['val_idx']
+    # validation is never augmented: decode it once into a contiguous tensor
+    xv = torch.from_numpy(np.ascontiguousarray(_X[val_idx], dtype=np.float32))
+    yv = torch.from_numpy(_y[val_idx])
+
+    model = BiGRUModel(input_dim=_X.shape[2], hidden=cfg['hidden'], num_layers=cfg['num_layers'],
+                       num_classes=task['num_classes'], dropout=cfg['dropout'])
+    optimizer = AdamW(model.parameters(), lr=cfg['lr'], weight_decay=task['weight_decay'])
+    criterion = nn.CrossEntropyLoss()
+
+    t0 = time.time()
+    best, history, pruned = 0.0, [], False
+    for epoch in range(task['epochs']):
+        model.train()
+        for xb, yb in loader:
+            loss = criterion(model(xb), yb)
+            optimizer.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), task['grad_clip'])
+            optimizer.step()
+
+        res = evaluate_tensors(model, xv, yv, task['num_classes'], batch_size=task['eval_batch_size'])
+        acc = res['correct'] / max(1, res['total'])
+        best = max(best, acc)
+        history.append(best)
+        progress[key] = history
+
+        if epoch + 1 >= task['prune_after'] and _should_prune(progress, key, epoch, best):
+            pruned = True
+            break
+
+    return {'trial_id': task['trial_id'], 'fold': fold, **cfg, 'best_val': best,
+            'epochs_run': len(history), 'pruned': pruned, 'seconds': time.time() - t0}
+
+
+def summarize(fold_results):
+    trials = {}
+    for r in fold_results:
+        trials.setdefault(r['trial_id'], []).append(r)
+    rows = []
+    for tid, rs in trials.items():
+        accs = [r['best_val'] for r in rs]
+        rows.append({
+            'trial_id': tid,
+            'hidden': rs[0]['hidden'], 'num_layers': rs[0]['num_layers'],
+            'lr': rs[0]['lr'], 'dropout': rs[0]['dropout'],
+            'mean_val': float(np.mean(accs)), 'std_val': float(np.std(accs)),
+            'folds': len(rs), 'pruned_folds': sum(r['pruned'] for r in rs),
+            'epochs_run': sum(r['epochs_run'] for r in rs),
+            'seconds': round(sum(r['seconds'] for r in rs), 2),
+        })
+    rows.sort(key=lambda r: r['mean_val'], reverse=True)
+    for rank, r in enumerate(rows, start=1):
+        r['rank'] = rank
+    return rows
+
+
+def run(args):
+    y, users = build_cache(args)
+    if len(y) == 0:
+        print(f'No samples found under {args.data_root} — abort')
+        return []
+    num_classes = int(y.max()) + 1
+    folds = make_folds(y, users, args.folds, by_user=args.user_folds, seed=args.seed) if args.folds > 1 else \
+        make_folds(y, users, int(round(1 / args.val_split)), by_user=args.user_folds, seed=args.seed)[:1]
+    trials = expand_grid(args)
+
+    cores = os.cpu_count() or 1
+    procs = args.procs or max(1, cores // args.threads_per_trial)
+    os.environ['OMP_NUM_THREADS'] = str(args.threads_per_trial)
+    print(f'{len(trials)} trials x {len(folds)} folds on {procs} processes x {args.threads_per_trial} threads')
+
+    tasks = []
+    for tid, cfg in enumerate(trials):
+        for f, (train_idx, val_idx) in enumerate(folds):
+            tasks.append({
+                'trial_id': tid, 'fold': f, 'cfg': cfg, 'train_idx': train_idx, 'val_idx': val_idx,
+                'num_classes': num_classes, 'epochs': args.epochs, 'batch_size': args.batch_size,
+                'eval_batch_size': args.eval_batch_size, 'weight_decay': args.weight_decay,
+                'grad_clip': args.grad_clip, 'augment': not args.no_augment,
+                'prune_after': args.prune_after, 'seed': args.seed + f,
+            })
+
+    results = []
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Manager() as manager:
+        progress = manager.dict()
+        with ProcessPoolExecutor(max_workers=procs, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(args.cache_dir, args.threads_per_trial)) as pool:
+            futures = [pool.submit(run_trial, t, progress) for t in tasks]
+            for fut in as_completed(futures):
+                r = fut.result()
+                results.append(r)
+                state = 'pruned' if r['pruned'] else 'done'
+                print(f"[{len(results)}/{len(tasks)}] trial {r['trial_id']} fold {r['fold']} {state} "
+                      f"best_val={r['best_val']:.4f} epochs={r['epochs_run']} ({r['seconds']:.1f}s)")
+
+    rows = summarize(results)
+    fields = ['rank', 'trial_id', 'hidden', 'num_layers', 'lr', 'dropout', 'mean_val', 'std_val',
+              'folds', 'pruned_folds', 'epochs_run', 'seconds']
+    with open(args.out, 'w', newline='', encoding='utf-8') as f:
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+        w.writerows(rows)
+    print('\nrank  hidden layers  lr        dropout  mean_val  std_val  pruned')
+    for r in rows[:args.top]:
+        print(f"{r['rank']:<5} {r['hidden']:<6} {r['num_layers']:<7} {r['lr']:<9g} {r['dropout']:<8g} "
+              f"{r['mean_val']:.4f}    {r['std_val']:.4f}   {r['pruned_folds']}/{r['folds']}")
+    print(f'\nWrote {len(rows)} trials to {args.out}')
+    return rows
+
+
+def _list(cast):
+    return lambda s: [cast(x) for x in s.split(',') if x.strip()]
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Parallel hyperparameter sweep for the BiGRU baseline')
+    p.add_argument('--data-root', default='dataset/features')
+    p.add_argument('--max-samples', type=int, default=None)
+    p.add_argument('--cache-dir', default='dataset/processed/sweep_cache')
+    p.add_argument('--rebuild-cache', action='store_true')
+    p.add_argument('--hidden', type=_list(int), default=[128])
+    p.add_argument('--num-layers', type=_list(int), default=[1])
+    p.add_argument('--lr', type=_list(float), default=[1e-3])
+    p.add_argument('--dropout', type=_list(float), default=[0.3])
+    p.add_argument('--max-trials', type=int, default=0, help='randomly sample at most this many grid points')
+    p.add_argument('--folds', type=int, default=1, help='k for k-fold CV (1 = single holdout of --val-split)')
+    p.add_argument('--user-folds', action='store_true', help='group folds by user')
+    p.add_argument('--val-split', type=float, default=0.2)
+    p.add_argument('--epochs', type=int, default=10)
+    p.add_argument('--batch-size', type=int, default=8)
+    p.add_argument('--eval-batch-size', type=int, default=512)
+    p.add_argument('--weight-decay', type=float, default=1e-4)
+    p.add_argument('--grad-clip', type=float, default=1.0)
+    p.add_argument('--no-augment', action='store_true')
+    p.add_argument('--prune-after', type=int, default=3, help='epochs before median pruning may stop a trial')
+    p.add_argument('--procs', type=int, default=0, help='trial processes (default: cores / threads-per-trial)')
+    p.add_argument('--threads-per-trial', type=int, default=1)
+    p.add_argument('--out', default='sweep_results.csv')
+    p.add_argument('--top', type=int, default=10)
+    p.add_argument('--seed', type=int, default=42)
+    return p.parse_args(argv)
+
+
+if __name__ == '__main__':
+    run(parse_args())
@@ -1,10 +1,16 @@
 import os
+import sys
 import json
 import random
+from functools import lru_cache
 import numpy as np
 import torch
 from torch.utils.data import Dataset
 
+# feature layouts are shared with the backend ingest paths
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from app.processing.layouts import get_layout, layout_for_dim  # noqa: E402
+
 
 def _load_sequence_from_npz(path):
     data = np.load(path)
@@ -47,24 +53,39 @@ def time_warp_resample(seq, factor=None, low=0.8, high=1.2):
     return resampled
 
 
-def mirror_sequence(seq):
+@lru_cache(maxsize=None)
+def _mirror_plan(version):
+    layout = get_layout(version)
+    x_idx = np.concatenate([layout.field_indices(p.name, 'x') for p in layout.parts])
+    return x_idx, layout.slice('left_hand'), layout.slice('right_hand')
+
+
+def mirror_sequence(seq, layout=None):
+    layout = layout or layout_for_dim(seq.shape[1])
+    x_idx, left_sl, right_sl = _mirror_plan(layout.version)
     m = seq.copy()
-    # flip X for pose (first 100 entries, x every 4 starting at 0)
-    for x_idx in range(0, 100, 4):
-        m[:, x_idx] = -m[:, x_idx]
-    # hands
-    for x_idx in range(100, 100 + 63, 3):
-        m[:, x_idx] = -m[:, x_idx]
-    for x_idx in range(163, 163 + 63, 3):
-        m[:, x_idx] = -m[:, x_idx]
+    # flip X of every point
+    m[:, x_idx] = -m[:, x_idx]
     # swap hand blocks
-    left = m[:, 100:163].copy()
-    right = m[:, 163:226].copy()
-    m[:, 100:163] = right
-    m[:, 163:226] = left
+    left = m[:, left_sl].copy()
+    m[:, left_sl] = m[:, right_sl]
+    m[:, right_sl] = left
     return m
 
 
+def augment_sequence(seq):
+    """Random augmentation policy shared by SignDataset and the in-memory datasets."""
+    if random.random() < 0.5:
+        seq = jitter(seq, sigma=0.02)
+    if random.random() < 0.3:
+        seq = scale(seq)
+    if random.random() < 0.3:
+        seq = time_warp_resample(seq)
+    if random.random() < 0.5:
+        seq = mirror_sequence(seq)
+    return seq
+
+
 class SignDataset(Dataset):
     """Dataset that loads .npz samples from dataset/features and applies on-the-fly augmentation."""
 
@@ -75,12 +96,13 @@ class SignDataset(Dataset):
         self._load_samples(max_samples)
 
     def _load_samples(self, max_samples):
-        classes = sorted(os.listdir(self.features_root))
+        # class folders only, so a stray file does not shift the labels (the exporter uses the same order)
+        classes = sorted(d for d in os.listdir(self.features_root)
+                         if os.path.isdir(os.path.join(self.features_root, d)))
         for cls_idx, cls in enumerate(classes, start=1):
             cls_path = os.path.join(self.features_root, cls)
-            if not os.path.isdir(cls_path):
-                continue
-            for fname in os.listdir(cls_path):
+            # sorted so every process builds the same index (distributed samplers shard by position)
+            for fname in sorted(os.listdir(cls_path)):
                 if not fname.endswith('.npz'):
                     continue
                 fpath = os.path.join(cls_path, fname)
@@ -106,16 +128,56 @@ class SignDataset(Dataset):
         seq = _load_sequence_from_npz(path)
         if self.augment:
             # apply random augmentations with probabilities
-            if random.random() < 0.5:
-                seq = jitter(seq, sigma=0.02)
-            if random.random() < 0.3:
-                seq = scale(seq)
-            if random.random() < 0.3:
-                seq = time_warp_resample(seq)
-            if random.random() < 0.5:
-                seq = mirror_sequence(seq)
+            seq = augment_sequence(seq)
 
         # ensure float32 and shape
         seq = seq.astype(np.float32)
         # return tensor: (T, D)
         return torch.from_numpy(seq), int(label), user
+
+
+def load_arrays(ds, indices=None):
+    """Decode samples of a SignDataset (all, or the given indices) once into contiguous arrays.
+
+    Returns (X float32 (N, T, D), y int64 (N,), users list). Samples whose shape differs from
+    the most common one are skipped (run the validator with fix=True to repair them).
+    """
+    samples = ds.samples if indices is None else [ds.samples[i] for i in indices]
+    seqs = [_load_sequence_from_npz(path) for path, _, _ in samples]
+    if not seqs:
+        return np.zeros((0, 0, 0), dtype=np.float32), np.zeros((0,), dtype=np.int64), []
+    shapes = {}
+    for s in seqs:
+        shapes[s.shape] = shapes.get(s.shape, 0) + 1
+    target = max(shapes.items(), key=lambda kv: kv[1])[0]
+    keep = [i for i, s in enumerate(seqs) if s.shape == target]
+    if len(keep) < len(seqs):
+        print(f'Skipping {len(seqs) - len(keep)} samples with shape != {target}')
+    X = np.empty((len(keep),) + target, dtype=np.float32)
+    for j, i in enumerate(keep):
+        X[j] = seqs[i]
+    y = np.array([samples[i][1] for i in keep], dtype=np.int64)
+    users = [samples[i][2] for i in keep]
+    return X, y, users
+
+
+class ArrayDataset(Dataset):
+    """Dataset over preloaded (possibly memory-mapped) arrays; yields the same items as SignDataset."""
+
+    def __init__(self, X, y, indices=None, users=None, augment=False):
+        self.X = X
+        self.y = y
+        self.indices = np.arange(len(y)) if indices is None else np.asarray(indices)
+        self.users = users
+        self.augment = augment
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, idx):
+        i = int(self.indices[idx])
+        seq = np.array(self.X[i], dtype=np.float32)
+        if self.augment:
+            seq = augment_sequence(seq).astype(np.float32)
+        user = self.users[i] if self.users is not None else None
+        return torch.from_numpy(seq), int(self.y[i]), user
@@ -4,15 +4,21 @@ import json
 import time
 import random
 import argparse
-from pathlib import Path
 
 import torch
 import torch.nn as nn
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
 from torch.utils.data import DataLoader, random_split
+from torch.utils.data.distributed import DistributedSampler
 from torch.optim import AdamW
 from torch.utils.tensorboard import SummaryWriter
 
 from torch_dataset import SignDataset
+from app.processing.layouts import DEFAULT_LAYOUT, get_layout
+from checkpoint_writer import AsyncCheckpointWriter
+from evaluate import decode_split, evaluate_tensors
 
 
 class BiGRUModel(nn.Module):
@@ -39,21 +45,36 @@ def collate_fn(batch):
     return seqs, labels
 
 
-def save_checkpoint(state, is_best, out_dir, filename='checkpoint.pth.tar'):
-    out_dir = Path(out_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
-    filepath = out_dir / filename
-    torch.save(state, str(filepath))
-    if is_best:
-        best_path = out_dir / 'model_best.pth.tar'
-        torch.save(state, str(best_path))
+def setup_distributed(rank, world_size, args):
+    """Join the local gloo process group and pin this rank to its share of the CPU threads."""
+    os.environ.setdefault('MASTER_ADDR', '127.0.0.1')
+    os.environ.setdefault('MASTER_PORT', str(args.master_port))
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+    threads = args.threads_per_proc or max(1, (os.cpu_count() or 1) // world_size)
+    torch.set_num_threads(threads)
+    # same split on every rank, different augmentation stream per rank
+    random.seed(args.seed + rank)
+    torch.manual_seed(args.seed)
+
+
+def _distributed_worker(rank, world_size, args):
+    setup_distributed(rank, world_size, args)
+    try:
+        train(args)
+    finally:
+        dist.destroy_process_group()
 
 
 def train(args):
+    distributed = dist.is_initialized()
+    rank = dist.get_rank() if distributed else 0
+    world_size = dist.get_world_size() if distributed else 1
+    main_proc = rank == 0
+
     # dataset
-    ds = SignDataset(augment=True, max_samples=args.max_samples)
+    ds = SignDataset(features_root=args.data_root, augment=True, max_samples=args.max_samples)
     if len(ds) == 0:
-        print('No samples found under dataset/features — abort')
+        print(f'No samples found under {args.data_root} — abort')
         return
 
     # build splits
@@ -66,29 +87,37 @@ def train(args):
         for idx, (_, lbl, user) in enumerate(ds.samples):
             user_map.setdefault(user, []).append(idx)
         users = list(user_map.keys())
-        random.seed(args.seed)
-        random.shuffle(users)
+        random.Random(args.seed).shuffle(users)
         # allocate users to train/val
         train_users = set(users[:-max(1, int(len(users)*args.val_split))])
         train_idx = [i for u in train_users for i in user_map.get(u, [])]
         val_idx = [i for u in users if u not in train_users for i in user_map.get(u, [])]
         train_dataset = torch.utils.data.Subset(ds, train_idx)
-        val_dataset = torch.utils.data.Subset(ds, val_idx)
     else:
-        train_dataset, val_dataset = random_split(ds, [train_n, val_n]) if val_n>0 else (ds, None)
+        split_gen = torch.Generator().manual_seed(args.seed)
+        train_dataset, val_dataset = random_split(ds, [train_n, val_n], generator=split_gen) if val_n>0 else (ds, None)
+        val_idx = list(val_dataset.indices) if val_dataset is not None else []
 
-    # dataloaders
-    train_loader = DataLoader(train_dataset, batch_size=args.batch_size, shuffle=True, collate_fn=collate_fn)
-    val_loader = DataLoader(val_dataset, batch_size=args.batch_size, shuffle=False, collate_fn=collate_fn) if val_dataset is not None else None
+    # dataloaders (each rank sees a disjoint shard in distributed mode)
+    train_sampler = DistributedSampler(train_dataset, num_replicas=world_size, rank=rank, shuffle=True, seed=args.seed) if distributed else None
+    train_loader = DataLoader(train_dataset, batch_size=args.batch_size, shuffle=train_sampler is None, sampler=train_sampler,
+                              num_workers=args.workers, collate_fn=collate_fn)
+
+    # validation is never augmented: decode this rank's share once and keep it as one tensor
+    val_X = val_y = None
+    if val_idx:
+        val_X, val_y = decode_split(ds, val_idx[rank::world_size])
 
     # model
     # infer num_classes
     classes = set([lbl for _, lbl, _ in ds.samples])
     num_classes = max(classes) + 1
-    model = BiGRUModel(input_dim=226, hidden=args.hidden, num_layers=args.num_layers, num_classes=num_classes, dropout=args.dropout)
+    model = BiGRUModel(input_dim=get_layout(args.layout).dim, hidden=args.hidden, num_layers=args.num_layers, num_classes=num_classes, dropout=args.dropout)
 
-    device = torch.device('cuda' if (args.device=='cuda' and torch.cuda.is_available()) else 'cpu')
+    device = torch.device('cuda' if (args.device=='cuda' and torch.cuda.is_available() and not distributed) else 'cpu')
     model.to(device)
+    if val_X is not None:
+        val_X, val_y = val_X.to(device), val_y.to(device)
 
     optimizer = AdamW(model.parameters(), lr=args.lr, weight_decay=args.weight_decay)
     scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='max', factor=0.5, patience=2)
@@ -105,15 +134,24 @@ def train(args):
             optimizer.load_state_dict(ckpt['optimizer'])
             start_epoch = ckpt.get('epoch', 0)
             best_val = ckpt.get('best_val', 0.0)
-            print(f'Resumed from {args.resume} at epoch {start_epoch}, best_val={best_val}')
-        else:
+            if main_proc:
+                print(f'Resumed from {args.resume} at epoch {start_epoch}, best_val={best_val}')
+        elif main_proc:
             print('Resume checkpoint not found:', args.resume)
 
+    # DDP broadcasts rank 0's weights on construction and all-reduces gradients in backward()
+    raw_model = model
+    if distributed:
+        model = DistributedDataParallel(model)
+
     # logging
-    writer = SummaryWriter(log_dir=args.logdir)
+    writer = SummaryWriter(log_dir=args.logdir) if main_proc else None
+    ckpt_writer = AsyncCheckpointWriter(args.out_dir, keep_last=args.keep_last, keep_best=args.keep_best) if main_proc else None
     global_step = 0
 
     for epoch in range(start_epoch, args.epochs):
+        if train_sampler is not None:
+            train_sampler.set_epoch(epoch)
         model.train()
         running_loss = 0.0
         cnt = 0
@@ -130,53 +168,60 @@ def train(args):
 
             running_loss += loss.item()
             cnt += 1
-            if global_step % 10 == 0:
+            if writer is not None and global_step % 10 == 0:
                 writer.add_scalar('train/loss_step', loss.item(), global_step)
             global_step += 1
 
+        if distributed:
+            stats = torch.tensor([running_loss, cnt], dtype=torch.float64)
+            dist.all_reduce(stats)
+            running_loss, cnt = stats.tolist()
         avg_loss = running_loss / max(1, cnt)
         elapsed = time.time() - t0
-        print(f'Epoch {epoch+1}/{args.epochs} train_loss={avg_loss:.4f} time={elapsed:.1f}s')
-        writer.add_scalar('train/loss_epoch', avg_loss, epoch)
+        if main_proc:
+            print(f'Epoch {epoch+1}/{args.epochs} train_loss={avg_loss:.4f} time={elapsed:.1f}s')
+            writer.add_scalar('train/loss_epoch', avg_loss, epoch)
 
         # validation
         val_acc = 0.0
-        if val_loader is not None:
-            model.eval()
-            correct = 0
-            total = 0
-            with torch.no_grad():
-                for xb, yb in val_loader:
-                    xb = xb.to(device).float()
-                    yb = yb.to(device)
-                    logits = model(xb)
-                    preds = logits.argmax(dim=1)
-                    correct += (preds == yb).sum().item()
-                    total += yb.size(0)
+        if val_X is not None:
+            res = evaluate_tensors(raw_model, val_X, val_y, num_classes, batch_size=args.eval_batch_size)
+            correct, total = res['correct'], res['total']
+            if distributed:
+                counts = torch.tensor([correct, total], dtype=torch.int64)
+                dist.all_reduce(counts)
+                correct, total = counts.tolist()
             val_acc = correct / max(1, total)
-            print(f'  Val acc: {val_acc:.4f} ({correct}/{total})')
-            writer.add_scalar('val/acc', val_acc, epoch)
+            if main_proc:
+                print(f'  Val acc: {val_acc:.4f} ({correct}/{total})')
+                writer.add_scalar('val/acc', val_acc, epoch)
             scheduler.step(val_acc)
 
         # checkpoint
         is_best = val_acc > best_val
         best_val = max(best_val, val_acc)
-        ckpt = {
-            'epoch': epoch+1,
-            'state_dict': model.state_dict(),
-            'optimizer': optimizer.state_dict(),
-            'best_val': best_val,
-        }
-        save_checkpoint(ckpt, is_best, args.out_dir)
+        if main_proc:
+            ckpt = {
+                'epoch': epoch+1,
+                'state_dict': raw_model.state_dict(),
+                'optimizer': optimizer.state_dict(),
+                'best_val': best_val,
+            }
+            ckpt_writer.save(ckpt, epoch+1, metric=val_acc, is_best=is_best)
 
-    writer.close()
+    if ckpt_writer is not None:
+        ckpt_writer.close()
+    if writer is not None:
+        writer.close()
 
 
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument('--data-root', default='dataset/features')
+    p.add_argument('--layout', default=DEFAULT_LAYOUT, help='feature layout version of the samples')
     p.add_argument('--max-samples', type=int, default=256)
     p.add_argument('--batch-size', type=int, default=8)
+    p.add_argument('--eval-batch-size', type=int, default=512)
     p.add_argument('--epochs', type=int, default=10)
     p.add_argument('--lr', type=float, default=1e-3)
     p.add_argument('--weight-decay', type=float, default=1e-4)
@@ -185,17 +230,33 @@ def parse_args():
     p.add_argument('--dropout', type=float, default=0.3)
     p.add_argument('--grad-clip', type=float, default=1.0)
     p.add_argument('--out-dir', default='models')
+    p.add_argument('--keep-last', type=int, default=3, help='most recent epoch checkpoints to keep')
+    p.add_argument('--keep-best', type=int, default=1, help='best-scoring epoch checkpoints to keep')
     p.add_argument('--logdir', default='runs/exp')
     p.add_argument('--resume', default='')
     p.add_argument('--device', choices=['cpu','cuda'], default='cuda')
     p.add_argument('--val-split', type=float, default=0.2)
     p.add_argument('--user-split', action='store_true')
     p.add_argument('--seed', type=int, default=42)
+    p.add_argument('--workers', type=int, default=0, help='DataLoader workers per process')
+    p.add_argument('--nproc', type=int, default=1, help='number of local CPU training processes (gloo backend)')
+    p.add_argument('--threads-per-proc', type=int, default=0, help='torch threads per process (default: cores / nproc)')
+    p.add_argument('--master-port', type=int, default=29500)
     return p.parse_args()
 
 
 if __name__ == '__main__':
     args = parse_args()
-    random.seed(args.seed)
-    torch.manual_seed(args.seed)
-    train(args)
+    if 'RANK' in os.environ and 'WORLD_SIZE' in os.environ:
+        # launched by torchrun: one process per rank already exists
+        setup_distributed(int(os.environ['RANK']), int(os.environ['WORLD_SIZE']), args)
+        try:
+            train(args)
+        finally:
+            dist.destroy_process_group()
+    elif args.nproc > 1:
+        mp.spawn(_distributed_worker, args=(args.nproc, args), nprocs=args.nproc, join=True)
+    else:
+        random.seed(args.seed)
+        torch.manual_seed(args.seed)
+        train(args)